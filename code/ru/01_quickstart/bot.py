@@ -10,12 +10,16 @@ from aiogram.filters.command import Command     # Фильтр для обраб
 
 # Импорт конфигурации
 from config_reader import config  # Загрузка настроек из файла конфигурации
+from launcher import create_session, run_bot  # Запуск поллингом или вебхуком
 
 # Настройка логирования для отображения информации о работе бота
 logging.basicConfig(level=logging.INFO)
 
 # Создание экземпляра бота с токеном из конфигурации
-bot = Bot(token=config.bot_token.get_secret_value())
+bot = Bot(
+    token=config.bot_token.get_secret_value(),
+    session=create_session(config.bot_api_url, rate_limit=config.bot_rate_limit)
+)
 
 # Создание диспетчера для обработки событий
 dp = Dispatcher()
@@ -101,12 +105,9 @@ async def main():
 
     # Запуск бота и пропуск всех накопленных обновлений.
     # Полезно при перезапуске бота для избежания обработки старых сообщений.
-    # И да, данный метод можно использовать даже если у вас поллинг.
-    await bot.delete_webhook(drop_pending_updates=True)
-    
-    # Запуск бота в режиме long polling
+    # Режим (long polling или вебхук) выбирается в .env, см. RUN_MODE в env_dist
     # mylist=[1, 2, 3] передается в контекст диспетчера для dependency injection
-    await dp.start_polling(bot, mylist=[1, 2, 3])
+    await run_bot(bot, dp, config, drop_pending_updates=True, mylist=[1, 2, 3])
 
 
 if __name__ == "__main__":
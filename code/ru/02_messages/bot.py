@@ -13,9 +13,11 @@ from aiogram.utils.markdown import hide_link
 from aiogram.utils.media_group import MediaGroupBuilder
 
 from config_reader import config
+from launcher import create_session, run_bot
 
 bot = Bot(
     token=config.bot_token.get_secret_value(),
+    session=create_session(config.bot_api_url, rate_limit=config.bot_rate_limit),
     default=DefaultBotProperties(
         parse_mode=ParseMode.HTML
     )
@@ -339,10 +341,9 @@ async def somebody_added(message: Message):
 
 
 async def main():
-    # Запускаем бота и пропускаем все накопленные входящие
-    # Да, этот метод можно вызвать даже если у вас поллинг
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+    # Запускаем бота и пропускаем все накопленные входящие.
+    # Поллинг или вебхук — выбирается в .env, см. RUN_MODE в env_dist
+    await run_bot(bot, dp, config, drop_pending_updates=True)
 
 
 if __name__ == "__main__":
@@ -11,8 +11,12 @@ from aiogram.filters.callback_data import CallbackData
 from aiogram.utils.keyboard import ReplyKeyboardBuilder, InlineKeyboardBuilder
 
 from config_reader import config
+from launcher import create_session, run_bot
 
-bot = Bot(token=config.bot_token.get_secret_value())
+bot = Bot(
+    token=config.bot_token.get_secret_value(),
+    session=create_session(config.bot_api_url, rate_limit=config.bot_rate_limit)
+)
 dp = Dispatcher()
 logging.basicConfig(level=logging.INFO)
 
@@ -265,10 +269,9 @@ async def callbacks_num_finish_fab(callback: types.CallbackQuery):
 
 # Запуск бота
 async def main():
-    # Запускаем бота и пропускаем все накопленные входящие
-    # Да, этот метод можно вызвать даже если у вас поллинг
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+    # Запускаем бота и пропускаем все накопленные входящие.
+    # Поллинг или вебхук — выбирается в .env, см. RUN_MODE в env_dist
+    await run_bot(bot, dp, config, drop_pending_updates=True)
 
 
 if __name__ == "__main__":
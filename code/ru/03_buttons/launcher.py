@@ -0,0 +1,191 @@
+"""
+Запуск бота в режиме long polling или вебхука.
+
+Режим выбирается в .env (см. env_dist), код хэндлеров при этом не меняется.
+Для вебхука нужен адрес, доступный серверам Telegram по HTTPS,
+например, через nginx или другой обратный прокси перед ботом
+"""
+import asyncio
+import logging
+import secrets
+import signal
+from typing import Any, Literal, Optional, Protocol
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+from pydantic import SecretStr
+
+from ratelimit import RateLimitMiddleware
+
+logger = logging.getLogger(__name__)
+
+
+class LaunchSettings(Protocol):
+    run_mode: Literal["polling", "webhook"]
+    # Публичный адрес, например, https://example.com (без пути)
+    webhook_url: Optional[str]
+    webhook_path: str
+    webhook_secret: Optional[SecretStr]
+    # Где слушать входящие запросы (обычно за обратным прокси)
+    webhook_host: str
+    webhook_port: int
+    # Сколько апдейтов обрабатывать одновременно
+    webhook_max_workers: int
+
+
+class WebhookRequestHandler(SimpleRequestHandler):
+    """
+    Обработчик вебхука с ограничением числа одновременно обрабатываемых апдейтов.
+
+    Когда все воркеры заняты, ответ Telegram задерживается, и он сам
+    притормаживает отправку новых апдейтов, вместо того чтобы копить их в памяти.
+    При остановке дожидается обработки уже принятых апдейтов
+    """
+
+    def __init__(
+            self,
+            *args: Any,
+            max_workers: int,
+            shutdown_timeout: float = 30,
+            **kwargs: Any
+    ):
+        """
+        :param args: аргументы для SimpleRequestHandler
+        :param max_workers: сколько апдейтов обрабатывать одновременно
+        :param shutdown_timeout: сколько секунд ждать незавершённые апдейты при остановке
+        :param kwargs: аргументы для SimpleRequestHandler
+        """
+        super().__init__(*args, handle_in_background=True, **kwargs)
+        self._workers = asyncio.Semaphore(max_workers)
+        self.shutdown_timeout = shutdown_timeout
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        await self._workers.acquire()
+        try:
+            return await super()._handle_request_background(bot=bot, request=request)
+        except BaseException:
+            # Апдейт так и не попал в обработку (например, битый JSON)
+            self._workers.release()
+            raise
+
+    async def _background_feed_update(self, bot: Bot, update: dict[str, Any]) -> None:
+        try:
+            await super()._background_feed_update(bot=bot, update=update)
+        finally:
+            self._workers.release()
+
+    async def close(self) -> None:
+        if self._background_feed_update_tasks:
+            logger.info(
+                "Waiting for %d updates to finish processing",
+                len(self._background_feed_update_tasks)
+            )
+            await asyncio.wait(self._background_feed_update_tasks, timeout=self.shutdown_timeout)
+        await super().close()
+
+
+def create_session(api_url: Optional[str], rate_limit: bool = True) -> AiohttpSession:
+    """
+    Создаёт сессию для Bot(session=...) с ограничением частоты отправки
+    сообщений (см. ratelimit.py) и, при необходимости, для своего сервера
+    Bot API, например, фейкового для нагрузочных тестов (см. code/ru/loadtest)
+
+    :param api_url: адрес сервера или None для api.telegram.org
+    :param rate_limit: соблюдать ли лимиты Telegram на отправку сообщений
+    :return: сессия для Bot(session=...)
+    """
+    session = AiohttpSession(api=TelegramAPIServer.from_base(api_url)) if api_url else AiohttpSession()
+    if rate_limit:
+        session.middleware(RateLimitMiddleware())
+    return session
+
+
+async def run_polling(bot: Bot, dp: Dispatcher, drop_pending_updates: bool, **kwargs: Any):
+    # getUpdates не работает, пока установлен вебхук, поэтому удаляем его
+    await bot.delete_webhook(drop_pending_updates=drop_pending_updates)
+    await dp.start_polling(bot, **kwargs)
+
+
+async def run_webhook(
+        bot: Bot,
+        dp: Dispatcher,
+        settings: LaunchSettings,
+        drop_pending_updates: bool,
+        **kwargs: Any
+):
+    if not settings.webhook_url:
+        raise ValueError("webhook_url is required in webhook mode")
+    # Если секрет не задан, генерируем новый при каждом запуске:
+    # вебхук всё равно переустанавливается на старте
+    secret = (
+        settings.webhook_secret.get_secret_value()
+        if settings.webhook_secret else secrets.token_urlsafe(32)
+    )
+
+    async def on_startup():
+        await bot.set_webhook(
+            url=settings.webhook_url.rstrip("/") + settings.webhook_path,
+            secret_token=secret,
+            allowed_updates=dp.resolve_used_update_types(),
+            drop_pending_updates=drop_pending_updates,
+            max_connections=min(settings.webhook_max_workers, 100)
+        )
+
+    dp.startup.register(on_startup)
+
+    app = web.Application()
+    WebhookRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=secret,
+        max_workers=settings.webhook_max_workers,
+        **kwargs
+    ).register(app, path=settings.webhook_path)
+    setup_application(app, dp, bot=bot, **kwargs)
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host=settings.webhook_host, port=settings.webhook_port)
+    await site.start()
+    logger.info("Webhook server is listening on %s:%d", settings.webhook_host, settings.webhook_port)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows: остаётся только Ctrl+C через KeyboardInterrupt
+            pass
+    try:
+        await stop.wait()
+    finally:
+        # Сначала перестаём принимать запросы, затем дожидаемся
+        # уже принятых апдейтов, закрываем сессию бота и вызываем dp.shutdown
+        logger.info("Stopping webhook server")
+        await runner.cleanup()
+
+
+async def run_bot(
+        bot: Bot,
+        dp: Dispatcher,
+        settings: LaunchSettings,
+        drop_pending_updates: bool = False,
+        **kwargs: Any
+):
+    """
+    Запускает бота в режиме, указанном в настройках
+
+    :param bot: объект бота
+    :param dp: объект диспетчера
+    :param settings: настройки запуска (обычно config из config_reader.py)
+    :param drop_pending_updates: пропустить ли накопившиеся апдейты
+    :param kwargs: дополнительные данные для хэндлеров, как в dp.start_polling()
+    """
+    if settings.run_mode == "webhook":
+        await run_webhook(bot, dp, settings, drop_pending_updates, **kwargs)
+    else:
+        await run_polling(bot, dp, drop_pending_updates, **kwargs)
@@ -3,12 +3,16 @@ import asyncio
 from aiogram import Bot, Dispatcher
 
 from config_reader import config
+from launcher import create_session, run_bot
 from handlers import questions, different_types
 
 
 # Запуск бота
 async def main():
-    bot = Bot(token=config.bot_token.get_secret_value())
+    bot = Bot(
+        token=config.bot_token.get_secret_value(),
+        session=create_session(config.bot_api_url, rate_limit=config.bot_rate_limit)
+    )
     dp = Dispatcher()
 
     dp.include_routers(questions.router, different_types.router)
@@ -17,10 +21,9 @@ async def main():
     # dp.include_router(questions.router)
     # dp.include_router(different_types.router)
 
-    # Запускаем бота и пропускаем все накопленные входящие
-    # Да, этот метод можно вызвать даже если у вас поллинг
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+    # Запускаем бота и пропускаем все накопленные входящие.
+    # Поллинг или вебхук — выбирается в .env, см. RUN_MODE в env_dist
+    await run_bot(bot, dp, config, drop_pending_updates=True)
 
 
 if __name__ == "__main__":
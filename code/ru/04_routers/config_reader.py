@@ -1,3 +1,5 @@
+from typing import Literal, Optional
+
 from pydantic import SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -5,6 +7,23 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 class Settings(BaseSettings):
     bot_token: SecretStr
 
+    # Как получать апдейты: "polling" или "webhook" (см. launcher.py)
+    run_mode: Literal["polling", "webhook"] = "polling"
+    # Публичный HTTPS-адрес бота без пути, например, https://example.com
+    webhook_url: Optional[str] = None
+    webhook_path: str = "/webhook"
+    # Если не указан, генерируется при каждом запуске
+    webhook_secret: Optional[SecretStr] = None
+    webhook_host: str = "127.0.0.1"
+    webhook_port: int = 8080
+    # Сколько апдейтов обрабатывать одновременно
+    webhook_max_workers: int = 100
+    # Свой сервер Bot API вместо api.telegram.org (см. launcher.create_session)
+    bot_api_url: Optional[str] = None
+    # Соблюдать ли лимиты Telegram на отправку сообщений (см. ratelimit.py);
+    # для нагрузочных тестов с фейковым Bot API можно выключить
+    bot_rate_limit: bool = True
+
     model_config = SettingsConfigDict(env_file='.env', env_file_encoding='utf-8')
 
 
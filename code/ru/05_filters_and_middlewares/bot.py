@@ -3,12 +3,17 @@ import asyncio
 from aiogram import Bot, Dispatcher
 
 from config_reader import config
+from launcher import create_session, run_bot
 from handlers import group_games, checkin, usernames
+from instrumentation import setup_instrumentation
 from middlewares.weekend import WeekendCallbackMiddleware
 
 
 async def main():
-    bot = Bot(token=config.bot_token.get_secret_value())
+    bot = Bot(
+        token=config.bot_token.get_secret_value(),
+        session=create_session(config.bot_api_url, rate_limit=config.bot_rate_limit)
+    )
     dp = Dispatcher()
 
     dp.include_router(group_games.router)
@@ -17,10 +22,19 @@ async def main():
 
     dp.callback_query.outer_middleware(WeekendCallbackMiddleware())
 
-    # Запускаем бота и пропускаем все накопленные входящие
-    # Да, этот метод можно вызвать даже если у вас поллинг
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot)
+    # Замеры времени подключаются последними, когда все роутеры,
+    # фильтры и мидлвари уже на месте
+    if config.timing_enabled:
+        setup_instrumentation(
+            dp, bot,
+            host=config.timing_metrics_host,
+            port=config.timing_metrics_port,
+            log_interval=config.timing_log_interval
+        )
+
+    # Запускаем бота и пропускаем все накопленные входящие.
+    # Поллинг или вебхук — выбирается в .env, см. RUN_MODE в env_dist
+    await run_bot(bot, dp, config, drop_pending_updates=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,177 @@
+"""
+Кэш администраторов групп.
+
+Список админов группы загружается при первой проверке прав в ней,
+дальше поддерживается апдейтами chat_member и время от времени
+перезагружается целиком на случай пропущенных апдейтов
+"""
+import asyncio
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.enums import ChatMemberStatus
+from aiogram.types import ChatMemberUpdated, TelegramObject
+
+logger = logging.getLogger(__name__)
+
+ADMIN_STATUSES = {ChatMemberStatus.ADMINISTRATOR, ChatMemberStatus.CREATOR}
+GONE_STATUSES = {ChatMemberStatus.LEFT, ChatMemberStatus.KICKED}
+
+
+class ChatAdmins:
+    """
+    Множества ID администраторов по ID групп.
+
+    Проверка прав — поиск в множестве. К Bot API обращаемся,
+    только если группа ещё не загружена (все одновременные проверки
+    ждут один и тот же запрос) или её список пора обновить
+    (тогда обновление идёт в фоне, а проверка отвечает по текущему списку)
+    """
+
+    def __init__(self, refresh_interval: float = 600, jitter: float = 0.2):
+        """
+        :param refresh_interval: раз во сколько секунд перезагружать список админов группы
+        :param jitter: доля refresh_interval, на которую случайно сокращается интервал,
+            чтобы группы, загруженные одновременно, не обновлялись тоже одновременно
+        """
+        self.refresh_interval = refresh_interval
+        self.jitter = jitter
+        # ID группы -> ID админов
+        self._admins: dict[int, set[int]] = dict()
+        # ID группы -> момент следующего обновления по time.monotonic()
+        self._refresh_at: dict[int, float] = dict()
+        # Загрузки, которые идут прямо сейчас
+        self._pending: dict[int, asyncio.Future] = dict()
+        # Изменения из chat_member, пришедшие во время загрузки:
+        # ответ Bot API мог быть получен до них, поэтому повторяем их после
+        self._changes: dict[int, list[tuple[int, bool]]] = dict()
+
+    async def is_admin(self, bot: Bot, chat_id: int, user_id: int) -> bool:
+        """
+        :param bot: объект бота
+        :param chat_id: ID группы
+        :param user_id: ID пользователя
+        :return: True, если пользователь — админ или создатель группы
+        """
+        admins = self._admins.get(chat_id)
+        if admins is None:
+            admins = await self._load(bot, chat_id)
+        elif self._refresh_at[chat_id] <= time.monotonic() and chat_id not in self._pending:
+            self._start_load(bot, chat_id).add_done_callback(self._log_refresh_error)
+        return user_id in admins
+
+    def _start_load(self, bot: Bot, chat_id: int) -> asyncio.Future:
+        future = self._pending.get(chat_id)
+        if future is None:
+            self._changes[chat_id] = list()
+            future = asyncio.ensure_future(self._fetch(bot, chat_id))
+            self._pending[chat_id] = future
+
+            def cleanup(_: asyncio.Future):
+                if self._pending.get(chat_id) is future:
+                    del self._pending[chat_id]
+                    del self._changes[chat_id]
+            future.add_done_callback(cleanup)
+        return future
+
+    async def _load(self, bot: Bot, chat_id: int) -> set[int]:
+        # shield: если отменят одну из проверок, остальные всё равно дождутся списка
+        return await asyncio.shield(self._start_load(bot, chat_id))
+
+    async def _fetch(self, bot: Bot, chat_id: int) -> set[int]:
+        members = await bot.get_chat_administrators(chat_id)
+        admins = {member.user.id for member in members}
+        # Если за время загрузки группу забыли, список отдаём тем, кто ждал, но не сохраняем
+        if self._pending.get(chat_id) is not asyncio.current_task():
+            return admins
+        for user_id, is_admin in self._changes[chat_id]:
+            if is_admin:
+                admins.add(user_id)
+            else:
+                admins.discard(user_id)
+        self._admins[chat_id] = admins
+        self._refresh_at[chat_id] = time.monotonic() + self.refresh_interval * (
+            1 - self.jitter * random.random()
+        )
+        return admins
+
+    def _log_refresh_error(self, future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            # Остаётся прежний список, следующая проверка прав попробует ещё раз
+            logger.warning("Failed to refresh chat admins: %r", future.exception())
+
+    def update(self, event: ChatMemberUpdated) -> None:
+        """
+        Учитывает изменение статуса участника группы
+
+        :param event: апдейт chat_member или my_chat_member
+        """
+        chat_id = event.chat.id
+        new_status = event.new_chat_member.status
+        if event.new_chat_member.user.id == event.bot.id and new_status in GONE_STATUSES:
+            # Бота убрали из группы: проверять права там больше не придётся
+            self.forget(chat_id)
+            return
+        is_admin = new_status in ADMIN_STATUSES
+        if (event.old_chat_member.status in ADMIN_STATUSES) == is_admin:
+            return
+        user_id = event.new_chat_member.user.id
+        if chat_id in self._changes:
+            self._changes[chat_id].append((user_id, is_admin))
+        admins = self._admins.get(chat_id)
+        # Если группа ещё не загружена, её список и так придёт свежим
+        if admins is not None:
+            if is_admin:
+                admins.add(user_id)
+            else:
+                admins.discard(user_id)
+
+    def forget(self, chat_id: int) -> None:
+        """
+        Удаляет список админов группы из кэша, в том числе загрузку, которая идёт прямо сейчас
+
+        :param chat_id: ID группы
+        """
+        self._admins.pop(chat_id, None)
+        self._refresh_at.pop(chat_id, None)
+        self._pending.pop(chat_id, None)
+        self._changes.pop(chat_id, None)
+
+
+class ChatAdminsMiddleware(BaseMiddleware):
+    """
+    Обновляет кэш по каждому апдейту chat_member и my_chat_member
+    до того, как он попадёт в фильтры и хэндлеры
+    """
+
+    def __init__(self, admins: ChatAdmins):
+        self.admins = admins
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: ChatMemberUpdated,
+            data: dict[str, Any]
+    ) -> Any:
+        if event.chat.type in {"group", "supergroup"}:
+            self.admins.update(event)
+        return await handler(event, data)
+
+
+def setup_chat_admins(dp: Dispatcher, refresh_interval: float = 600) -> ChatAdmins:
+    """
+    Подключает обновление кэша админов к диспетчеру.
+    Сам кэш передаётся в хэндлеры через run_bot(..., admins=...)
+
+    :param dp: объект диспетчера
+    :param refresh_interval: раз во сколько секунд перезагружать список админов группы
+    :return: кэш админов
+    """
+    admins = ChatAdmins(refresh_interval=refresh_interval)
+    middleware = ChatAdminsMiddleware(admins)
+    dp.chat_member.outer_middleware(middleware)
+    dp.my_chat_member.outer_middleware(middleware)
+    return admins
@@ -5,8 +5,13 @@ from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 
+from admin_cache import setup_chat_admins
+from broadcast import setup_broadcaster
+from chat_info_cache import setup_chat_info_cache
 from config_reader import config
-from handlers import in_pm, bot_in_group, admin_changes_in_group, events_in_group
+from launcher import create_session, run_bot
+from subscribers import SubscriberRegistry
+from handlers import in_pm, bot_in_group, admin_changes_in_group, events_in_group, broadcast_commands
 
 
 async def main():
@@ -18,19 +23,45 @@ async def main():
     dp = Dispatcher()
     bot = Bot(
         config.bot_token.get_secret_value(),
+        session=create_session(config.bot_api_url, rate_limit=config.bot_rate_limit),
         default=DefaultBotProperties(
             parse_mode=ParseMode.HTML
         )
     )
     dp.include_routers(
-        in_pm.router, events_in_group.router,
+        in_pm.router, broadcast_commands.router, events_in_group.router,
         bot_in_group.router, admin_changes_in_group.router
     )
 
-    admins = await bot.get_chat_administrators(config.main_chat_id)
-    admin_ids = {admin.user.id for admin in admins}
+    # Админы каждой группы загружаются при первой проверке прав в ней
+    # и дальше обновляются по апдейтам chat_member
+    admins = setup_chat_admins(dp, refresh_interval=config.admins_refresh_interval)
 
-    await dp.start_polling(bot, admins=admin_ids)
+    # Результаты getChat для проверки прав бота в группах
+    chats = setup_chat_info_cache(
+        dp, ttl=config.chat_info_ttl, max_size=config.chat_info_cache_size
+    )
+
+    subscribers = SubscriberRegistry(
+        config.subscribers_db_path, commit_delay=config.subscribers_commit_delay
+    )
+    await subscribers.load()
+
+    # Незаконченная рассылка продолжится при запуске
+    broadcaster = setup_broadcaster(
+        dp, subscribers, config.broadcast_checkpoint_path,
+        rate=config.broadcast_rate, concurrency=config.broadcast_concurrency
+    )
+
+    try:
+        await run_bot(
+            bot, dp, config,
+            admins=admins, chats=chats, subscribers=subscribers, broadcaster=broadcaster
+        )
+    finally:
+        # Рассылка к этому моменту уже остановлена в dp.shutdown,
+        # так что новых изменений в списке подписчиков не будет
+        await subscribers.close()
 
 
 if __name__ == '__main__':
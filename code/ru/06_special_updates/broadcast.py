@@ -0,0 +1,389 @@
+"""
+Рассылка сообщения всем подписчикам из SubscriberRegistry.
+
+Сообщение копируется (copyMessage) каждому подписчику по возрастанию ID
+с ограничением общей скорости. Прогресс сохраняется в файл, поэтому после
+перезапуска бота рассылка продолжается с того же места (если бот упал,
+а не был остановлен, получатели с момента последнего сохранения
+прогресса могут получить сообщение повторно). Тем, кто
+заблокировал бота, сообщение не отправляется повторно: они удаляются
+из списка подписчиков при первой же ошибке
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional, Union
+
+from aiogram import Bot, Dispatcher
+from aiogram.exceptions import (
+    TelegramAPIError, TelegramForbiddenError, TelegramNetworkError,
+    TelegramRetryAfter, TelegramServerError
+)
+
+from subscribers import SubscriberRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Ограничитель скорости «ведро с токенами»: в среднем не больше rate
+    действий в секунду, но до capacity действий можно сделать подряд.
+    Ждущие получают токены в порядке очереди
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        :param rate: сколько токенов добавляется в секунду
+        :param capacity: сколько токенов помещается в ведро (по умолчанию rate)
+        """
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """
+        Ждёт и забирает один токен
+        """
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Не выдаёт токены ближайшие seconds секунд, а после паузы
+        начинает с пустого ведра, без всплеска запросов
+
+        :param seconds: длительность паузы
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+        self._updated = self._paused_until
+
+
+@dataclass
+class BroadcastState:
+    # Откуда копировать сообщение
+    from_chat_id: int
+    message_id: int
+    # Кому сообщить об окончании рассылки
+    initiator_id: int
+    # Всем подписчикам с ID не больше этого сообщение уже отправлено
+    last_user_id: int = 0
+    # Получатели с ID больше last_user_id, которым сообщение тоже уже отправлено
+    done_ahead: list[int] = field(default_factory=list)
+    sent: int = 0
+    blocked: int = 0
+    failed: int = 0
+
+
+class Broadcaster:
+    """
+    Рассылка сообщения подписчикам, одна за раз.
+
+    Ограничение Telegram — около 30 сообщений в секунду на всех,
+    в один чат — около одного сообщения в секунду. В рассылке каждый
+    подписчик получает ровно одно сообщение, поэтому ограничивать
+    достаточно общую скорость; по умолчанию она ниже предельной,
+    чтобы у бота оставался запас для ответов на обычные апдейты
+    """
+
+    def __init__(
+            self,
+            subscribers: SubscriberRegistry,
+            checkpoint_path: Union[str, Path],
+            rate: float = 25,
+            concurrency: int = 10,
+            max_retries: int = 3,
+            checkpoint_interval: float = 5,
+            report_interval: float = 30
+    ):
+        """
+        :param subscribers: список подписчиков
+        :param checkpoint_path: файл с прогрессом незаконченной рассылки
+        :param rate: сколько сообщений в секунду отправлять
+        :param concurrency: сколько сообщений может отправляться одновременно
+        :param max_retries: сколько раз повторять отправку после сетевой ошибки или RetryAfter
+        :param checkpoint_interval: раз во сколько секунд сохранять прогресс
+        :param report_interval: раз во сколько секунд писать прогресс в лог
+        """
+        self.subscribers = subscribers
+        self.checkpoint_path = Path(checkpoint_path)
+        # Ведро на один токен: сообщения идут ровно, без всплеска в начале
+        self.bucket = TokenBucket(rate, capacity=1)
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.checkpoint_interval = checkpoint_interval
+        self.report_interval = report_interval
+        self.state: Optional[BroadcastState] = None
+        self._task: Optional[asyncio.Task] = None
+        # ID получателей, которым сообщение отправляется сейчас или уже
+        # отправлено, но у кого-то с меньшим ID ещё нет -> отправлено ли
+        self._in_flight: dict[int, bool] = dict()
+        # Сколько подписчиков обработано с момента (пере)запуска рассылки и когда он был;
+        # по ним считаются скорость и оставшееся время
+        self._processed = 0
+        self._started_at = time.monotonic()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self, bot: Bot, from_chat_id: int, message_id: int, initiator_id: int) -> bool:
+        """
+        Запускает рассылку в фоне
+
+        :param bot: объект бота
+        :param from_chat_id: ID чата с сообщением для рассылки
+        :param message_id: ID сообщения для рассылки
+        :param initiator_id: ID того, кто запустил рассылку
+        :return: False, если другая рассылка ещё не закончилась
+        """
+        if self.running:
+            return False
+        self.state = BroadcastState(
+            from_chat_id=from_chat_id,
+            message_id=message_id,
+            initiator_id=initiator_id
+        )
+        self._task = asyncio.create_task(self._run(bot))
+        return True
+
+    async def resume(self, bot: Bot) -> bool:
+        """
+        Продолжает рассылку, прерванную перезапуском бота
+
+        :param bot: объект бота
+        :return: True, если была незаконченная рассылка
+        """
+        if self.running:
+            return False
+        try:
+            data = await asyncio.to_thread(self.checkpoint_path.read_text, encoding="utf-8")
+        except FileNotFoundError:
+            return False
+        self.state = BroadcastState(**json.loads(data))
+        logger.info("Resuming broadcast after user %d", self.state.last_user_id)
+        self._task = asyncio.create_task(self._run(bot))
+        return True
+
+    async def cancel(self) -> None:
+        """
+        Отменяет рассылку и удаляет её прогресс
+        """
+        await self.stop()
+        self.state = None
+        await asyncio.to_thread(self.checkpoint_path.unlink, missing_ok=True)
+
+    async def stop(self) -> None:
+        """
+        Останавливает рассылку, сохранив прогресс, чтобы продолжить её при следующем запуске
+        """
+        if not self.running:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    def status(self) -> str:
+        """
+        :return: текст с прогрессом, скоростью и оставшимся временем
+        """
+        state = self.state
+        if state is None:
+            return "Рассылок нет"
+        remaining = self.subscribers.count_after(state.last_user_id)
+        elapsed = time.monotonic() - self._started_at
+        speed = self._processed / elapsed if elapsed > 0 else 0
+        if remaining == 0 and not self._in_flight:
+            header = "Рассылка завершена"
+        elif not self.running:
+            header = "Рассылка остановлена"
+        elif speed > 0:
+            header = f"Рассылка идёт: {speed:.1f} сообщ./с, осталось ~{remaining / speed:.0f} с"
+        else:
+            header = "Рассылка идёт"
+        return (
+            f"{header}\n"
+            f"Отправлено: {state.sent}\n"
+            f"Заблокировали бота: {state.blocked}\n"
+            f"Ошибки: {state.failed}\n"
+            f"Осталось: {remaining}"
+        )
+
+    async def _run(self, bot: Bot) -> None:
+        state = self.state
+        self._started_at = time.monotonic()
+        self._processed = 0
+        self._in_flight = dict()
+        recipients: asyncio.Queue[Optional[int]] = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [
+            asyncio.create_task(self._worker(bot, recipients))
+            for _ in range(self.concurrency)
+        ]
+        stop_checkpoints = asyncio.Event()
+        checkpoints = asyncio.create_task(self._checkpoints(stop_checkpoints))
+        try:
+            cursor = state.last_user_id
+            done_ahead = set(state.done_ahead)
+            while True:
+                # Список берётся кусками: подписчики, добавленные во время
+                # рассылки, её тоже получат, если их ID ещё впереди
+                batch = self.subscribers.after(cursor, limit=500)
+                if not batch:
+                    break
+                for user_id in batch:
+                    self._in_flight[user_id] = user_id in done_ahead
+                    if user_id in done_ahead:
+                        self._advance()
+                        continue
+                    await recipients.put(user_id)
+                cursor = batch[-1]
+            for _ in workers:
+                await recipients.put(None)
+            await asyncio.gather(*workers)
+        except asyncio.CancelledError:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+            await self._save()
+            raise
+        finally:
+            # Не отменяем, а дожидаемся: запись файла в потоке отменой не прервать,
+            # и она могла бы вернуть файл уже после его удаления
+            stop_checkpoints.set()
+            await checkpoints
+
+        await asyncio.to_thread(self.checkpoint_path.unlink, missing_ok=True)
+        logger.info(
+            "Broadcast finished: sent=%d, blocked=%d, failed=%d",
+            state.sent, state.blocked, state.failed
+        )
+        try:
+            await self.bucket.acquire()
+            await bot.send_message(state.initiator_id, self.status())
+        except Exception as error:
+            logger.warning("Failed to report broadcast result: %r", error)
+
+    async def _worker(self, bot: Bot, recipients: asyncio.Queue) -> None:
+        while (user_id := await recipients.get()) is not None:
+            await self._send(bot, user_id)
+            self._in_flight[user_id] = True
+            self._advance()
+            self._processed += 1
+
+    def _advance(self) -> None:
+        # Сдвигаем отметку прогресса, пока все получатели до неё обработаны
+        in_flight = self._in_flight
+        while in_flight:
+            first_id = next(iter(in_flight))
+            if not in_flight[first_id]:
+                break
+            del in_flight[first_id]
+            self.state.last_user_id = first_id
+
+    async def _send(self, bot: Bot, user_id: int) -> None:
+        state = self.state
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            try:
+                await bot.copy_message(
+                    chat_id=user_id,
+                    from_chat_id=state.from_chat_id,
+                    message_id=state.message_id
+                )
+                state.sent += 1
+                return
+            except TelegramRetryAfter as error:
+                # Telegram просит подождать: останавливаем всех, а не только этого воркера
+                logger.warning("Flood limit hit, pausing broadcast for %d s", error.retry_after)
+                self.bucket.pause(error.retry_after)
+            except TelegramForbiddenError:
+                self.subscribers.discard(user_id)
+                state.blocked += 1
+                return
+            except (TelegramNetworkError, TelegramServerError) as error:
+                delay = 2 ** attempt
+                logger.warning("Broadcast to %d failed (%r), retrying in %d s", user_id, error, delay)
+                await asyncio.sleep(delay)
+            except TelegramAPIError as error:
+                # Например, TelegramBadRequest: чат не найден или сообщение удалено
+                logger.warning("Broadcast to %d failed: %r", user_id, error)
+                state.failed += 1
+                return
+        state.failed += 1
+
+    async def _checkpoints(self, stop: asyncio.Event) -> None:
+        last_report = time.monotonic()
+        while True:
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.checkpoint_interval)
+                return
+            except asyncio.TimeoutError:
+                pass
+            await self._save()
+            if time.monotonic() - last_report >= self.report_interval:
+                last_report = time.monotonic()
+                logger.info(self.status().replace("\n", "; "))
+
+    async def _save(self) -> None:
+        self.state.done_ahead = [user_id for user_id, done in self._in_flight.items() if done]
+        data = json.dumps(asdict(self.state))
+
+        def write():
+            # Сначала во временный файл: при падении во время записи
+            # останется предыдущий, а не наполовину записанный прогресс
+            tmp_path = self.checkpoint_path.with_name(self.checkpoint_path.name + ".tmp")
+            tmp_path.write_text(data, encoding="utf-8")
+            os.replace(tmp_path, self.checkpoint_path)
+
+        await asyncio.to_thread(write)
+
+
+def setup_broadcaster(
+        dp: Dispatcher,
+        subscribers: SubscriberRegistry,
+        checkpoint_path: Union[str, Path],
+        rate: float = 25,
+        concurrency: int = 10
+) -> Broadcaster:
+    """
+    Продолжает незаконченную рассылку при запуске бота
+    и сохраняет её прогресс при остановке.
+    Сам объект рассылки передаётся в хэндлеры через run_bot(..., broadcaster=...)
+
+    :param dp: объект диспетчера
+    :param subscribers: список подписчиков
+    :param checkpoint_path: файл с прогрессом незаконченной рассылки
+    :param rate: сколько сообщений в секунду отправлять
+    :param concurrency: сколько сообщений может отправляться одновременно
+    :return: объект рассылки
+    """
+    broadcaster = Broadcaster(
+        subscribers, checkpoint_path, rate=rate, concurrency=concurrency
+    )
+
+    async def on_startup(bot: Bot):
+        await broadcaster.resume(bot)
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(broadcaster.stop)
+    return broadcaster
@@ -0,0 +1,131 @@
+"""
+Кэш информации о группах из getChat.
+
+Нужен, чтобы массовое добавление бота в группы (или череда апдейтов
+по одной группе) не превращалось в такую же лавину запросов getChat
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.enums import ChatMemberStatus
+from aiogram.types import ChatFullInfo, ChatMemberUpdated, TelegramObject
+
+GONE_STATUSES = {ChatMemberStatus.LEFT, ChatMemberStatus.KICKED}
+
+
+class ChatInfoCache:
+    """
+    LRU-кэш результатов getChat с ограниченным временем жизни.
+
+    Одновременные запросы одной и той же группы ждут один вызов getChat,
+    а всего одновременно идёт не больше max_concurrent вызовов
+    """
+
+    def __init__(self, ttl: float = 60, max_size: int = 10000, max_concurrent: int = 10):
+        """
+        :param ttl: сколько секунд считать информацию о группе свежей.
+            Права участников по умолчанию меняются без всяких апдейтов,
+            поэтому слишком большим его делать не стоит
+        :param max_size: сколько групп хранить, давно не запрашиваемые вытесняются
+        :param max_concurrent: сколько вызовов getChat может идти одновременно
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        # ID группы -> (информация, момент истечения по time.monotonic())
+        self._chats: OrderedDict[int, tuple[ChatFullInfo, float]] = OrderedDict()
+        # Запросы, которые идут прямо сейчас
+        self._pending: dict[int, asyncio.Future] = dict()
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def get(self, bot: Bot, chat_id: int) -> ChatFullInfo:
+        """
+        Возвращает информацию о группе из кэша или запрашивает её
+
+        :param bot: объект бота
+        :param chat_id: ID группы
+        :return: результат getChat
+        """
+        cached = self._chats.get(chat_id)
+        if cached is not None and cached[1] > time.monotonic():
+            self._chats.move_to_end(chat_id)
+            return cached[0]
+
+        future = self._pending.get(chat_id)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(bot, chat_id))
+            self._pending[chat_id] = future
+
+            def cleanup(_: asyncio.Future):
+                if self._pending.get(chat_id) is future:
+                    del self._pending[chat_id]
+            future.add_done_callback(cleanup)
+        # shield: если отменят один из запросов, остальные всё равно дождутся ответа
+        return await asyncio.shield(future)
+
+    async def _fetch(self, bot: Bot, chat_id: int) -> ChatFullInfo:
+        async with self._semaphore:
+            chat = await bot.get_chat(chat_id)
+        # Если за время запроса кэш группы сбросили, ответ мог устареть:
+        # отдаём его тем, кто ждал, но не сохраняем
+        if self._pending.get(chat_id) is asyncio.current_task():
+            self._chats.pop(chat_id, None)
+            self._chats[chat_id] = (chat, time.monotonic() + self.ttl)
+            if len(self._chats) > self.max_size:
+                self._chats.popitem(last=False)
+        return chat
+
+    def invalidate(self, chat_id: int) -> None:
+        """
+        Сбрасывает кэш группы, в том числе запрос, который идёт прямо сейчас
+
+        :param chat_id: ID группы
+        """
+        self._chats.pop(chat_id, None)
+        self._pending.pop(chat_id, None)
+
+
+class ChatInfoMiddleware(BaseMiddleware):
+    """
+    Сбрасывает кэш группы, когда бота из неё убрали или в ней сменился
+    статус самого бота: после этого сохранённая информация могла устареть.
+    Остальные смены статуса участников на информацию о группе не влияют
+    """
+
+    def __init__(self, chats: ChatInfoCache):
+        self.chats = chats
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: ChatMemberUpdated,
+            data: dict[str, Any]
+    ) -> Any:
+        if event.new_chat_member.user.id == event.bot.id:
+            if event.new_chat_member.status in GONE_STATUSES or \
+                    event.old_chat_member.status not in GONE_STATUSES:
+                self.chats.invalidate(event.chat.id)
+        return await handler(event, data)
+
+
+def setup_chat_info_cache(
+        dp: Dispatcher,
+        ttl: float = 60,
+        max_size: int = 10000
+) -> ChatInfoCache:
+    """
+    Подключает сброс кэша по апдейтам my_chat_member и chat_member.
+    Сам кэш передаётся в хэндлеры через run_bot(..., chats=...)
+
+    :param dp: объект диспетчера
+    :param ttl: сколько секунд считать информацию о группе свежей
+    :param max_size: сколько групп хранить
+    :return: кэш информации о группах
+    """
+    chats = ChatInfoCache(ttl=ttl, max_size=max_size)
+    middleware = ChatInfoMiddleware(chats)
+    dp.my_chat_member.outer_middleware(middleware)
+    dp.chat_member.outer_middleware(middleware)
+    return chats
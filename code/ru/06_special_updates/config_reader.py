@@ -1,10 +1,46 @@
+from pathlib import Path
+from typing import Literal, Optional
+
 from pydantic import SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     bot_token: SecretStr
-    main_chat_id: int
+    # Раз во сколько секунд заново запрашивать список админов группы
+    # (между запросами он обновляется по апдейтам chat_member)
+    admins_refresh_interval: float = 600
+    # Сколько секунд хранить результат getChat и для скольких групп
+    chat_info_ttl: float = 60
+    chat_info_cache_size: int = 10000
+    # Файл SQLite со списком подписчиков (см. subscribers.py)
+    subscribers_db_path: Path = Path("subscribers.db")
+    # Сколько секунд копить изменения списка перед записью на диск
+    subscribers_commit_delay: float = 1.0
+    # ID тех, кто может запускать рассылки, например, [111, 222]
+    broadcast_admins: set[int] = set()
+    # Сколько сообщений рассылки отправлять в секунду (лимит Telegram — около 30)
+    broadcast_rate: float = 25
+    broadcast_concurrency: int = 10
+    # Файл с прогрессом незаконченной рассылки
+    broadcast_checkpoint_path: Path = Path("broadcast.json")
+
+    # Как получать апдейты: "polling" или "webhook" (см. launcher.py)
+    run_mode: Literal["polling", "webhook"] = "polling"
+    # Публичный HTTPS-адрес бота без пути, например, https://example.com
+    webhook_url: Optional[str] = None
+    webhook_path: str = "/webhook"
+    # Если не указан, генерируется при каждом запуске
+    webhook_secret: Optional[SecretStr] = None
+    webhook_host: str = "127.0.0.1"
+    webhook_port: int = 8080
+    # Сколько апдейтов обрабатывать одновременно
+    webhook_max_workers: int = 100
+    # Свой сервер Bot API вместо api.telegram.org (см. launcher.create_session)
+    bot_api_url: Optional[str] = None
+    # Соблюдать ли лимиты Telegram на отправку сообщений (см. ratelimit.py);
+    # для нагрузочных тестов с фейковым Bot API можно выключить
+    bot_rate_limit: bool = True
 
     model_config = SettingsConfigDict(env_file='.env', env_file_encoding='utf-8')
 
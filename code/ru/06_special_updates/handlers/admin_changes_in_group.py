@@ -4,10 +4,11 @@ from aiogram.filters.chat_member_updated import \
     RESTRICTED, MEMBER, ADMINISTRATOR, CREATOR
 from aiogram.types import ChatMemberUpdated
 
-from config_reader import config
-
 router = Router()
-router.chat_member.filter(F.chat.id == config.main_chat_id)
+router.chat_member.filter(F.chat.type.in_({"group", "supergroup"}))
+
+# Кэш админов здесь не трогаем: его уже обновил ChatAdminsMiddleware
+# (см. admin_cache.py), причём для любых смен статуса, а не только этих двух
 
 
 @router.chat_member(
@@ -18,8 +19,7 @@ router.chat_member.filter(F.chat.id == config.main_chat_id)
         (ADMINISTRATOR | CREATOR)
     )
 )
-async def admin_promoted(event: ChatMemberUpdated, admins: set[int]):
-    admins.add(event.new_chat_member.user.id)
+async def admin_promoted(event: ChatMemberUpdated):
     await event.answer(
         f"{event.new_chat_member.user.first_name} "
         f"был(а) повышен(а) до Администратора!"
@@ -36,8 +36,7 @@ async def admin_promoted(event: ChatMemberUpdated, admins: set[int]):
         (ADMINISTRATOR | CREATOR)
     )
 )
-async def admin_demoted(event: ChatMemberUpdated, admins: set[int]):
-    admins.discard(event.new_chat_member.user.id)
+async def admin_demoted(event: ChatMemberUpdated):
     await event.answer(
         f"{event.new_chat_member.user.first_name} "
         f"был(а) понижен(а) до обычного юзера!"
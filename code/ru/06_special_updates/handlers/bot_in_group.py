@@ -3,6 +3,8 @@ from aiogram.filters.chat_member_updated import \
     ChatMemberUpdatedFilter, IS_NOT_MEMBER, MEMBER, ADMINISTRATOR
 from aiogram.types import ChatMemberUpdated
 
+from chat_info_cache import ChatInfoCache
+
 router = Router()
 router.my_chat_member.filter(F.chat.type.in_({"group", "supergroup"}))
 
@@ -36,10 +38,11 @@ async def bot_added_as_admin(event: ChatMemberUpdated):
         member_status_changed=IS_NOT_MEMBER >> MEMBER
     )
 )
-async def bot_added_as_member(event: ChatMemberUpdated, bot: Bot):
+async def bot_added_as_member(event: ChatMemberUpdated, bot: Bot, chats: ChatInfoCache):
     # Вариант посложнее: бота добавили как обычного участника.
     # Но может отсутствовать право написания сообщений, поэтому заранее проверим.
-    chat_info = await bot.get_chat(event.chat.id)
+    # getChat берётся из кэша, чтобы не дёргать Bot API на каждый апдейт
+    chat_info = await chats.get(bot, event.chat.id)
     if chat_info.permissions.can_send_messages:
         await event.answer(
             text=f"Привет! Спасибо, что добавили меня в "
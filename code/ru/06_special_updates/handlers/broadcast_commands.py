@@ -0,0 +1,48 @@
+from aiogram import Bot, F, Router
+from aiogram.filters.command import Command
+from aiogram.types import Message
+
+from broadcast import Broadcaster
+from config_reader import config
+
+router = Router()
+# Запускать рассылки могут только пользователи из BROADCAST_ADMINS
+router.message.filter(
+    F.chat.type == "private",
+    F.from_user.id.in_(config.broadcast_admins)
+)
+
+
+@router.message(Command("broadcast"), F.reply_to_message)
+async def cmd_broadcast(message: Message, bot: Bot, broadcaster: Broadcaster):
+    # Рассылается сообщение, на которое ответили командой,
+    # со всем форматированием и вложениями
+    started = broadcaster.start(
+        bot,
+        from_chat_id=message.chat.id,
+        message_id=message.reply_to_message.message_id,
+        initiator_id=message.from_user.id
+    )
+    if started:
+        await message.answer("Рассылка запущена. Прогресс: /broadcast_status")
+    else:
+        await message.answer("Уже идёт другая рассылка. Прогресс: /broadcast_status")
+
+
+@router.message(Command("broadcast"))
+async def cmd_broadcast_no_reply(message: Message):
+    await message.answer("Ответьте командой /broadcast на сообщение, которое надо разослать")
+
+
+@router.message(Command("broadcast_status"))
+async def cmd_broadcast_status(message: Message, broadcaster: Broadcaster):
+    await message.answer(broadcaster.status())
+
+
+@router.message(Command("broadcast_cancel"))
+async def cmd_broadcast_cancel(message: Message, broadcaster: Broadcaster):
+    if not broadcaster.running:
+        await message.answer("Рассылка не идёт")
+        return
+    await broadcaster.cancel()
+    await message.answer("Рассылка отменена")
@@ -1,19 +1,22 @@
-from aiogram import Router, F
+from aiogram import Bot, Router, F
 from aiogram.filters.command import Command
 from aiogram.types import Message
 
+from admin_cache import ChatAdmins
+
 router = Router()
+router.message.filter(F.chat.type.in_({"group", "supergroup"}))
 
 # Вообще говоря, можно на роутер навесить кастомный фильтр
-# с проверкой, лежит ли айди вызывающего во множестве admins.
+# с проверкой admins.is_admin(...) для айди вызывающего.
 # Тогда все хэндлеры в роутере автоматически будут вызываться
-# только для людей из admins, это сократит код и избавит от лишнего if
+# только для админов, это сократит код и избавит от лишнего if
 # Но для примера сделаем через if-else, чтобы было нагляднее
 
 
 @router.message(Command("ban"), F.reply_to_message)
-async def cmd_ban(message: Message, admins: set[int]):
-    if message.from_user.id not in admins:
+async def cmd_ban(message: Message, bot: Bot, admins: ChatAdmins):
+    if not await admins.is_admin(bot, message.chat.id, message.from_user.id):
         await message.answer("У вас недостаточно прав для совершения этого действия")
     else:
         await message.chat.ban(
@@ -1,40 +1,92 @@
+from contextlib import suppress
+from typing import Optional
+
 from aiogram import F, Router
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters.callback_data import CallbackData
 from aiogram.filters.chat_member_updated import \
     ChatMemberUpdatedFilter, MEMBER, KICKED
 from aiogram.filters.command import \
     CommandStart, Command
-from aiogram.types import ChatMemberUpdated, Message
+from aiogram.types import CallbackQuery, ChatMemberUpdated, InlineKeyboardMarkup, Message
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+
+from subscribers import SubscriberRegistry
 
 router = Router()
 router.my_chat_member.filter(F.chat.type == "private")
 router.message.filter(F.chat.type == "private")
 
-# Исключительно для примера!
-# В реальной жизни используйте более надёжные
-# источники айди юзеров
-users = {111, 222}
+# Столько ID на странице /users: так сообщение
+# точно не упрётся в лимит Telegram в 4096 символов
+USERS_PER_PAGE = 100
+
+
+class UsersPage(CallbackData, prefix="users"):
+    offset: int
 
 
 @router.my_chat_member(
     ChatMemberUpdatedFilter(member_status_changed=KICKED)
 )
-async def user_blocked_bot(event: ChatMemberUpdated):
-    users.discard(event.from_user.id)
+async def user_blocked_bot(event: ChatMemberUpdated, subscribers: SubscriberRegistry):
+    subscribers.discard(event.from_user.id)
 
 
 @router.my_chat_member(
     ChatMemberUpdatedFilter(member_status_changed=MEMBER)
 )
-async def user_unblocked_bot(event: ChatMemberUpdated):
-    users.add(event.from_user.id)
+async def user_unblocked_bot(event: ChatMemberUpdated, subscribers: SubscriberRegistry):
+    subscribers.add(event.from_user.id)
 
 
 @router.message(CommandStart())
-async def cmd_start(message: Message):
+async def cmd_start(message: Message, subscribers: SubscriberRegistry):
     await message.answer("Hello")
-    users.add(message.from_user.id)
+    subscribers.add(message.from_user.id)
+
+
+def render_users_page(
+        subscribers: SubscriberRegistry,
+        offset: int
+) -> tuple[str, Optional[InlineKeyboardMarkup]]:
+    """
+    :param subscribers: список подписчиков
+    :param offset: сколько подписчиков пропустить
+    :return: текст страницы и клавиатура для перехода между страницами
+    """
+    total = len(subscribers)
+    if not total:
+        return "Подписчиков пока нет", None
+    # Список мог сократиться с тех пор, как была отправлена кнопка
+    offset = max(0, min(offset, (total - 1) // USERS_PER_PAGE * USERS_PER_PAGE))
+    user_ids = subscribers.page(offset, USERS_PER_PAGE)
+    lines = [f"Подписчики {offset + 1}–{offset + len(user_ids)} из {total}:"]
+    lines.extend(f"• {user_id}" for user_id in user_ids)
+
+    builder = InlineKeyboardBuilder()
+    if offset > 0:
+        builder.button(text="⬅️", callback_data=UsersPage(offset=max(0, offset - USERS_PER_PAGE)))
+    if offset + USERS_PER_PAGE < total:
+        builder.button(text="➡️", callback_data=UsersPage(offset=offset + USERS_PER_PAGE))
+    keyboard = builder.as_markup() if builder.export() else None
+    return "\n".join(lines), keyboard
 
 
 @router.message(Command("users"))
-async def cmd_users(message: Message):
-    await message.answer("\n".join(f"• {user_id}" for user_id in users))
+async def cmd_users(message: Message, subscribers: SubscriberRegistry):
+    text, keyboard = render_users_page(subscribers, offset=0)
+    await message.answer(text, reply_markup=keyboard)
+
+
+@router.callback_query(UsersPage.filter())
+async def users_page(
+        callback: CallbackQuery,
+        callback_data: UsersPage,
+        subscribers: SubscriberRegistry
+):
+    text, keyboard = render_users_page(subscribers, offset=callback_data.offset)
+    # Если страница не изменилась, Telegram ответит ошибкой "message is not modified"
+    with suppress(TelegramBadRequest):
+        await callback.message.edit_text(text, reply_markup=keyboard)
+    await callback.answer()
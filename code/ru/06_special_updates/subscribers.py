@@ -0,0 +1,200 @@
+"""
+Список подписчиков бота: тех, кто запустил его в личке и не заблокировал.
+
+В памяти список хранится отсортированным массивом 64-битных чисел
+(8 байт на пользователя вместо ~60 у set[int]), на диске — в SQLite.
+Изменения записываются на диск пачками в отдельном потоке
+"""
+import asyncio
+import logging
+import sqlite3
+from array import array
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# Сколько раз close() пробует записать оставшиеся изменения
+CLOSE_ATTEMPTS = 3
+
+SCHEMA = "CREATE TABLE IF NOT EXISTS subscribers (user_id INTEGER PRIMARY KEY) WITHOUT ROWID"
+
+
+class SubscriberRegistry:
+    """
+    Множество ID подписчиков с сохранением в SQLite.
+
+    add() и discard() меняют список в памяти сразу, а на диск изменения
+    попадают одной транзакцией раз в commit_delay секунд.
+    Если процесс упадёт, потеряются только изменения за эти секунды.
+    Неудачная запись повторяется через те же commit_delay секунд
+    """
+
+    def __init__(self, path: Union[str, Path], commit_delay: float = 1.0):
+        """
+        :param path: путь к файлу БД
+        :param commit_delay: сколько секунд копить изменения перед записью
+        """
+        self._executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="subscribers"
+        )
+        self._connection: Optional[sqlite3.Connection] = None
+        self._path = path
+        self.commit_delay = commit_delay
+        self._ids = array("q")
+        # ID пользователя -> подписан ли он; важно только последнее изменение
+        self._pending: dict[int, bool] = dict()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flushes: set[asyncio.Task] = set()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self._path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    async def _run(self, func):
+        def wrapper():
+            connection = self._connect()
+            with connection:
+                return func(connection)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, wrapper)
+
+    async def load(self) -> None:
+        """
+        Читает список подписчиков с диска
+        """
+        def select(db: sqlite3.Connection) -> array:
+            # Первичный ключ уже отсортирован, так что массив получается сразу готовым
+            return array("q", (row[0] for row in db.execute(
+                "SELECT user_id FROM subscribers ORDER BY user_id"
+            )))
+
+        self._ids = await self._run(select)
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, user_id: int) -> bool:
+        index = bisect_left(self._ids, user_id)
+        return index < len(self._ids) and self._ids[index] == user_id
+
+    def add(self, user_id: int) -> None:
+        """
+        Добавляет подписчика
+
+        :param user_id: ID пользователя
+        """
+        index = bisect_left(self._ids, user_id)
+        if index < len(self._ids) and self._ids[index] == user_id:
+            return
+        self._ids.insert(index, user_id)
+        self._schedule(user_id, True)
+
+    def discard(self, user_id: int) -> None:
+        """
+        Удаляет подписчика, если он есть
+
+        :param user_id: ID пользователя
+        """
+        index = bisect_left(self._ids, user_id)
+        if index == len(self._ids) or self._ids[index] != user_id:
+            return
+        del self._ids[index]
+        self._schedule(user_id, False)
+
+    def page(self, offset: int, limit: int) -> list[int]:
+        """
+        :param offset: сколько подписчиков пропустить
+        :param limit: сколько подписчиков вернуть
+        :return: ID подписчиков по возрастанию
+        """
+        return self._ids[offset:offset + limit].tolist()
+
+    def after(self, user_id: int, limit: int) -> list[int]:
+        """
+        :param user_id: ID, после которого начинать
+        :param limit: сколько подписчиков вернуть
+        :return: ID подписчиков больше user_id по возрастанию
+        """
+        index = bisect_right(self._ids, user_id)
+        return self._ids[index:index + limit].tolist()
+
+    def count_after(self, user_id: int) -> int:
+        """
+        :param user_id: ID, после которого считать
+        :return: сколько подписчиков с ID больше user_id
+        """
+        return len(self._ids) - bisect_right(self._ids, user_id)
+
+    def _schedule(self, user_id: int, subscribed: bool) -> None:
+        self._pending[user_id] = subscribed
+        self._schedule_flush()
+
+    def _schedule_flush(self) -> None:
+        if self._flush_handle is None:
+            loop = asyncio.get_running_loop()
+            self._flush_handle = loop.call_later(self.commit_delay, self._start_flush)
+
+    def _start_flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, dict()
+        task = asyncio.create_task(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: dict[int, bool]) -> None:
+        added = [(user_id,) for user_id, subscribed in batch.items() if subscribed]
+        removed = [(user_id,) for user_id, subscribed in batch.items() if not subscribed]
+
+        def write(db: sqlite3.Connection):
+            db.executemany("INSERT OR IGNORE INTO subscribers (user_id) VALUES (?)", added)
+            db.executemany("DELETE FROM subscribers WHERE user_id = ?", removed)
+
+        try:
+            await self._run(write)
+        except Exception:
+            logger.exception("Failed to save %d subscriber changes, will retry", len(batch))
+            # Возвращаем изменения в очередь, если новых по тем же пользователям не было
+            for user_id, subscribed in batch.items():
+                self._pending.setdefault(user_id, subscribed)
+            self._schedule_flush()
+
+    async def close(self) -> None:
+        """
+        Записывает накопленные изменения и закрывает БД
+        """
+        for _ in range(CLOSE_ATTEMPTS):
+            # _start_flush() заодно отменяет повтор, запланированный после ошибки
+            self._start_flush()
+            if self._flushes:
+                await asyncio.wait(self._flushes)
+            if not self._pending:
+                break
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._pending:
+            logger.error("%d subscriber changes were not saved", len(self._pending))
+
+        def close():
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, close)
+        self._executor.shutdown()
+
@@ -0,0 +1,122 @@
+"""
+Сколько обращений к FSM-хранилищу делает бот на каждое сообщение
+со стандартной FSM-мидлварью и с буферизующей (BufferedFSMContextMiddleware).
+
+Для сетевого хранилища (Redis и т.п.) каждое обращение — это отдельный
+запрос к серверу, поэтому меньше — лучше. Telegram здесь не нужен:
+апдейты подаются прямо в Dispatcher.feed_update(), а запросы к Bot API
+перехватывает сессия-заглушка.
+
+Запуск из каталога главы:
+    python -m benchmarks.fsm_round_trips
+"""
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.base import BaseSession
+from aiogram.fsm.middleware import FSMContextMiddleware
+from aiogram.fsm.storage.base import StateType, StorageKey
+from aiogram.fsm.storage.memory import DisabledEventIsolation, MemoryStorage
+from aiogram.types import Update
+
+from fsm_storage import MemoryFSMStorage, BufferedFSMContextMiddleware
+from handlers import common, ordering_food, ordering_drinks
+
+USER_ID = 1234
+FLOW = ["/start", "/food", "Суши", "Маленькую", "/food", "Пицца", "/cancel"]
+
+
+class DummySession(BaseSession):
+    async def make_request(self, bot, method, timeout=None):
+        return None
+
+    async def stream_content(self, *args, **kwargs):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+class CountingStorage(MemoryFSMStorage):
+    """
+    Хранилище в памяти, которое считает обращения к себе так,
+    как их увидел бы сетевой сервер: один вызов метода — один запрос
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.round_trips = 0
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        self.round_trips += 1
+        return await super().get_state(key)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        self.round_trips += 1
+        await super().set_state(key, state)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        self.round_trips += 1
+        return await super().get_data(key)
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        self.round_trips += 1
+        await super().set_data(key, data)
+
+    async def get_record(self, key: StorageKey) -> tuple[Optional[str], Dict[str, Any]]:
+        self.round_trips += 1
+        return await MemoryStorage.get_state(self, key), await MemoryStorage.get_data(self, key)
+
+    async def set_record(self, key: StorageKey, state: StateType, data: Dict[str, Any]) -> None:
+        self.round_trips += 1
+        await MemoryStorage.set_state(self, key, state)
+        await MemoryStorage.set_data(self, key, data)
+
+
+def make_update(update_id: int, text: str) -> Update:
+    return Update(
+        update_id=update_id,
+        message={
+            "message_id": update_id,
+            "date": datetime.now(),
+            "chat": {"id": USER_ID, "type": "private"},
+            "from": {"id": USER_ID, "is_bot": False, "first_name": "Test"},
+            "text": text,
+        }
+    )
+
+
+async def run_flow(dp: Dispatcher, bot: Bot, buffered: bool) -> list[int]:
+    storage = CountingStorage()
+    middleware_class = BufferedFSMContextMiddleware if buffered else FSMContextMiddleware
+    middleware = middleware_class(storage=storage, events_isolation=DisabledEventIsolation())
+    dp.update.outer_middleware.register(middleware)
+
+    counts = []
+    for update_id, text in enumerate(FLOW, start=1):
+        before = storage.round_trips
+        await dp.feed_update(bot, make_update(update_id, text))
+        counts.append(storage.round_trips - before)
+
+    dp.update.outer_middleware.unregister(middleware)
+    return counts
+
+
+async def main():
+    # FSM-мидлварь подключается отдельно для каждого прогона
+    dp = Dispatcher(disable_fsm=True)
+    dp.include_routers(common.router, ordering_food.router, ordering_drinks.router)
+    bot = Bot("42:TEST", session=DummySession())
+
+    default = await run_flow(dp, bot, buffered=False)
+    buffered = await run_flow(dp, bot, buffered=True)
+    print(f"{'message':<12} {'default':>8} {'buffered':>9}")
+    for text, before, after in zip(FLOW, default, buffered):
+        print(f"{text:<12} {before:>8} {after:>9}")
+    print(f"{'total':<12} {sum(default):>8} {sum(buffered):>9}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
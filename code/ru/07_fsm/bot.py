@@ -2,13 +2,14 @@ import asyncio
 import logging
 
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 # Доп. импорт для раздела про стратегии FSM
 from aiogram.fsm.strategy import FSMStrategy
 
 # файл config_reader.py можно взять из репозитория
 # пример — в первой главе
 from config_reader import config
+from launcher import create_session, run_bot
+from fsm_storage import FSMSessionTTL, create_fsm_storage, setup_buffered_fsm, setup_fsm_sweeper
 from handlers import common, ordering_food, ordering_drinks
 
 
@@ -20,15 +21,33 @@ async def main():
 
     # Если не указать storage, то по умолчанию всё равно будет MemoryStorage
     # Но явное лучше неявного =]
-    dp = Dispatcher(storage=MemoryStorage())
+    # Тип хранилища выбирается в .env, см. файл env_dist
+    storage = create_fsm_storage(
+        storage_type=config.fsm_storage,
+        sqlite_path=config.fsm_sqlite_path,
+        redis_url=config.fsm_redis_url,
+        redis_pool_size=config.fsm_redis_pool_size,
+        # Брошенный на полпути заказ не должен висеть в хранилище вечно
+        ttl=FSMSessionTTL(config.fsm_ttl, default=config.fsm_ttl_default)
+    )
+    # Стандартную FSM-мидлварь заменяем на буферизующую: она читает
+    # состояние с данными один раз и записывает изменения одним запросом
+    # после хэндлера, вместо запроса на каждый вызов state.*()
+    dp = Dispatcher(storage=storage, disable_fsm=True)
+    setup_buffered_fsm(dp)
+    # Фоновая очистка истёкших сессий; статистика пишется в лог
+    setup_fsm_sweeper(dp, interval=config.fsm_sweep_interval)
     # Для выбора другой стратегии FSM:
-    # dp = Dispatcher(storage=MemoryStorage(), fsm_strategy=FSMStrategy.CHAT)
-    bot = Bot(config.bot_token.get_secret_value())
+    # dp = Dispatcher(storage=storage, fsm_strategy=FSMStrategy.CHAT, disable_fsm=True)
+    bot = Bot(
+        config.bot_token.get_secret_value(),
+        session=create_session(config.bot_api_url, rate_limit=config.bot_rate_limit)
+    )
 
     dp.include_routers(common.router, ordering_food.router, ordering_drinks.router)
     # сюда импортируйте ваш собственный роутер для напитков
 
-    await dp.start_polling(bot)
+    await run_bot(bot, dp, config)
 
 
 if __name__ == '__main__':
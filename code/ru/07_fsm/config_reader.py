@@ -1,9 +1,41 @@
+from pathlib import Path
+from typing import Literal, Optional
+
 from pydantic import SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     bot_token: SecretStr
+    # Где хранить состояния FSM: "memory", "sqlite" или "redis"
+    fsm_storage: Literal["memory", "sqlite", "redis"] = "memory"
+    fsm_sqlite_path: Path = Path("fsm.db")
+    # Подойдёт любой сервер с протоколом Redis, например, KeyDB
+    fsm_redis_url: str = "redis://localhost:6379/0"
+    fsm_redis_pool_size: int = 10
+    # Время жизни брошенных сессий в секундах: {имя группы состояний: TTL}
+    fsm_ttl: dict[str, int] = {"OrderFood": 3600}
+    # TTL для всех остальных сессий (None — не удалять)
+    fsm_ttl_default: Optional[int] = None
+    # Как часто искать и удалять истёкшие сессии (для memory и sqlite)
+    fsm_sweep_interval: int = 60
+
+    # Как получать апдейты: "polling" или "webhook" (см. launcher.py)
+    run_mode: Literal["polling", "webhook"] = "polling"
+    # Публичный HTTPS-адрес бота без пути, например, https://example.com
+    webhook_url: Optional[str] = None
+    webhook_path: str = "/webhook"
+    # Если не указан, генерируется при каждом запуске
+    webhook_secret: Optional[SecretStr] = None
+    webhook_host: str = "127.0.0.1"
+    webhook_port: int = 8080
+    # Сколько апдейтов обрабатывать одновременно
+    webhook_max_workers: int = 100
+    # Свой сервер Bot API вместо api.telegram.org (см. launcher.create_session)
+    bot_api_url: Optional[str] = None
+    # Соблюдать ли лимиты Telegram на отправку сообщений (см. ratelimit.py);
+    # для нагрузочных тестов с фейковым Bot API можно выключить
+    bot_rate_limit: bool = True
 
     model_config = SettingsConfigDict(env_file='.env', env_file_encoding='utf-8')
 
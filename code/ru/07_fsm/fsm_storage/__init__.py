@@ -0,0 +1,54 @@
+from pathlib import Path
+from typing import Literal, Optional
+
+from aiogram.fsm.storage.base import BaseStorage
+
+from .base import RecordStorageMixin
+from .buffered import BufferedFSMContext, BufferedFSMContextMiddleware, setup_buffered_fsm
+from .memory import MemoryFSMStorage
+from .sqlite import SQLiteFSMStorage
+from .ttl import FSMSessionTTL, run_sweeper, setup_fsm_sweeper
+
+FSMStorageType = Literal["memory", "sqlite", "redis"]
+
+
+def create_fsm_storage(
+        storage_type: FSMStorageType,
+        sqlite_path: Path,
+        redis_url: str,
+        redis_pool_size: int,
+        ttl: Optional[FSMSessionTTL] = None
+) -> BaseStorage:
+    """
+    Создаёт FSM-хранилище нужного типа
+
+    :param storage_type: "memory", "sqlite" или "redis"
+    :param sqlite_path: путь к файлу БД (для "sqlite")
+    :param redis_url: адрес сервера (для "redis")
+    :param redis_pool_size: размер пула соединений (для "redis")
+    :param ttl: (опционально) время жизни брошенных сессий
+    :return: объект хранилища для Dispatcher(storage=...)
+    """
+    if storage_type == "sqlite":
+        return SQLiteFSMStorage(sqlite_path, ttl=ttl)
+    if storage_type == "redis":
+        # Пакет redis нужен только для этого варианта,
+        # поэтому импортируем его, только когда он действительно нужен
+        from .redis import RedisFSMStorage
+        return RedisFSMStorage.from_pool(redis_url, pool_size=redis_pool_size, ttl=ttl)
+    return MemoryFSMStorage(ttl=ttl)
+
+
+__all__ = [
+    "FSMStorageType",
+    "FSMSessionTTL",
+    "run_sweeper",
+    "setup_fsm_sweeper",
+    "RecordStorageMixin",
+    "BufferedFSMContext",
+    "BufferedFSMContextMiddleware",
+    "setup_buffered_fsm",
+    "MemoryFSMStorage",
+    "SQLiteFSMStorage",
+    "create_fsm_storage"
+]
@@ -0,0 +1,135 @@
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.fsm.context import FSMContext
+from aiogram.fsm.middleware import FSMContextMiddleware
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import DEFAULT_DESTINY, BaseStorage, StateType, StorageKey
+from aiogram.types import TelegramObject
+
+from .base import RecordStorageMixin
+
+
+class BufferedFSMContext(FSMContext):
+    """
+    FSMContext, который читает состояние и данные из хранилища один раз,
+    а все изменения копит у себя до вызова flush().
+
+    Для хэндлера ничего не меняется: те же set_state(), update_data(),
+    clear() и т.д., только без отдельного запроса к хранилищу на каждый вызов
+    """
+
+    def __init__(self, storage: BaseStorage, key: StorageKey):
+        super().__init__(storage=storage, key=key)
+        self._loaded = False
+        self._changed = False
+        self._state: Optional[str] = None
+        self._data: Dict[str, Any] = {}
+
+    async def _load(self) -> None:
+        if self._loaded:
+            return
+        if isinstance(self.storage, RecordStorageMixin):
+            self._state, self._data = await self.storage.get_record(self.key)
+        else:
+            self._state = await self.storage.get_state(self.key)
+            self._data = await self.storage.get_data(self.key)
+        self._loaded = True
+
+    async def get_state(self) -> Optional[str]:
+        await self._load()
+        return self._state
+
+    async def set_state(self, state: StateType = None) -> None:
+        await self._load()
+        self._state = state.state if isinstance(state, State) else state
+        self._changed = True
+
+    async def get_data(self) -> Dict[str, Any]:
+        await self._load()
+        return self._data.copy()
+
+    async def set_data(self, data: Dict[str, Any]) -> None:
+        await self._load()
+        self._data = data.copy()
+        self._changed = True
+
+    async def update_data(
+            self,
+            data: Optional[Dict[str, Any]] = None,
+            **kwargs: Any
+    ) -> Dict[str, Any]:
+        await self._load()
+        if data:
+            kwargs.update(data)
+        self._data.update(kwargs)
+        self._changed = True
+        return self._data.copy()
+
+    async def flush(self) -> None:
+        """
+        Записывает накопленные изменения одной операцией.
+        Если ничего не менялось, к хранилищу не обращается
+        """
+        if not self._changed:
+            return
+        if isinstance(self.storage, RecordStorageMixin):
+            await self.storage.set_record(self.key, self._state, self._data)
+        else:
+            await self.storage.set_state(self.key, self._state)
+            await self.storage.set_data(self.key, self._data)
+        self._changed = False
+
+
+class BufferedFSMContextMiddleware(FSMContextMiddleware):
+    """
+    Замена стандартной FSM-мидлвари: отдаёт хэндлерам BufferedFSMContext
+    и сохраняет изменения после того, как хэндлер успешно отработал.
+    Если хэндлер упал с ошибкой, ничего не записывается.
+
+    Буферизуется только контекст текущего апдейта: dp.fsm.get_context(),
+    вызванный вне хэндлера, возвращает обычный FSMContext,
+    который пишет в хранилище сразу
+    """
+
+    def resolve_event_context(
+            self,
+            bot: Bot,
+            data: Dict[str, Any],
+            destiny: str = DEFAULT_DESTINY
+    ) -> Optional[FSMContext]:
+        context = super().resolve_event_context(bot, data, destiny)
+        if context is None:
+            return None
+        return BufferedFSMContext(storage=context.storage, key=context.key)
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        async def handler_with_flush(event: TelegramObject, data: Dict[str, Any]) -> Any:
+            result = await handler(event, data)
+            context = data.get("state")
+            if isinstance(context, BufferedFSMContext):
+                await context.flush()
+            return result
+
+        return await super().__call__(handler_with_flush, event, data)
+
+
+def setup_buffered_fsm(dp: Dispatcher) -> None:
+    """
+    Подключает BufferedFSMContextMiddleware к диспетчеру.
+    Диспетчер должен быть создан с disable_fsm=True,
+    иначе стандартная FSM-мидлварь тоже останется на месте
+
+    :param dp: объект диспетчера
+    """
+    dp.fsm = BufferedFSMContextMiddleware(
+        storage=dp.fsm.storage,
+        strategy=dp.fsm.strategy,
+        events_isolation=dp.fsm.events_isolation
+    )
+    dp.update.outer_middleware(dp.fsm)
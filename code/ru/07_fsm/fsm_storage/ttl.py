@@ -0,0 +1,111 @@
+import asyncio
+import logging
+from collections import Counter
+from typing import Mapping, Optional, Protocol, Union
+
+from aiogram import Dispatcher
+from aiogram.fsm.state import StatesGroup
+
+logger = logging.getLogger(__name__)
+
+
+class FSMSessionTTL:
+    """
+    Время жизни FSM-сессий для каждой группы состояний.
+
+    Отсчёт идёт от последней записи в сессию: если пользователь начал,
+    например, заказ еды и пропал, то через указанное время
+    его состояние и данные будут удалены
+    """
+
+    def __init__(
+            self,
+            ttls: Mapping[Union[str, type[StatesGroup]], float],
+            default: Optional[float] = None
+    ):
+        """
+        :param ttls: словарь {группа состояний или её имя: TTL в секундах}
+        :param default: (опционально) TTL для всех остальных записей,
+        включая записи без состояния, но с данными
+        """
+        self.ttls: dict[str, float] = {
+            group if isinstance(group, str) else group.__full_group_name__: seconds
+            for group, seconds in ttls.items()
+        }
+        self.default = default
+
+    @staticmethod
+    def group_of(state: Optional[str]) -> str:
+        """
+        Возвращает имя группы состояния, например, "OrderFood"
+        для "OrderFood:choosing_food_name"
+
+        :param state: состояние в виде строки
+        :return: имя группы или пустая строка, если состояния нет
+        """
+        if not state:
+            return ""
+        return state.split(":", 1)[0]
+
+    def get_ttl(self, state: Optional[str]) -> Optional[float]:
+        """
+        :param state: состояние в виде строки
+        :return: TTL в секундах или None, если сессия не должна истекать
+        """
+        return self.ttls.get(self.group_of(state), self.default)
+
+
+class SweepableStorage(Protocol):
+    expired: Counter
+
+    async def sweep(self) -> int: ...
+
+    async def count_sessions(self) -> int: ...
+
+
+async def run_sweeper(storage: SweepableStorage, interval: float):
+    """
+    Периодически удаляет истёкшие сессии и пишет в лог статистику
+
+    :param storage: хранилище с методами sweep() и count_sessions()
+    :param interval: пауза между проходами в секундах
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            expired = await storage.sweep()
+            active = await storage.count_sessions()
+        except Exception:
+            # Одна неудачная уборка не должна останавливать все следующие
+            logger.exception("FSM sweep failed")
+            continue
+        log = logger.info if expired else logger.debug
+        log(
+            "FSM sweep: expired=%d active=%d expired_total=%s",
+            expired, active, dict(storage.expired)
+        )
+
+
+def setup_fsm_sweeper(dp: Dispatcher, interval: float = 60) -> None:
+    """
+    Запускает run_sweeper() вместе с поллингом и останавливает при выключении.
+    Для хранилищ без sweep() (например, Redis, который удаляет ключи сам)
+    ничего не делает
+
+    :param dp: объект диспетчера
+    :param interval: пауза между проходами в секундах
+    """
+    storage = dp.fsm.storage
+    if not hasattr(storage, "sweep"):
+        return
+    tasks: set[asyncio.Task] = set()
+
+    async def on_startup():
+        tasks.add(asyncio.create_task(run_sweeper(storage, interval)))
+
+    async def on_shutdown():
+        for task in tasks:
+            task.cancel()
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
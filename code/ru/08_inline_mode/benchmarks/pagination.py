@@ -0,0 +1,46 @@
+"""
+Замер стоимости одной страницы Paginator в зависимости от её позиции.
+
+Запуск из каталога главы:
+    python -m benchmarks.pagination
+
+Если стоимость страницы не зависит от позиции, то числа во всех строках
+таблицы будут примерно одинаковыми — и для первой, и для последней страницы
+"""
+from timeit import repeat
+from typing import Iterator
+
+from pagination import Paginator
+
+TOTAL_ITEMS = 10 ** 6
+PAGE_SIZE = 50
+POSITIONS = (0, 10 ** 3, 10 ** 5, TOTAL_ITEMS // 2, TOTAL_ITEMS - PAGE_SIZE)
+
+
+def generate_items(start_num: int) -> Iterator[int]:
+    yield from range(start_num, TOTAL_ITEMS)
+
+
+def measure(paginator: Paginator, position: int, number: int = 2000) -> float:
+    offset = paginator.encode_offset(position) if position else ""
+    timings = repeat(lambda: paginator.get_page(offset), number=number, repeat=5)
+    # Лучший из повторов, в микросекундах на одну страницу
+    return min(timings) / number * 1_000_000
+
+
+def main():
+    sources = {
+        "range": range(TOTAL_ITEMS),
+        "list": list(range(TOTAL_ITEMS)),
+        "generator": generate_items,
+    }
+    print(f"{TOTAL_ITEMS} items, {PAGE_SIZE} per page, µs per page")
+    print(f"{'position':>10} " + " ".join(f"{name:>10}" for name in sources))
+    paginators = {name: Paginator(source, page_size=PAGE_SIZE) for name, source in sources.items()}
+    for position in POSITIONS:
+        row = [measure(paginator, position) for paginator in paginators.values()]
+        print(f"{position:>10} " + " ".join(f"{value:>10.2f}" for value in row))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,17 @@ import asyncio
 import logging
 
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 
 # файл config_reader.py можно взять из репозитория
 # пример — в первой главе
 from config_reader import config
+from launcher import create_session, run_bot
+from fsm_storage import FSMSessionTTL, create_fsm_storage, setup_buffered_fsm, setup_fsm_sweeper
+from instrumentation import setup_instrumentation
 from handlers import common, save_text, save_images, \
     inline_mode, delete_data, inline_pagination_demo, \
-    inline_chosen_result_demo
+    inline_chosen_result_demo, inline_search
+from storage import setup_storage, close_storage, SQLiteDataStorage
 
 
 async def main():
@@ -18,17 +21,51 @@ async def main():
         format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
     )
 
-    dp = Dispatcher(storage=MemoryStorage())
-    bot = Bot(config.bot_token.get_secret_value())
+    if config.storage_type == "sqlite":
+        setup_storage(SQLiteDataStorage(config.storage_path))
+
+    fsm_storage = create_fsm_storage(
+        storage_type=config.fsm_storage,
+        sqlite_path=config.fsm_sqlite_path,
+        redis_url=config.fsm_redis_url,
+        redis_pool_size=config.fsm_redis_pool_size,
+        # Брошенное на полпути сохранение не должно висеть в хранилище вечно
+        ttl=FSMSessionTTL(config.fsm_ttl, default=config.fsm_ttl_default)
+    )
+    # Буферизующая FSM-мидлварь вместо стандартной: одно чтение
+    # и одна запись в хранилище на апдейт (подробнее в главе про FSM)
+    dp = Dispatcher(storage=fsm_storage, disable_fsm=True)
+    setup_buffered_fsm(dp)
+    # Фоновая очистка истёкших сессий; статистика пишется в лог
+    setup_fsm_sweeper(dp, interval=config.fsm_sweep_interval)
+    bot = Bot(
+        config.bot_token.get_secret_value(),
+        session=create_session(config.bot_api_url, rate_limit=config.bot_rate_limit)
+    )
 
     dp.include_routers(
         common.router,
         save_text.router, save_images.router, delete_data.router,
         inline_mode.router, inline_pagination_demo.router,
-        inline_chosen_result_demo.router
+        inline_chosen_result_demo.router,
+        # Поиск ловит любые инлайн-запросы, поэтому он последний
+        inline_search.router
     )
 
-    await dp.start_polling(bot)
+    # Замеры времени подключаются последними, когда все роутеры,
+    # фильтры и мидлвари уже на месте
+    if config.timing_enabled:
+        setup_instrumentation(
+            dp, bot,
+            host=config.timing_metrics_host,
+            port=config.timing_metrics_port,
+            log_interval=config.timing_log_interval
+        )
+
+    try:
+        await run_bot(bot, dp, config)
+    finally:
+        await close_storage()
 
 
 if __name__ == '__main__':
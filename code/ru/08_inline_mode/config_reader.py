@@ -1,9 +1,56 @@
+from pathlib import Path
+from typing import Literal, Optional
+
 from pydantic import SecretStr
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
     bot_token: SecretStr
+    # Где хранить сохранённые ссылки и картинки:
+    # "memory" (сбрасывается при перезапуске) или "sqlite"
+    storage_type: Literal["memory", "sqlite"] = "sqlite"
+    storage_path: Path = Path("storage.db")
+    # Сколько готовых результатов инлайн-режима держать в кэше (суммарно)
+    inline_cache_max_results: int = 10_000
+    # Где хранить состояния FSM: "memory", "sqlite" или "redis"
+    fsm_storage: Literal["memory", "sqlite", "redis"] = "memory"
+    fsm_sqlite_path: Path = Path("fsm.db")
+    # Подойдёт любой сервер с протоколом Redis, например, KeyDB
+    fsm_redis_url: str = "redis://localhost:6379/0"
+    fsm_redis_pool_size: int = 10
+    # Время жизни брошенных сессий в секундах: {имя группы состояний: TTL}
+    fsm_ttl: dict[str, int] = {"SaveCommon": 600, "DeleteCommon": 600, "TextSave": 1800}
+    # TTL для всех остальных сессий (None — не удалять)
+    fsm_ttl_default: Optional[int] = None
+    # Как часто искать и удалять истёкшие сессии (для memory и sqlite)
+    fsm_sweep_interval: int = 60
+
+    # Как получать апдейты: "polling" или "webhook" (см. launcher.py)
+    run_mode: Literal["polling", "webhook"] = "polling"
+    # Публичный HTTPS-адрес бота без пути, например, https://example.com
+    webhook_url: Optional[str] = None
+    webhook_path: str = "/webhook"
+    # Если не указан, генерируется при каждом запуске
+    webhook_secret: Optional[SecretStr] = None
+    webhook_host: str = "127.0.0.1"
+    webhook_port: int = 8080
+    # Сколько апдейтов обрабатывать одновременно
+    webhook_max_workers: int = 100
+    # Свой сервер Bot API вместо api.telegram.org (см. launcher.create_session)
+    bot_api_url: Optional[str] = None
+    # Соблюдать ли лимиты Telegram на отправку сообщений (см. ratelimit.py);
+    # для нагрузочных тестов с фейковым Bot API можно выключить
+    bot_rate_limit: bool = True
+
+    # Замеры времени фильтров, мидлварей, хэндлеров и запросов к Bot API
+    # (см. instrumentation.py). Выключено — значит, не подключено вовсе
+    timing_enabled: bool = False
+    timing_metrics_host: str = "127.0.0.1"
+    # Порт для GET /metrics (None — не поднимать HTTP-сервер)
+    timing_metrics_port: Optional[int] = 9101
+    # Как часто писать сводку в лог, в секундах (None — не писать)
+    timing_log_interval: Optional[int] = None
 
     model_config = SettingsConfigDict(env_file='.env', env_file_encoding='utf-8')
 
@@ -0,0 +1,37 @@
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.storage.base import StateType, StorageKey
+
+
+class RecordStorageMixin:
+    """
+    Добавляет FSM-хранилищу чтение и запись состояния вместе с данными.
+
+    По умолчанию это просто два обычных вызова, но сетевые хранилища
+    переопределяют эти методы и укладываются в один запрос к серверу
+    """
+
+    async def get_record(self, key: StorageKey) -> tuple[Optional[str], Dict[str, Any]]:
+        """
+        Получает состояние и данные
+
+        :param key: ключ записи в хранилище
+        :return: текущее состояние и копия данных
+        """
+        return await self.get_state(key), await self.get_data(key)
+
+    async def set_record(
+            self,
+            key: StorageKey,
+            state: StateType,
+            data: Dict[str, Any]
+    ) -> None:
+        """
+        Записывает состояние и данные
+
+        :param key: ключ записи в хранилище
+        :param state: новое состояние (None — сбросить)
+        :param data: новые данные (полностью заменяют старые)
+        """
+        await self.set_state(key, state)
+        await self.set_data(key, data)
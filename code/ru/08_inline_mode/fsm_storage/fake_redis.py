@@ -0,0 +1,202 @@
+"""
+Крошечный сервер с протоколом Redis, работающий прямо в процессе.
+
+Нужен для тестов и локальной разработки, когда настоящего Redis под рукой нет.
+Понимает только те команды, которые использует FSM-хранилище:
+GET, SET (с EX/PX), DEL, EXISTS, EXPIRE, PEXPIRE, PERSIST, TTL, PTTL,
+MULTI/EXEC/DISCARD и несколько служебных.
+
+Запуск отдельным процессом:
+    python -m fsm_storage.fake_redis --port 6379
+"""
+import argparse
+import asyncio
+import time
+from typing import Optional, Union
+
+Reply = Union[None, int, bytes, str, Exception, list]
+
+
+class FakeRedisServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        """
+        :param host: адрес для прослушивания
+        :param port: порт (0 — выбрать свободный автоматически)
+        """
+        self.host = host
+        self.port = port
+        # ключ -> (значение, момент истечения по time.monotonic() или None)
+        self.data: dict[bytes, tuple[bytes, Optional[float]]] = dict()
+        # Пригодится, чтобы считать обращения к хранилищу
+        self.commands_processed = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"redis://{self.host}:{self.port}/0"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle_client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self) -> "FakeRedisServer":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.stop()
+
+    # --- Протокол RESP ---
+
+    @staticmethod
+    async def _read_command(reader: asyncio.StreamReader) -> Optional[list[bytes]]:
+        line = await reader.readline()
+        if not line:
+            return None
+        if not line.startswith(b"*"):
+            # "Inline"-команда, например, из telnet
+            return line.strip().split()
+        command = []
+        for _ in range(int(line[1:])):
+            size = int((await reader.readline())[1:])
+            command.append((await reader.readexactly(size + 2))[:-2])
+        return command
+
+    @classmethod
+    def _encode(cls, reply: Reply) -> bytes:
+        if reply is None:
+            return b"$-1\r\n"
+        if isinstance(reply, Exception):
+            return f"-{reply}\r\n".encode()
+        if isinstance(reply, str):
+            return f"+{reply}\r\n".encode()
+        if isinstance(reply, int):
+            return f":{reply}\r\n".encode()
+        if isinstance(reply, bytes):
+            return b"$%d\r\n%s\r\n" % (len(reply), reply)
+        return b"*%d\r\n" % len(reply) + b"".join(cls._encode(item) for item in reply)
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        transaction: Optional[list[list[bytes]]] = None
+        try:
+            while True:
+                command = await self._read_command(reader)
+                if command is None:
+                    break
+                if not command:
+                    continue
+                name = command[0].upper()
+                if name == b"MULTI":
+                    transaction = []
+                    reply = "OK"
+                elif name == b"EXEC":
+                    reply = [self.execute(queued) for queued in transaction or []]
+                    transaction = None
+                elif name == b"DISCARD":
+                    transaction = None
+                    reply = "OK"
+                elif transaction is not None:
+                    transaction.append(command)
+                    reply = "QUEUED"
+                else:
+                    reply = self.execute(command)
+                writer.write(self._encode(reply))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # --- Команды ---
+
+    def _get_alive(self, key: bytes) -> Optional[bytes]:
+        item = self.data.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, command: list[bytes]) -> Reply:
+        """
+        Выполняет одну команду и возвращает ответ
+
+        :param command: имя команды и аргументы
+        :return: ответ в виде объекта Python
+        """
+        self.commands_processed += 1
+        name, args = command[0].upper(), command[1:]
+        if name == b"PING":
+            return args[0] if args else "PONG"
+        if name in (b"SELECT", b"CLIENT", b"WATCH", b"UNWATCH"):
+            return "OK"
+        if name in (b"FLUSHDB", b"FLUSHALL"):
+            self.data.clear()
+            return "OK"
+        if name == b"GET":
+            return self._get_alive(args[0])
+        if name == b"SET":
+            return self._set(args)
+        if name == b"DEL":
+            return sum(self.data.pop(key, None) is not None for key in args)
+        if name == b"EXISTS":
+            return sum(self._get_alive(key) is not None for key in args)
+        if name in (b"EXPIRE", b"PEXPIRE"):
+            value = self._get_alive(args[0])
+            if value is None:
+                return 0
+            seconds = int(args[1]) / (1000 if name == b"PEXPIRE" else 1)
+            self.data[args[0]] = (value, time.monotonic() + seconds)
+            return 1
+        if name == b"PERSIST":
+            value = self._get_alive(args[0])
+            if value is None or self.data[args[0]][1] is None:
+                return 0
+            self.data[args[0]] = (value, None)
+            return 1
+        if name in (b"TTL", b"PTTL"):
+            if self._get_alive(args[0]) is None:
+                return -2
+            expires_at = self.data[args[0]][1]
+            if expires_at is None:
+                return -1
+            left = expires_at - time.monotonic()
+            return int(left * 1000) if name == b"PTTL" else int(left)
+        return Exception(f"ERR unknown command '{name.decode()}'")
+
+    def _set(self, args: list[bytes]) -> Reply:
+        key, value, options = args[0], args[1], [item.upper() for item in args[2:]]
+        expires_at = None
+        if b"EX" in options:
+            expires_at = time.monotonic() + int(args[2 + options.index(b"EX") + 1])
+        elif b"PX" in options:
+            expires_at = time.monotonic() + int(args[2 + options.index(b"PX") + 1]) / 1000
+        exists = self._get_alive(key) is not None
+        if (b"NX" in options and exists) or (b"XX" in options and not exists):
+            return None
+        self.data[key] = (value, expires_at)
+        return "OK"
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="In-process fake Redis server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=6379)
+    args = parser.parse_args()
+
+    server = FakeRedisServer(args.host, args.port)
+    await server.start()
+    print(f"Fake Redis is listening on {server.url}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.storage.base import StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from .base import RecordStorageMixin
+from .ttl import FSMSessionTTL
+
+
+class MemoryFSMStorage(RecordStorageMixin, MemoryStorage):
+    """
+    Обычное хранилище aiogram в памяти.
+    Всё теряется при перезапуске и не видно другим процессам.
+
+    В отличие от оригинала, не создаёт пустые записи при чтении
+    и удаляет брошенные сессии, если задан TTL
+    """
+
+    def __init__(self, ttl: Optional[FSMSessionTTL] = None):
+        """
+        :param ttl: (опционально) время жизни сессий по группам состояний
+        """
+        super().__init__()
+        self.ttl = ttl
+        # ключ -> момент истечения по time.monotonic()
+        self.expires_at: dict[StorageKey, float] = dict()
+        # имя группы состояний -> сколько сессий истекло
+        self.expired: Counter[str] = Counter()
+
+    def _expire(self, key: StorageKey) -> None:
+        record = self.storage.pop(key, None)
+        self.expires_at.pop(key, None)
+        if record is not None:
+            self.expired[FSMSessionTTL.group_of(record.state)] += 1
+
+    def _check_expired(self, key: StorageKey) -> None:
+        expires_at = self.expires_at.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._expire(key)
+
+    def _after_write(self, key: StorageKey) -> None:
+        record = self.storage[key]
+        if record.state is None and not record.data:
+            # Пустые записи не храним, чтобы словарь не рос бесконечно
+            del self.storage[key]
+            self.expires_at.pop(key, None)
+            return
+        seconds = self.ttl.get_ttl(record.state) if self.ttl else None
+        if seconds is None:
+            self.expires_at.pop(key, None)
+        else:
+            self.expires_at[key] = time.monotonic() + seconds
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        await super().set_state(key, state)
+        self._after_write(key)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        self._check_expired(key)
+        record = self.storage.get(key)
+        return record.state if record else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        await super().set_data(key, data)
+        self._after_write(key)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        self._check_expired(key)
+        record = self.storage.get(key)
+        return record.data.copy() if record else {}
+
+    async def sweep(self) -> int:
+        """
+        Удаляет все истёкшие сессии
+
+        :return: количество удалённых сессий
+        """
+        now = time.monotonic()
+        keys = [key for key, expires_at in self.expires_at.items() if expires_at <= now]
+        for key in keys:
+            self._expire(key)
+        return len(keys)
+
+    async def count_sessions(self) -> int:
+        """
+        :return: количество хранимых сессий
+        """
+        return len(self.storage)
@@ -0,0 +1,207 @@
+import asyncio
+import json
+import sqlite3
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+from .base import RecordStorageMixin
+from .ttl import FSMSessionTTL
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL DEFAULT '{}',
+    expires_at REAL
+) WITHOUT ROWID;
+"""
+
+# Для баз, созданных до появления TTL
+MIGRATIONS = (
+    "ALTER TABLE fsm ADD COLUMN expires_at REAL",
+)
+
+# Истёкшие записи не видны при чтении, даже если ещё не удалены
+ALIVE = "(expires_at IS NULL OR expires_at > ?)"
+
+
+class SQLiteFSMStorage(RecordStorageMixin, BaseStorage):
+    """
+    FSM-хранилище в SQLite-файле: переживает перезапуски,
+    но подходит только для одного процесса бота.
+
+    Модуль sqlite3 синхронный, поэтому запросы
+    выполняются в отдельном (единственном) потоке
+    """
+
+    def __init__(
+            self,
+            path: Path,
+            key_builder: Optional[KeyBuilder] = None,
+            ttl: Optional[FSMSessionTTL] = None
+    ):
+        """
+        :param path: путь к файлу БД
+        :param key_builder: (опционально) построитель ключей
+        :param ttl: (опционально) время жизни сессий по группам состояний
+        """
+        self._path = path
+        self._connection: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite-fsm")
+        self.key_builder = key_builder or DefaultKeyBuilder(with_destiny=True)
+        self.ttl = ttl
+        # имя группы состояний -> сколько сессий истекло
+        self.expired: Counter[str] = Counter()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self._path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            columns = {row[1] for row in connection.execute("PRAGMA table_info(fsm)")}
+            if "expires_at" not in columns:
+                for migration in MIGRATIONS:
+                    connection.execute(migration)
+            self._connection = connection
+        return self._connection
+
+    async def _run(self, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        def wrapper():
+            connection = self._connect()
+            with connection:
+                return func(connection)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, wrapper)
+
+    @staticmethod
+    def _state_to_str(state: StateType) -> Optional[str]:
+        return state.state if isinstance(state, State) else state
+
+    def _after_write(self, db: sqlite3.Connection, db_key: str):
+        # Пустые записи не храним, чтобы таблица не росла бесконечно
+        db.execute(
+            "DELETE FROM fsm WHERE key = ? AND state IS NULL AND data = '{}'",
+            (db_key,)
+        )
+        if self.ttl is None:
+            db.execute(
+                "UPDATE fsm SET expires_at = NULL WHERE key = ? AND expires_at IS NOT NULL",
+                (db_key,)
+            )
+            return
+        # TTL зависит от итогового состояния, которое после
+        # set_data() известно только базе, поэтому читаем его обратно
+        row = db.execute("SELECT state FROM fsm WHERE key = ?", (db_key,)).fetchone()
+        if row is None:
+            return
+        seconds = self.ttl.get_ttl(row[0])
+        db.execute(
+            "UPDATE fsm SET expires_at = ? WHERE key = ?",
+            (None if seconds is None else time.time() + seconds, db_key)
+        )
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        db_key = self.key_builder.build(key)
+
+        def query(db: sqlite3.Connection):
+            db.execute(
+                "INSERT INTO fsm (key, state) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET state = excluded.state, "
+                f"data = CASE WHEN {ALIVE} THEN data ELSE '{{}}' END",
+                (db_key, self._state_to_str(state), time.time())
+            )
+            self._after_write(db, db_key)
+
+        await self._run(query)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        row = await self._run(lambda db: db.execute(
+            f"SELECT state FROM fsm WHERE key = ? AND {ALIVE}",
+            (self.key_builder.build(key), time.time())
+        ).fetchone())
+        return row[0] if row else None
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        db_key = self.key_builder.build(key)
+
+        def query(db: sqlite3.Connection):
+            db.execute(
+                "INSERT INTO fsm (key, data) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET data = excluded.data, "
+                f"state = CASE WHEN {ALIVE} THEN state END",
+                (db_key, json.dumps(data), time.time())
+            )
+            self._after_write(db, db_key)
+
+        await self._run(query)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        row = await self._run(lambda db: db.execute(
+            f"SELECT data FROM fsm WHERE key = ? AND {ALIVE}",
+            (self.key_builder.build(key), time.time())
+        ).fetchone())
+        return json.loads(row[0]) if row else {}
+
+    async def get_record(self, key: StorageKey) -> tuple[Optional[str], Dict[str, Any]]:
+        row = await self._run(lambda db: db.execute(
+            f"SELECT state, data FROM fsm WHERE key = ? AND {ALIVE}",
+            (self.key_builder.build(key), time.time())
+        ).fetchone())
+        if row is None:
+            return None, {}
+        return row[0], json.loads(row[1])
+
+    async def set_record(
+            self,
+            key: StorageKey,
+            state: StateType,
+            data: Dict[str, Any]
+    ) -> None:
+        db_key = self.key_builder.build(key)
+
+        def query(db: sqlite3.Connection):
+            db.execute(
+                "INSERT OR REPLACE INTO fsm (key, state, data) VALUES (?, ?, ?)",
+                (db_key, self._state_to_str(state), json.dumps(data))
+            )
+            self._after_write(db, db_key)
+
+        await self._run(query)
+
+    async def sweep(self) -> int:
+        """
+        Удаляет все истёкшие сессии
+
+        :return: количество удалённых сессий
+        """
+        rows = await self._run(lambda db: db.execute(
+            "DELETE FROM fsm WHERE expires_at <= ? RETURNING state",
+            (time.time(),)
+        ).fetchall())
+        self.expired.update(FSMSessionTTL.group_of(state) for state, in rows)
+        return len(rows)
+
+    async def count_sessions(self) -> int:
+        """
+        :return: количество хранимых сессий
+        """
+        row = await self._run(lambda db: db.execute("SELECT count(*) FROM fsm").fetchone())
+        return row[0]
+
+    async def close(self) -> None:
+        def close_connection():
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, close_connection)
+        self._executor.shutdown(wait=True)
@@ -16,7 +16,7 @@ router = Router()
     HasLinkFilter()
 )
 async def link_deletion_handler(message: Message, link: str, state: FSMContext):
-    delete_link(message.from_user.id, link)
+    await delete_link(message.from_user.id, link)
     await state.clear()
     await message.answer(
         text="Ссылка удалена! "
@@ -33,7 +33,7 @@ async def image_deletion_handler(
         state: FSMContext,
         file_unique_id: str
 ):
-    delete_image(message.from_user.id, file_unique_id)
+    await delete_image(message.from_user.id, file_unique_id)
     await state.clear()
     await message.answer(
         text="Изображение удалено! "
@@ -5,29 +5,47 @@ from aiogram.types import InlineQuery, \
     InlineQueryResultArticle, InputTextMessageContent, \
     InlineQueryResultCachedPhoto
 
-from storage import get_links_by_id, get_images_by_id
+from config_reader import config
+from results_cache import InlineResultsCache
+from storage import get_links_page, get_images_page, add_change_listener
 
 router = Router()
 
+# Telegram не принимает больше 50 результатов за раз,
+# остальное догружаем страницами через next_offset
+PAGE_SIZE = 50
 
-@router.inline_query(F.query == "links")
-async def show_user_links(inline_query: InlineQuery):
-    # Эта функция просто собирает текст, который будет
-    # отправлен при нажатии на вариант в инлайн-режиме
-    def get_message_text(
-            link: str,
-            title: str,
-            description: Optional[str]
-    ) -> str:
-        text_parts = [f'{html.bold(html.quote(title))}']
-        if description:
-            text_parts.append(html.quote(description))
-        text_parts.append("")  # добавим пустую строку
-        text_parts.append(link)
-        return "\n".join(text_parts)
+# Инлайн-запросы приходят на каждое нажатие клавиши,
+# а сохранённые данные меняются редко. Поэтому готовые страницы
+# кэшируем и сбрасываем только при изменении данных в хранилище
+results_cache = InlineResultsCache(max_items=config.inline_cache_max_results)
+add_change_listener(results_cache.invalidate)
+
+
+# Эта функция просто собирает текст, который будет
+# отправлен при нажатии на вариант в инлайн-режиме
+def get_message_text(
+        link: str,
+        title: str,
+        description: Optional[str]
+) -> str:
+    text_parts = [f'{html.bold(html.quote(title))}']
+    if description:
+        text_parts.append(html.quote(description))
+    text_parts.append("")  # добавим пустую строку
+    text_parts.append(link)
+    return "\n".join(text_parts)
 
+
+def make_link_results(links: dict) -> list[InlineQueryResultArticle]:
+    """
+    Собирает результаты инлайн-режима из сохранённых ссылок
+
+    :param links: словарь ссылок (как в get_links_by_id)
+    :return: список результатов для inline_query.answer
+    """
     results = []
-    for link, link_data in get_links_by_id(inline_query.from_user.id).items():
+    for link, link_data in links.items():
         # В итоговый массив запихиваем каждую запись
         results.append(InlineQueryResultArticle(
             id=link,  # ссылки у нас уникальные, потому проблем не будет
@@ -42,9 +60,31 @@ async def show_user_links(inline_query: InlineQuery):
                 parse_mode="HTML"
             ),
         ))
+    return results
+
+
+@router.inline_query(F.query == "links")
+async def show_user_links(inline_query: InlineQuery):
+    user_id = inline_query.from_user.id
+    offset = inline_query.offset
+    cached = results_cache.get(user_id, "links", key=offset)
+    if cached is None:
+        # Запоминаем поколение до запроса: если за время запроса
+        # данные изменятся, устаревшая страница не попадёт в кэш
+        generation = results_cache.generation()
+        links, next_offset = await get_links_page(user_id, offset, PAGE_SIZE)
+        results = make_link_results(links)
+        results_cache.put(
+            user_id, "links", results, next_offset,
+            key=offset, generation=generation
+        )
+    else:
+        results, next_offset = cached
     # Важно указать is_personal=True!
+    # Пустой next_offset означает, что страниц больше нет
     await inline_query.answer(
         results, is_personal=True,
+        next_offset=next_offset or "",
         switch_pm_text="Добавить ещё »»",
         switch_pm_parameter="add"
     )
@@ -52,16 +92,32 @@ async def show_user_links(inline_query: InlineQuery):
 
 @router.inline_query(F.query == "images")
 async def show_user_images(inline_query: InlineQuery):
-    results = []
-    for index, file_id in enumerate(get_images_by_id(inline_query.from_user.id)):
-        # В итоговый массив запихиваем каждую запись
-        results.append(InlineQueryResultCachedPhoto(
-            id=str(index),  # ссылки у нас уникальные, потому проблем не будет
-            photo_file_id=file_id
-        ))
+    user_id = inline_query.from_user.id
+    offset = inline_query.offset
+    cached = results_cache.get(user_id, "images", key=offset)
+    if cached is None:
+        # Запоминаем поколение до запроса: если за время запроса
+        # данные изменятся, устаревшая страница не попадёт в кэш
+        generation = results_cache.generation()
+        images, next_offset = await get_images_page(user_id, offset, PAGE_SIZE)
+        results = []
+        for file_unique_id, file_id in images.items():
+            # В итоговый массив запихиваем каждую запись
+            results.append(InlineQueryResultCachedPhoto(
+                id=file_unique_id,  # уникален в пределах юзера
+                photo_file_id=file_id
+            ))
+        results_cache.put(
+            user_id, "images", results, next_offset,
+            key=offset, generation=generation
+        )
+    else:
+        results, next_offset = cached
     # Важно указать is_personal=True!
+    # Пустой next_offset означает, что страниц больше нет
     await inline_query.answer(
         results, is_personal=True,
+        next_offset=next_offset or "",
         switch_pm_text="Добавить ещё »»",
         switch_pm_parameter="add"
     )
@@ -1,48 +1,54 @@
+from typing import Iterator
+
 from aiogram import Router, F
 from aiogram.types import InlineQuery, \
     InlineQueryResultArticle, InputTextMessageContent
 
+from pagination import Paginator, InvalidOffsetError
+
 router = Router()
 
+OVERALL_ITEMS = 195
 
-def get_fake_results(start_num: int, size: int = 50) -> list[int]:
+
+def generate_fake_results(start_num: int) -> Iterator[int]:
     """
-    Генерирует список из последовательных чисел
+    Генерирует последовательные числа, начиная с указанной позиции.
+    Числа создаются по одному, по мере надобности
 
-    :param start_num: стартовое число для генератора
-    :param size: размер пачки (по умолч. 50)
-    :return: список последовательных чисел
+    :param start_num: номер первого элемента (с нуля)
+    :return: генератор чисел от start_num+1 до OVERALL_ITEMS включительно
     """
-    overall_items = 195
-    # Если результатов больше нет, отправляем пустой список
-    if start_num >= overall_items:
-        return []
-    # Отправка неполной пачки (последней)
-    elif start_num + size >= overall_items:
-        return list(range(start_num, overall_items+1))
-    else:
-        return list(range(start_num, start_num+size))
+    yield from range(start_num + 1, OVERALL_ITEMS + 1)
+
+
+# Источником может быть и обычная последовательность,
+# например, range(1, OVERALL_ITEMS + 1), но генератор
+# лучше показывает, что всё сразу в памяти держать не нужно
+paginator = Paginator(generate_fake_results, page_size=50)
 
 
 @router.inline_query(F.query == "long")
 async def pagination_demo(
         inline_query: InlineQuery,
 ):
-    # Высчитываем offset как число
-    offset = int(inline_query.offset) if inline_query.offset else 1
+    try:
+        page = paginator.get_page(inline_query.offset, context=inline_query.query)
+    except InvalidOffsetError:
+        # Offset испорчен или устарел (например, бот перезапускался),
+        # поэтому просто сообщаем, что результатов больше нет
+        await inline_query.answer([], is_personal=True)
+        return
+
     results = [InlineQueryResultArticle(
         id=str(item_num),
         title=f"Объект №{item_num}",
         input_message_content=InputTextMessageContent(
             message_text=f"Объект №{item_num}"
         )
-    ) for item_num in get_fake_results(offset)]
-    if len(results) < 50:
-        await inline_query.answer(
-            results, is_personal=True
-        )
-    else:
-        await inline_query.answer(
-            results, is_personal=True,
-            next_offset=str(offset+50)
-        )
+    ) for item_num in page.items]
+    # Если страница последняя, next_offset будет пустой строкой
+    await inline_query.answer(
+        results, is_personal=True,
+        next_offset=page.next_offset
+    )
@@ -0,0 +1,36 @@
+from aiogram import Router, F
+from aiogram.types import InlineQuery
+
+from handlers.inline_mode import PAGE_SIZE, results_cache, make_link_results
+from storage import search_links
+
+router = Router()
+
+
+# Этот роутер должен подключаться последним из инлайн-роутеров:
+# сюда попадают все непустые запросы, которые не обработали другие
+@router.inline_query(F.query)
+async def search_user_links(inline_query: InlineQuery):
+    user_id = inline_query.from_user.id
+    query = inline_query.query.strip()
+    offset = inline_query.offset
+    # Результаты поиска лежат в той же группе кэша, что и весь список ссылок,
+    # поэтому сбрасываются вместе с ним при любом изменении ссылок юзера
+    cached = results_cache.get(user_id, "links", key=(query, offset))
+    if cached is None:
+        generation = results_cache.generation()
+        links, next_offset = await search_links(user_id, query, offset, PAGE_SIZE)
+        results = make_link_results(links)
+        results_cache.put(
+            user_id, "links", results, next_offset,
+            key=(query, offset), generation=generation
+        )
+    else:
+        results, next_offset = cached
+    # Важно указать is_personal=True!
+    await inline_query.answer(
+        results, is_personal=True,
+        next_offset=next_offset or "",
+        switch_pm_text="Добавить ещё »»",
+        switch_pm_parameter="add"
+    )
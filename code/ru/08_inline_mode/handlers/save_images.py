@@ -11,7 +11,7 @@ router = Router()
 
 @router.message(SaveCommon.waiting_for_save_start, F.photo[-1].as_("photo"))
 async def save_image(message: Message, photo: PhotoSize, state: FSMContext):
-    add_photo(message.from_user.id, photo.file_id, photo.file_unique_id)
+    await add_photo(message.from_user.id, photo.file_id, photo.file_unique_id)
     await state.clear()
     kb = [[InlineKeyboardButton(
         text="Попробовать",
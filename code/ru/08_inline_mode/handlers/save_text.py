@@ -50,9 +50,9 @@ async def last_step(
 ):
     if not command:
         await state.update_data(description=message.text)
-    # Сохраняем данные в нашу ненастоящую БД
+    # Сохраняем данные в хранилище
     data = await state.get_data()
-    add_link(message.from_user.id, data["link"], data["title"], data["description"])
+    await add_link(message.from_user.id, data["link"], data["title"], data["description"])
     await state.clear()
     kb = [[InlineKeyboardButton(
         text="Попробовать",
@@ -0,0 +1,424 @@
+"""
+Замеры времени фильтров, мидлварей, хэндлеров и запросов к Bot API.
+
+Ничего не меняет в коде роутеров: setup_instrumentation() уже после
+include_router() оборачивает зарегистрированные объекты таймерами.
+Если инструментация выключена в настройках, она просто не подключается
+и не добавляет к обработке апдейта ни одного лишнего вызова.
+
+Результат отдаётся в текстовом формате Prometheus по адресу /metrics
+"""
+import asyncio
+import logging
+from bisect import bisect_left
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Optional
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.dispatcher.event.handler import FilterObject, HandlerObject
+from aiogram.dispatcher.middlewares.manager import MiddlewareManager
+from aiogram.filters import Filter
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Границы корзин гистограммы в секундах: от 100 мкс
+# (типичный фильтр) до 10 с (медленный запрос к Bot API)
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+LABELS = ("kind", "event", "router", "handler", "name")
+
+
+class Histogram:
+    """
+    Гистограмма с фиксированными корзинами, как в Prometheus
+    """
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        # Последняя корзина — всё, что больше самой большой границы (+Inf)
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect_left(self.buckets, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def quantile(self, share: float) -> float:
+        """
+        Оценка сверху: граница корзины, в которую попал нужный процентиль
+
+        :param share: доля от 0 до 1, например, 0.99
+        :return: время в секундах
+        """
+        if not self.count:
+            return 0.0
+        rank = share * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class TimingRegistry:
+    """
+    Набор гистограмм, по одной на каждое сочетание меток:
+
+    - kind: filter, middleware, handler или api;
+    - event: тип события (message, callback_query, ...);
+    - router: модуль, где объявлен роутер, или dispatcher;
+    - handler: имя хэндлера (для фильтров — хэндлер, к которому они относятся);
+    - name: имя фильтра, мидлвари или метода Bot API
+    """
+
+    def __init__(self, metric_name: str = "bot_timing_seconds"):
+        self.metric_name = metric_name
+        self.histograms: dict[tuple[str, ...], Histogram] = dict()
+
+    def histogram(
+            self,
+            kind: str,
+            event: str = "",
+            router: str = "",
+            handler: str = "",
+            name: str = ""
+    ) -> Histogram:
+        """
+        Возвращает гистограмму для набора меток, создавая её при необходимости.
+        Обёртки получают свою гистограмму один раз при установке,
+        чтобы не собирать ключ словаря на каждый вызов
+
+        :return: гистограмма
+        """
+        key = (kind, event, router, handler, name)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        return histogram
+
+    def render(self) -> str:
+        """
+        :return: все гистограммы в текстовом формате Prometheus
+        """
+        name = self.metric_name
+        lines = [
+            f"# HELP {name} Time spent in filters, middlewares, handlers and Bot API calls",
+            f"# TYPE {name} histogram",
+        ]
+        for key, histogram in sorted(self.histograms.items()):
+            labels = ",".join(
+                f'{label}="{_escape(value)}"' for label, value in zip(LABELS, key) if value
+            )
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+            lines.append(f"{name}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self) -> list[dict[str, Any]]:
+        """
+        Краткая сводка для лога: количество, среднее и p99 в миллисекундах,
+        самые затратные по суммарному времени — первыми
+
+        :return: список словарей
+        """
+        result = list()
+        for key, histogram in sorted(
+                self.histograms.items(), key=lambda item: item[1].sum, reverse=True
+        ):
+            if not histogram.count:
+                continue
+            item = {label: value for label, value in zip(LABELS, key) if value}
+            item["count"] = histogram.count
+            item["avg_ms"] = round(histogram.sum / histogram.count * 1000, 3)
+            item["p99_ms"] = round(histogram.quantile(0.99) * 1000, 3)
+            result.append(item)
+        return result
+
+
+class TimedFilterObject(FilterObject):
+    """
+    FilterObject, который замеряет время каждой проверки
+    """
+
+    def __init__(self, original: FilterObject, histogram: Histogram):
+        # Копируем уже разобранные поля (params, awaitable, magic),
+        # чтобы не повторять работу __post_init__()
+        self.__dict__.update(original.__dict__)
+        self.histogram = histogram
+
+    async def call(self, *args: Any, **kwargs: Any) -> Any:
+        start = perf_counter()
+        try:
+            return await super().call(*args, **kwargs)
+        finally:
+            self.histogram.observe(perf_counter() - start)
+
+
+class TimedHandlerObject(HandlerObject):
+    """
+    HandlerObject, который замеряет время самого хэндлера (без фильтров и мидлварей)
+    """
+
+    def __init__(self, original: HandlerObject, histogram: Histogram):
+        self.__dict__.update(original.__dict__)
+        self.histogram = histogram
+
+    async def call(self, *args: Any, **kwargs: Any) -> Any:
+        start = perf_counter()
+        try:
+            return await super().call(*args, **kwargs)
+        finally:
+            self.histogram.observe(perf_counter() - start)
+
+
+class TimedMiddleware:
+    """
+    Обёртка над мидлварью, которая замеряет собственное время мидлвари:
+    из общего времени вычитается всё, что выполнялось дальше по цепочке
+    (другие мидлвари, фильтры и хэндлер)
+    """
+
+    def __init__(self, middleware: Callable, histogram: Histogram):
+        self.middleware = middleware
+        self.histogram = histogram
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: dict[str, Any]
+    ) -> Any:
+        downstream = 0.0
+
+        async def timed_handler(event: TelegramObject, data: dict[str, Any]) -> Any:
+            nonlocal downstream
+            handler_start = perf_counter()
+            try:
+                return await handler(event, data)
+            finally:
+                downstream += perf_counter() - handler_start
+
+        start = perf_counter()
+        try:
+            return await self.middleware(timed_handler, event, data)
+        finally:
+            self.histogram.observe(perf_counter() - start - downstream)
+
+
+class RequestTimingMiddleware(BaseRequestMiddleware):
+    """
+    Мидлварь сессии бота: время каждого запроса к Bot API по методам
+    """
+
+    def __init__(self, registry: TimingRegistry):
+        self.registry = registry
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType]
+    ):
+        histogram = self.registry.histogram("api", name=method.__api_method__)
+        start = perf_counter()
+        try:
+            return await make_request(bot, method)
+        finally:
+            histogram.observe(perf_counter() - start)
+
+
+def _callable_name(obj: Any) -> str:
+    return getattr(obj, "__qualname__", type(obj).__name__)
+
+
+def _filter_name(filter_object: FilterObject) -> str:
+    if filter_object.magic is not None:
+        return "F"
+    if isinstance(filter_object.callback, Filter):
+        return type(filter_object.callback).__name__
+    return _callable_name(filter_object.callback)
+
+
+def _router_label(router: Router) -> str:
+    if isinstance(router, Dispatcher):
+        return "dispatcher"
+    # Если имя роутеру не задали, aiogram подставляет hex(id(router)),
+    # а такое имя меняется при каждом запуске. Берём модуль его хэндлеров
+    if router.name != hex(id(router)):
+        return router.name
+    for observer in router.observers.values():
+        for handler in observer.handlers:
+            return handler.callback.__module__
+    return router.name
+
+
+def _wrap_filters(
+        filters: Optional[list[FilterObject]],
+        registry: TimingRegistry,
+        event: str,
+        router: str,
+        handler: str
+) -> None:
+    if not filters:
+        return
+    seen: dict[str, int] = dict()
+    for index, filter_object in enumerate(filters):
+        if isinstance(filter_object, TimedFilterObject):
+            continue
+        name = _filter_name(filter_object)
+        # Несколько одинаковых фильтров у одного хэндлера различаем по номеру
+        seen[name] = seen.get(name, 0) + 1
+        if seen[name] > 1:
+            name = f"{name}#{seen[name]}"
+        filters[index] = TimedFilterObject(
+            filter_object, registry.histogram("filter", event, router, handler, name)
+        )
+
+
+def _wrap_middlewares(
+        manager: MiddlewareManager,
+        registry: TimingRegistry,
+        event: str,
+        router: str
+) -> None:
+    # У MiddlewareManager нет метода для замены, поэтому правим список напрямую
+    middlewares = manager._middlewares
+    for index, middleware in enumerate(middlewares):
+        if isinstance(middleware, TimedMiddleware):
+            continue
+        name = type(middleware).__name__
+        if name == "function":
+            name = _callable_name(middleware)
+        middlewares[index] = TimedMiddleware(
+            middleware, registry.histogram("middleware", event, router, name=name)
+        )
+
+
+def instrument_dispatcher(dp: Dispatcher, registry: TimingRegistry) -> None:
+    """
+    Оборачивает таймерами фильтры, хэндлеры и мидлвари всех роутеров.
+    Вызывать после подключения всех роутеров и мидлварей
+
+    :param dp: объект диспетчера
+    :param registry: куда складывать замеры
+    """
+    for router in dp.chain_tail:
+        router_label = _router_label(router)
+        for event, observer in router.observers.items():
+            _wrap_middlewares(observer.outer_middleware, registry, event, router_label)
+            _wrap_middlewares(observer.middleware, registry, event, router_label)
+            if event == "update" and router is dp:
+                # Здесь единственный хэндлер — сам диспетчер, который
+                # раздаёт апдейты роутерам; его время — это время всего апдейта
+                continue
+            # Фильтры на весь роутер, например, router.message.filter(...)
+            _wrap_filters(observer._handler.filters, registry, event, router_label, "")
+            for index, handler in enumerate(observer.handlers):
+                if isinstance(handler, TimedHandlerObject):
+                    continue
+                handler_name = _callable_name(handler.callback)
+                module = getattr(handler.callback, "__module__", None) or router_label
+                _wrap_filters(handler.filters, registry, event, module, handler_name)
+                observer.handlers[index] = TimedHandlerObject(
+                    handler, registry.histogram("handler", event, module, handler_name)
+                )
+
+
+async def start_metrics_server(
+        registry: TimingRegistry,
+        host: str,
+        port: int
+) -> web.AppRunner:
+    """
+    Запускает HTTP-сервер с одним адресом: GET /metrics
+
+    :param registry: откуда брать замеры
+    :param host: на каком адресе слушать
+    :param port: на каком порту слушать
+    :return: runner, который нужно остановить через cleanup()
+    """
+    async def metrics(request: web.Request) -> web.Response:
+        return web.Response(text=registry.render(), content_type="text/plain")
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host=host, port=port).start()
+    logger.info("Timing metrics are available at http://%s:%d/metrics", host, port)
+    return runner
+
+
+async def log_timings(registry: TimingRegistry, interval: float, top: int = 10):
+    """
+    Периодически пишет в лог самые затратные по суммарному времени места
+
+    :param registry: откуда брать замеры
+    :param interval: пауза между записями в секундах
+    :param top: сколько строк выводить
+    """
+    while True:
+        await asyncio.sleep(interval)
+        for item in registry.summary()[:top]:
+            logger.info("Timing: %s", item)
+
+
+def setup_instrumentation(
+        dp: Dispatcher,
+        bot: Bot,
+        host: str = "127.0.0.1",
+        port: Optional[int] = None,
+        log_interval: Optional[float] = None
+) -> TimingRegistry:
+    """
+    Подключает замеры времени к диспетчеру и сессии бота.
+    Вызывать после подключения всех роутеров и мидлварей
+
+    :param dp: объект диспетчера
+    :param bot: объект бота, чьи запросы к Bot API нужно замерять
+    :param host: на каком адресе слушать /metrics
+    :param port: (опционально) порт для /metrics
+    :param log_interval: (опционально) как часто писать сводку в лог, в секундах
+    :return: реестр с замерами
+    """
+    registry = TimingRegistry()
+    instrument_dispatcher(dp, registry)
+    bot.session.middleware(RequestTimingMiddleware(registry))
+
+    runners: list[web.AppRunner] = list()
+    tasks: set[asyncio.Task] = set()
+
+    async def on_startup():
+        if port is not None:
+            runners.append(await start_metrics_server(registry, host, port))
+        if log_interval:
+            tasks.add(asyncio.create_task(log_timings(registry, log_interval)))
+
+    async def on_shutdown():
+        for task in tasks:
+            task.cancel()
+        for runner in runners:
+            await runner.cleanup()
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+    return registry
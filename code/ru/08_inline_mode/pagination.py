@@ -0,0 +1,115 @@
+import hashlib
+import secrets
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from itertools import islice
+from typing import Callable, Generic, Iterator, NamedTuple, Optional, Sequence, TypeVar, Union
+
+T = TypeVar("T")
+
+# Источник данных: либо последовательность с известной длиной
+# (list, range и т.п.), либо функция, которая по номеру первого элемента
+# возвращает генератор, выдающий элементы начиная с этой позиции
+Source = Union[Sequence[T], Callable[[int], Iterator[T]]]
+
+
+class InvalidOffsetError(ValueError):
+    """
+    Offset повреждён, подделан или выдан другим пагинатором
+    """
+
+
+class Page(NamedTuple):
+    items: list
+    # Пустая строка означает, что это последняя страница
+    next_offset: str
+
+
+class Paginator(Generic[T]):
+    """
+    Постраничная выдача из любого источника.
+
+    Наружу (в next_offset) отдаются непрозрачные токены: в них зашиты
+    номер следующего элемента и подпись, поэтому подсунуть
+    произвольное число или токен от другого запроса не получится.
+    Страница собирается генератором, и источник никогда
+    не превращается в список целиком
+    """
+
+    def __init__(
+            self,
+            source: Source,
+            page_size: int = 50,
+            key: Optional[bytes] = None
+    ):
+        """
+        :param source: последовательность или функция-генератор (см. Source)
+        :param page_size: размер страницы (для инлайн-режима не больше 50)
+        :param key: (опционально) ключ для подписи токенов. По умолчанию
+        случайный, т.е. токены перестают быть валидными после перезапуска
+        """
+        if page_size < 1:
+            raise ValueError("page_size must be positive")
+        self.source = source
+        self.page_size = page_size
+        self._key = key or secrets.token_bytes(16)
+
+    def _sign(self, position: bytes, context: str) -> bytes:
+        return hashlib.blake2b(
+            position + context.encode(),
+            key=self._key,
+            digest_size=6
+        ).digest()
+
+    def encode_offset(self, position: int, context: str = "") -> str:
+        """
+        Превращает номер элемента в токен для next_offset
+
+        :param position: номер первого элемента следующей страницы
+        :param context: (опционально) строка, к которой привязан токен,
+        например, текст инлайн-запроса
+        :return: токен длиной 20 символов
+        """
+        raw = position.to_bytes(8, "big")
+        return urlsafe_b64encode(raw + self._sign(raw, context)).decode()
+
+    def decode_offset(self, offset: str, context: str = "") -> int:
+        """
+        Проверяет токен и достаёт из него номер элемента
+
+        :param offset: токен из inline_query.offset (пустая строка — начало)
+        :param context: строка, к которой был привязан токен
+        :return: номер первого элемента страницы
+        """
+        if not offset:
+            return 0
+        try:
+            data = urlsafe_b64decode(offset.encode())
+        except (BinasciiError, ValueError) as error:
+            raise InvalidOffsetError(offset) from error
+        raw, signature = data[:8], data[8:]
+        if len(raw) != 8 or not secrets.compare_digest(signature, self._sign(raw, context)):
+            raise InvalidOffsetError(offset)
+        return int.from_bytes(raw, "big")
+
+    def _iter_from(self, position: int) -> Iterator[T]:
+        if callable(self.source):
+            return self.source(position)
+        # Срез range или list не трогает элементы до position
+        return iter(self.source[position:position + self.page_size + 1])
+
+    def get_page(self, offset: str, context: str = "") -> Page:
+        """
+        Возвращает страницу по токену
+
+        :param offset: токен из inline_query.offset (пустая строка — начало)
+        :param context: (опционально) строка, к которой привязаны токены
+        :return: элементы страницы и токен следующей страницы
+        """
+        position = self.decode_offset(offset, context)
+        # Берём на один элемент больше, чтобы узнать, есть ли продолжение
+        items = list(islice(self._iter_from(position), self.page_size + 1))
+        if len(items) > self.page_size:
+            next_position = position + self.page_size
+            return Page(items[:self.page_size], self.encode_offset(next_position, context))
+        return Page(items, "")
@@ -0,0 +1,105 @@
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+
+class InlineResultsCache:
+    """
+    LRU-кэш готовых результатов инлайн-режима.
+
+    Записи группируются по паре (ID юзера, тип данных), например
+    (123, "links"). Внутри группы может лежать несколько страниц
+    результатов под разными ключами (обычно это offset страницы).
+    Инвалидация и вытеснение всегда работают с группой целиком.
+    Ограничение задаётся суммарным числом закэшированных результатов.
+
+    Чтобы страница, собранная до инвалидации, не попала в кэш после неё,
+    у кэша есть номер поколения: его нужно запомнить через generation()
+    до похода в хранилище и передать в put(). Номер один на весь кэш,
+    чтобы не хранить отдельный счётчик для каждого юзера, поэтому
+    инвалидация у одного юзера не даёт сохранить страницы, которые
+    в этот момент собирались для других (они просто соберутся заново)
+    """
+
+    def __init__(self, max_items: int = 10_000):
+        self.max_items = max_items
+        self._groups: OrderedDict[
+            tuple[int, str], dict[Hashable, tuple[list, Optional[str]]]
+        ] = OrderedDict()
+        self._size = 0
+        # Сколько раз вызывали invalidate()
+        self._generation = 0
+
+    def generation(self) -> int:
+        """
+        :return: текущий номер поколения кэша
+        """
+        return self._generation
+
+    def get(
+            self,
+            telegram_id: int,
+            kind: str,
+            key: Hashable = None
+    ) -> Optional[tuple[list[Any], Optional[str]]]:
+        """
+        Достаёт закэшированную страницу результатов
+
+        :param telegram_id: ID юзера в Telegram
+        :param kind: тип данных ("links", "images" и т.д.)
+        :param key: (опционально) ключ внутри группы
+        :return: список результатов и next_offset
+        или None, если в кэше ничего нет
+        """
+        group = self._groups.get((telegram_id, kind))
+        if group is None or key not in group:
+            return None
+        self._groups.move_to_end((telegram_id, kind))
+        return group[key]
+
+    def put(
+            self,
+            telegram_id: int,
+            kind: str,
+            results: list[Any],
+            next_offset: Optional[str] = None,
+            key: Hashable = None,
+            generation: Optional[int] = None
+    ):
+        """
+        Кладёт страницу результатов в кэш, при необходимости
+        вытесняя давно не использованные группы
+
+        :param telegram_id: ID юзера в Telegram
+        :param kind: тип данных ("links", "images" и т.д.)
+        :param results: список готовых результатов
+        :param next_offset: (опционально) offset следующей страницы
+        :param key: (опционально) ключ внутри группы
+        :param generation: (опционально) номер поколения, полученный до сбора результатов;
+        если с тех пор кэш инвалидировали, результаты не сохраняются
+        """
+        if len(results) > self.max_items:
+            return
+        if generation is not None and generation != self._generation:
+            return
+        group = self._groups.setdefault((telegram_id, kind), dict())
+        if key in group:
+            self._size -= len(group[key][0])
+        group[key] = (results, next_offset)
+        self._size += len(results)
+        self._groups.move_to_end((telegram_id, kind))
+
+        while self._size > self.max_items:
+            _, evicted = self._groups.popitem(last=False)
+            self._size -= sum(len(page[0]) for page in evicted.values())
+
+    def invalidate(self, telegram_id: int, kind: str):
+        """
+        Удаляет из кэша все результаты указанного типа у юзера
+
+        :param telegram_id: ID юзера в Telegram
+        :param kind: тип данных ("links", "images" и т.д.)
+        """
+        self._generation += 1
+        group = self._groups.pop((telegram_id, kind), None)
+        if group is not None:
+            self._size -= sum(len(page[0]) for page in group.values())
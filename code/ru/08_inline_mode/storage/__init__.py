@@ -0,0 +1,129 @@
+from typing import Optional, Callable, Any
+
+from .base import BaseDataStorage
+from .memory import MemoryDataStorage
+from .sqlite import SQLiteDataStorage
+
+# Хранилище, с которым работают хэндлеры.
+# По умолчанию — словарь в памяти, а при запуске бота
+# его можно заменить на любое другое через setup_storage()
+_storage: BaseDataStorage = MemoryDataStorage()
+
+# Функции, которые вызываются после каждого изменения данных юзера.
+# Получают ID юзера и тип изменённых данных: "links" или "images"
+_change_listeners: list[Callable[[int, str], Any]] = []
+
+
+def setup_storage(storage: BaseDataStorage):
+    """
+    Устанавливает хранилище, с которым будут работать функции этого модуля
+
+    :param storage: объект хранилища
+    """
+    global _storage
+    _storage = storage
+
+
+def add_change_listener(listener: Callable[[int, str], Any]):
+    """
+    Подписывает функцию на изменения данных в хранилище,
+    например, чтобы сбрасывать кэши
+
+    :param listener: функция, принимающая ID юзера и тип данных
+    """
+    _change_listeners.append(listener)
+
+
+def _notify(telegram_id: int, kind: str):
+    for listener in _change_listeners:
+        listener(telegram_id, kind)
+
+
+async def close_storage():
+    """
+    Закрывает текущее хранилище
+    """
+    await _storage.close()
+
+
+async def add_link(
+        telegram_id: int,
+        link: str,
+        title: str,
+        description: Optional[str]
+):
+    await _storage.add_link(telegram_id, link, title, description)
+    _notify(telegram_id, "links")
+
+
+async def add_photo(
+        telegram_id: int,
+        photo_file_id: str,
+        photo_unique_id: str
+):
+    await _storage.add_photo(telegram_id, photo_file_id, photo_unique_id)
+    _notify(telegram_id, "images")
+
+
+async def get_links_by_id(telegram_id: int) -> dict:
+    return await _storage.get_links_by_id(telegram_id)
+
+
+async def get_images_by_id(telegram_id: int) -> list[str]:
+    return await _storage.get_images_by_id(telegram_id)
+
+
+async def get_links_page(
+        telegram_id: int,
+        cursor: Optional[str],
+        limit: int
+) -> tuple[dict, Optional[str]]:
+    return await _storage.get_links_page(telegram_id, cursor, limit)
+
+
+async def get_images_page(
+        telegram_id: int,
+        cursor: Optional[str],
+        limit: int
+) -> tuple[dict[str, str], Optional[str]]:
+    return await _storage.get_images_page(telegram_id, cursor, limit)
+
+
+async def search_links(
+        telegram_id: int,
+        query: str,
+        cursor: Optional[str],
+        limit: int
+) -> tuple[dict, Optional[str]]:
+    return await _storage.search_links(telegram_id, query, cursor, limit)
+
+
+async def delete_link(telegram_id: int, link: str):
+    await _storage.delete_link(telegram_id, link)
+    _notify(telegram_id, "links")
+
+
+async def delete_image(telegram_id: int, photo_file_unique_id: str):
+    await _storage.delete_image(telegram_id, photo_file_unique_id)
+    _notify(telegram_id, "images")
+
+
+# Делаем так, чтобы затем просто импортировать
+# from storage import add_link
+__all__ = [
+    "BaseDataStorage",
+    "MemoryDataStorage",
+    "SQLiteDataStorage",
+    "setup_storage",
+    "add_change_listener",
+    "close_storage",
+    "add_link",
+    "add_photo",
+    "get_links_by_id",
+    "get_images_by_id",
+    "get_links_page",
+    "get_images_page",
+    "search_links",
+    "delete_link",
+    "delete_image"
+]
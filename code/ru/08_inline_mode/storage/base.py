@@ -0,0 +1,168 @@
+import re
+from abc import ABC, abstractmethod
+from typing import Optional
+
+
+def parse_cursor(cursor: Optional[str]) -> int:
+    """
+    Превращает курсор из inline_query.offset в число.
+    Пустой или испорченный курсор означает "с самого начала"
+
+    :param cursor: строка-курсор
+    :return: неотрицательное число
+    """
+    if cursor and cursor.isdigit():
+        return int(cursor)
+    return 0
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    """
+    Разбивает текст на слова для поиска (в нижнем регистре)
+
+    :param text: произвольный текст, можно None
+    :return: список слов
+    """
+    if not text:
+        return []
+    return re.findall(r"\w+", text.lower())
+
+
+class BaseDataStorage(ABC):
+    """
+    Общий интерфейс хранилища ссылок и изображений пользователей.
+    Все методы асинхронные, чтобы реализации с настоящей СУБД
+    не блокировали event loop
+    """
+
+    @abstractmethod
+    async def add_link(
+            self,
+            telegram_id: int,
+            link: str,
+            title: str,
+            description: Optional[str]
+    ):
+        """
+        Сохраняет ссылку
+
+        :param telegram_id: ID юзера в Telegram
+        :param link: текст ссылки
+        :param title: заголовок ссылки
+        :param description: (опционально) описание ссылки
+        """
+
+    @abstractmethod
+    async def add_photo(
+            self,
+            telegram_id: int,
+            photo_file_id: str,
+            photo_unique_id: str
+    ):
+        """
+        Сохраняет изображение
+
+        :param telegram_id: ID юзера в Telegram
+        :param photo_file_id: file_id изображения
+        :param photo_unique_id: file_unique_id изображения
+        """
+
+    @abstractmethod
+    async def get_links_by_id(self, telegram_id: int) -> dict:
+        """
+        Получает сохранённые ссылки пользователя
+
+        :param telegram_id: ID юзера в Telegram
+        :return: словарь вида {ссылка: {"title": ..., "description": ...}}
+        """
+
+    @abstractmethod
+    async def get_images_by_id(self, telegram_id: int) -> list[str]:
+        """
+        Получает сохранённые изображения пользователя
+
+        :param telegram_id: ID юзера в Telegram
+        :return: список file_id изображений в порядке добавления
+        """
+
+    @abstractmethod
+    async def get_links_page(
+            self,
+            telegram_id: int,
+            cursor: Optional[str],
+            limit: int
+    ) -> tuple[dict, Optional[str]]:
+        """
+        Получает одну страницу сохранённых ссылок пользователя
+
+        :param telegram_id: ID юзера в Telegram
+        :param cursor: курсор, полученный вместе с предыдущей страницей
+        (None или пустая строка для первой страницы)
+        :param limit: максимальный размер страницы
+        :return: словарь ссылок (как в get_links_by_id) и курсор
+        следующей страницы или None, если страница последняя
+        """
+
+    @abstractmethod
+    async def get_images_page(
+            self,
+            telegram_id: int,
+            cursor: Optional[str],
+            limit: int
+    ) -> tuple[dict[str, str], Optional[str]]:
+        """
+        Получает одну страницу сохранённых изображений пользователя
+
+        :param telegram_id: ID юзера в Telegram
+        :param cursor: курсор, полученный вместе с предыдущей страницей
+        (None или пустая строка для первой страницы)
+        :param limit: максимальный размер страницы
+        :return: словарь {file_unique_id: file_id} и курсор
+        следующей страницы или None, если страница последняя
+        """
+
+    @abstractmethod
+    async def search_links(
+            self,
+            telegram_id: int,
+            query: str,
+            cursor: Optional[str],
+            limit: int
+    ) -> tuple[dict, Optional[str]]:
+        """
+        Ищет ссылки пользователя по заголовку, описанию и самой ссылке.
+        Каждое слово запроса ищется как префикс, найтись должны все слова.
+        Совпадения в заголовке ценятся выше, чем в описании, а те — выше,
+        чем в ссылке
+
+        :param telegram_id: ID юзера в Telegram
+        :param query: поисковый запрос
+        :param cursor: курсор, полученный вместе с предыдущей страницей
+        (None или пустая строка для первой страницы)
+        :param limit: максимальный размер страницы
+        :return: словарь ссылок (как в get_links_by_id) в порядке
+        релевантности и курсор следующей страницы или None
+        """
+
+    @abstractmethod
+    async def delete_link(self, telegram_id: int, link: str):
+        """
+        Удаляет ссылку
+
+        :param telegram_id: ID юзера в Telegram
+        :param link: ссылка
+        """
+
+    @abstractmethod
+    async def delete_image(self, telegram_id: int, photo_file_unique_id: str):
+        """
+        Удаляет изображение
+
+        :param telegram_id: ID юзера в Telegram
+        :param photo_file_unique_id: file_unique_id изображения для удаления
+        """
+
+    async def close(self):
+        """
+        Освобождает ресурсы хранилища (соединения с БД и т.д.)
+        """
@@ -0,0 +1,111 @@
+from itertools import islice
+from typing import Optional
+
+from .base import BaseDataStorage, parse_cursor
+from .prefix_index import PrefixIndex
+
+
+class MemoryDataStorage(BaseDataStorage):
+    """
+    Хранилище в обычном словаре.
+    Учтите, что он сбрасывается при перезапуске бота
+    """
+
+    def __init__(self):
+        self.data = dict()
+        # Отдельный поисковый индекс по ссылкам для каждого юзера
+        self.search_indexes: dict[int, PrefixIndex] = dict()
+
+    async def add_link(
+            self,
+            telegram_id: int,
+            link: str,
+            title: str,
+            description: Optional[str]
+    ):
+        self.data.setdefault(telegram_id, dict())
+        self.data[telegram_id].setdefault("links", dict())
+        self.data[telegram_id]["links"][link] = {
+            "title": title,
+            "description": description
+        }
+        index = self.search_indexes.setdefault(telegram_id, PrefixIndex(weights=(10, 5, 1)))
+        index.add(link, [title, description, link])
+
+    async def add_photo(
+            self,
+            telegram_id: int,
+            photo_file_id: str,
+            photo_unique_id: str
+    ):
+        self.data.setdefault(telegram_id, dict())
+        # Картинки храним в словаре {file_unique_id: file_id}:
+        # словари помнят порядок вставки, поэтому выдача остаётся стабильной,
+        # а проверка на дубликат и удаление не требуют перебора
+        images = self.data[telegram_id].setdefault("images", dict())
+        images.setdefault(photo_unique_id, photo_file_id)
+
+    async def get_links_by_id(self, telegram_id: int) -> dict:
+        if telegram_id in self.data and "links" in self.data[telegram_id]:
+            return self.data[telegram_id]["links"]
+        return dict()
+
+    async def get_images_by_id(self, telegram_id: int) -> list[str]:
+        if telegram_id in self.data and "images" in self.data[telegram_id]:
+            return list(self.data[telegram_id]["images"].values())
+        return []
+
+    # Курсор здесь — просто порядковый номер записи. Этого достаточно
+    # для хранилища-примера, но если между запросами страниц что-то удалить,
+    # следующая страница сдвинется. В SQLite такой проблемы нет
+
+    async def get_links_page(
+            self,
+            telegram_id: int,
+            cursor: Optional[str],
+            limit: int
+    ) -> tuple[dict, Optional[str]]:
+        links = await self.get_links_by_id(telegram_id)
+        start = parse_cursor(cursor)
+        page = dict(islice(links.items(), start, start + limit))
+        next_cursor = str(start + limit) if start + limit < len(links) else None
+        return page, next_cursor
+
+    async def get_images_page(
+            self,
+            telegram_id: int,
+            cursor: Optional[str],
+            limit: int
+    ) -> tuple[dict[str, str], Optional[str]]:
+        images = self.data.get(telegram_id, dict()).get("images", dict())
+        start = parse_cursor(cursor)
+        page = dict(islice(images.items(), start, start + limit))
+        next_cursor = str(start + limit) if start + limit < len(images) else None
+        return page, next_cursor
+
+    async def search_links(
+            self,
+            telegram_id: int,
+            query: str,
+            cursor: Optional[str],
+            limit: int
+    ) -> tuple[dict, Optional[str]]:
+        if telegram_id not in self.search_indexes:
+            return dict(), None
+        found = self.search_indexes[telegram_id].search(query)
+        start = parse_cursor(cursor)
+        links = self.data[telegram_id]["links"]
+        page = {link: links[link] for link in found[start:start + limit]}
+        next_cursor = str(start + limit) if start + limit < len(found) else None
+        return page, next_cursor
+
+    async def delete_link(self, telegram_id: int, link: str):
+        if telegram_id in self.data:
+            if "links" in self.data[telegram_id]:
+                if link in self.data[telegram_id]["links"]:
+                    del self.data[telegram_id]["links"][link]
+                    self.search_indexes[telegram_id].remove(link)
+
+    async def delete_image(self, telegram_id: int, photo_file_unique_id: str):
+        if telegram_id in self.data and "images" in self.data[telegram_id]:
+            self.data[telegram_id]["images"].pop(photo_file_unique_id, None)
@@ -0,0 +1,100 @@
+from itertools import count
+from typing import Optional
+
+from .base import tokenize
+
+
+class PrefixIndex:
+    """
+    Простой инкрементальный поисковый индекс для хранилища в памяти.
+
+    Для каждого слова в индекс кладутся все его префиксы
+    (но не длиннее max_prefix_length), поэтому поиск по началу слова —
+    это один поиск в словаре, без перебора всех документов
+    """
+
+    def __init__(self, weights: tuple[int, ...], max_prefix_length: int = 16):
+        """
+        :param weights: веса полей документа при ранжировании
+        :param max_prefix_length: максимальная длина префикса в индексе
+        """
+        self.weights = weights
+        self.max_prefix_length = max_prefix_length
+        self._prefixes: dict[str, set[str]] = dict()
+        # ключ документа -> (порядковый номер, слова каждого поля)
+        self._documents: dict[str, tuple[int, list[list[str]]]] = dict()
+        self._counter = count()
+
+    def _iter_prefixes(self, fields: list[list[str]]) -> set[str]:
+        prefixes = set()
+        for words in fields:
+            for word in words:
+                for length in range(1, min(len(word), self.max_prefix_length) + 1):
+                    prefixes.add(word[:length])
+        return prefixes
+
+    def add(self, key: str, fields: list[Optional[str]]):
+        """
+        Добавляет документ в индекс или обновляет существующий
+
+        :param key: уникальный ключ документа
+        :param fields: тексты полей документа в том же порядке, что и веса
+        """
+        old = self._documents.get(key)
+        if old is not None:
+            self.remove(key)
+        number = old[0] if old is not None else next(self._counter)
+        words = [tokenize(field) for field in fields]
+        self._documents[key] = (number, words)
+        for prefix in self._iter_prefixes(words):
+            self._prefixes.setdefault(prefix, set()).add(key)
+
+    def remove(self, key: str):
+        """
+        Удаляет документ из индекса
+
+        :param key: уникальный ключ документа
+        """
+        document = self._documents.pop(key, None)
+        if document is None:
+            return
+        for prefix in self._iter_prefixes(document[1]):
+            keys = self._prefixes[prefix]
+            keys.discard(key)
+            if not keys:
+                del self._prefixes[prefix]
+
+    def search(self, query: str) -> list[str]:
+        """
+        Ищет документы, в которых есть все слова запроса (как префиксы)
+
+        :param query: поисковый запрос
+        :return: ключи документов, от более релевантных к менее
+        """
+        query_words = tokenize(query)
+        if not query_words:
+            return []
+
+        candidates: Optional[set[str]] = None
+        for word in query_words:
+            keys = self._prefixes.get(word[:self.max_prefix_length], set())
+            candidates = keys.copy() if candidates is None else candidates & keys
+            if not candidates:
+                return []
+
+        ranked = []
+        for key in candidates:
+            number, fields = self._documents[key]
+            score = 0
+            matched = set()
+            for weight, words in zip(self.weights, fields):
+                for query_word in query_words:
+                    if any(word.startswith(query_word) for word in words):
+                        score += weight
+                        matched.add(query_word)
+            # Слова длиннее max_prefix_length могли дать ложное совпадение
+            if len(matched) == len(set(query_words)):
+                # Чем больше очков, тем выше; при равенстве — в порядке добавления
+                ranked.append((-score, number, key))
+        ranked.sort()
+        return [key for _, _, key in ranked]
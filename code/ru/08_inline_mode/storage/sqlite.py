@@ -0,0 +1,246 @@
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional, Callable, Any
+
+from .base import BaseDataStorage, parse_cursor, tokenize
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS links (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    telegram_id INTEGER NOT NULL,
+    link TEXT NOT NULL,
+    title TEXT NOT NULL,
+    description TEXT,
+    UNIQUE (telegram_id, link)
+);
+CREATE INDEX IF NOT EXISTS links_by_user ON links (telegram_id, id);
+
+CREATE TABLE IF NOT EXISTS images (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    telegram_id INTEGER NOT NULL,
+    file_id TEXT NOT NULL,
+    file_unique_id TEXT NOT NULL,
+    UNIQUE (telegram_id, file_unique_id)
+);
+CREATE INDEX IF NOT EXISTS images_by_user ON images (telegram_id, id);
+"""
+
+# Полнотекстовый индекс по ссылкам. Таблица contentless: сами тексты
+# лежат только в links, а здесь — лишь индекс. Колонка owner содержит
+# токен вида "u123456", по которому поиск сразу сужается до одного юзера.
+# Индекс обновляется триггерами, т.е. в тех же запросах add_link/delete_link
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS links_fts USING fts5(
+    owner, title, description, link,
+    content='', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS links_fts_insert AFTER INSERT ON links BEGIN
+    INSERT INTO links_fts (rowid, owner, title, description, link)
+    VALUES (new.id, 'u' || new.telegram_id, new.title, new.description, new.link);
+END;
+CREATE TRIGGER IF NOT EXISTS links_fts_delete AFTER DELETE ON links BEGIN
+    INSERT INTO links_fts (links_fts, rowid, owner, title, description, link)
+    VALUES ('delete', old.id, 'u' || old.telegram_id, old.title, old.description, old.link);
+END;
+CREATE TRIGGER IF NOT EXISTS links_fts_update AFTER UPDATE ON links BEGIN
+    INSERT INTO links_fts (links_fts, rowid, owner, title, description, link)
+    VALUES ('delete', old.id, 'u' || old.telegram_id, old.title, old.description, old.link);
+    INSERT INTO links_fts (rowid, owner, title, description, link)
+    VALUES (new.id, 'u' || new.telegram_id, new.title, new.description, new.link);
+END;
+"""
+
+
+class SQLiteDataStorage(BaseDataStorage):
+    """
+    Хранилище в SQLite-файле, переживает перезапуски бота.
+
+    Модуль sqlite3 синхронный, поэтому все запросы выполняются
+    в отдельном потоке. Поток ровно один: так соединение
+    никогда не используется из двух потоков одновременно,
+    а event loop не ждёт диска
+    """
+
+    def __init__(self, path: Path):
+        self._executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="sqlite-storage"
+        )
+        self._connection: Optional[sqlite3.Connection] = None
+        self._path = path
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self._path, check_same_thread=False)
+            # WAL позволяет читать, не дожидаясь окончания записи,
+            # а synchronous=NORMAL в этом режиме безопасен и заметно быстрее
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            has_search = connection.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'links_fts'"
+            ).fetchone()
+            connection.executescript(SEARCH_SCHEMA)
+            if not has_search:
+                # БД создана до появления поиска: проиндексируем то, что уже есть
+                connection.execute(
+                    "INSERT INTO links_fts (rowid, owner, title, description, link) "
+                    "SELECT id, 'u' || telegram_id, title, description, link FROM links"
+                )
+                connection.commit()
+            self._connection = connection
+        return self._connection
+
+    async def _run(self, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        def wrapper():
+            connection = self._connect()
+            with connection:
+                return func(connection)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, wrapper)
+
+    async def add_link(
+            self,
+            telegram_id: int,
+            link: str,
+            title: str,
+            description: Optional[str]
+    ):
+        # Повторное сохранение ссылки обновляет запись, не меняя её позицию
+        await self._run(lambda db: db.execute(
+            "INSERT INTO links (telegram_id, link, title, description) "
+            "VALUES (?, ?, ?, ?) "
+            "ON CONFLICT (telegram_id, link) DO UPDATE "
+            "SET title = excluded.title, description = excluded.description",
+            (telegram_id, link, title, description)
+        ))
+
+    async def add_photo(
+            self,
+            telegram_id: int,
+            photo_file_id: str,
+            photo_unique_id: str
+    ):
+        await self._run(lambda db: db.execute(
+            "INSERT OR IGNORE INTO images (telegram_id, file_id, file_unique_id) "
+            "VALUES (?, ?, ?)",
+            (telegram_id, photo_file_id, photo_unique_id)
+        ))
+
+    async def get_links_by_id(self, telegram_id: int) -> dict:
+        rows = await self._run(lambda db: db.execute(
+            "SELECT link, title, description FROM links "
+            "WHERE telegram_id = ? ORDER BY id",
+            (telegram_id,)
+        ).fetchall())
+        return {
+            link: {"title": title, "description": description}
+            for link, title, description in rows
+        }
+
+    async def get_images_by_id(self, telegram_id: int) -> list[str]:
+        rows = await self._run(lambda db: db.execute(
+            "SELECT file_id FROM images WHERE telegram_id = ? ORDER BY id",
+            (telegram_id,)
+        ).fetchall())
+        return [file_id for (file_id,) in rows]
+
+    # Курсор — id последней отданной записи. Запрос "id > курсора"
+    # идёт по индексу (telegram_id, id), поэтому любая страница
+    # достаётся одинаково быстро, сколько бы данных ни было у юзера.
+    # Берём на одну запись больше, чтобы понять, есть ли следующая страница
+
+    async def get_links_page(
+            self,
+            telegram_id: int,
+            cursor: Optional[str],
+            limit: int
+    ) -> tuple[dict, Optional[str]]:
+        rows = await self._run(lambda db: db.execute(
+            "SELECT id, link, title, description FROM links "
+            "WHERE telegram_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (telegram_id, parse_cursor(cursor), limit + 1)
+        ).fetchall())
+        next_cursor = str(rows[limit - 1][0]) if len(rows) > limit else None
+        page = {
+            link: {"title": title, "description": description}
+            for _, link, title, description in rows[:limit]
+        }
+        return page, next_cursor
+
+    async def get_images_page(
+            self,
+            telegram_id: int,
+            cursor: Optional[str],
+            limit: int
+    ) -> tuple[dict[str, str], Optional[str]]:
+        rows = await self._run(lambda db: db.execute(
+            "SELECT id, file_unique_id, file_id FROM images "
+            "WHERE telegram_id = ? AND id > ? ORDER BY id LIMIT ?",
+            (telegram_id, parse_cursor(cursor), limit + 1)
+        ).fetchall())
+        next_cursor = str(rows[limit - 1][0]) if len(rows) > limit else None
+        page = {
+            file_unique_id: file_id
+            for _, file_unique_id, file_id in rows[:limit]
+        }
+        return page, next_cursor
+
+    async def search_links(
+            self,
+            telegram_id: int,
+            query: str,
+            cursor: Optional[str],
+            limit: int
+    ) -> tuple[dict, Optional[str]]:
+        words = tokenize(query)
+        if not words:
+            return dict(), None
+        # Каждое слово ищем как префикс ("слово"*) только в текстовых колонках.
+        # Кавычки внутри слов невозможны: tokenize() оставляет только буквы и цифры
+        match = "owner:u{owner} AND {{title description link}}: ({words})".format(
+            owner=telegram_id,
+            words=" AND ".join(f'"{word}"*' for word in words)
+        )
+        start = parse_cursor(cursor)
+        # Ранжирование по релевантности не даёт сделать курсор по id,
+        # поэтому здесь курсор — просто номер первой записи на странице
+        rows = await self._run(lambda db: db.execute(
+            "SELECT links.link, links.title, links.description FROM links_fts "
+            "JOIN links ON links.id = links_fts.rowid "
+            "WHERE links_fts MATCH ? "
+            "ORDER BY bm25(links_fts, 0.0, 10.0, 5.0, 1.0), links.id "
+            "LIMIT ? OFFSET ?",
+            (match, limit + 1, start)
+        ).fetchall())
+        next_cursor = str(start + limit) if len(rows) > limit else None
+        page = {
+            link: {"title": title, "description": description}
+            for link, title, description in rows[:limit]
+        }
+        return page, next_cursor
+
+    async def delete_link(self, telegram_id: int, link: str):
+        await self._run(lambda db: db.execute(
+            "DELETE FROM links WHERE telegram_id = ? AND link = ?",
+            (telegram_id, link)
+        ))
+
+    async def delete_image(self, telegram_id: int, photo_file_unique_id: str):
+        await self._run(lambda db: db.execute(
+            "DELETE FROM images WHERE telegram_id = ? AND file_unique_id = ?",
+            (telegram_id, photo_file_unique_id)
+        ))
+
+    async def close(self):
+        def close_connection():
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, close_connection)
+        self._executor.shutdown(wait=True)
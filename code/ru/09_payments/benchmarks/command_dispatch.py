@@ -0,0 +1,128 @@
+"""
+Сравнение диспетчеризации команд: цепочка фильтров Command(...),
+как было раньше в donate.py, против таблицы команд из bot/command_router.py.
+
+Запуск из каталога главы:
+    python -m benchmarks.command_dispatch
+
+Хэндлеры ничего не делают и не обращаются к Bot API, поэтому
+замеряется только поиск нужного хэндлера и разбор команды
+"""
+import asyncio
+from datetime import datetime
+from time import perf_counter
+from typing import Optional
+
+from aiogram import Bot, Dispatcher, F, Router
+from aiogram.filters import Command, CommandObject, CommandStart
+from aiogram.types import Chat, Message, Update, User
+
+from bot.command_router import CommandRouter, Fixed, IntRange
+
+NUMBER = 1000
+REPEAT = 7
+MESSAGES = {
+    "/start": "/start",
+    "/donate_50": "/donate_50",
+    "/donate 100": "/donate 100",
+    "/donate 9999": "/donate 9999",
+    "/donate_link": "/donate_link",
+    "/unknown": "/unknown",
+    "plain text": "Просто текст",
+}
+
+
+async def noop(*args, **kwargs):
+    pass
+
+
+def filter_chain_router() -> Router:
+    router = Router()
+
+    async def cmd_donate(message: Message, command: CommandObject):
+        if command.command != "donate":
+            amount = int(command.command.split("_")[1])
+        elif command.args is None or not command.args.isdigit() or not 1 <= int(command.args) <= 2500:
+            return
+        else:
+            amount = int(command.args)
+        return amount
+
+    router.message.register(noop, CommandStart())
+    for name in ("donate_1", "donate_25", "donate_50", "donate"):
+        router.message.register(cmd_donate, Command(name))
+    router.message.register(noop, Command("paysupport"))
+    router.message.register(noop, Command("refund"))
+    router.message.register(noop, Command("donate_link"))
+    router.message.register(noop, F.successful_payment)
+    return router
+
+
+def command_table_router() -> Router:
+    router = CommandRouter()
+
+    async def cmd_donate(message: Message, amount: Optional[int]):
+        if amount is None:
+            return
+
+    router.message.command("start")(noop)
+    for name, value in (("donate_1", 1), ("donate_25", 25), ("donate_50", 50)):
+        router.message.command(name, parse=Fixed(value), param="amount")(cmd_donate)
+    router.message.command("donate", parse=IntRange(1, 2500), param="amount")(cmd_donate)
+    router.message.command("paysupport")(noop)
+    router.message.command("refund")(noop)
+    router.message.command("donate_link")(noop)
+    router.message.register(noop, F.successful_payment)
+    return router
+
+
+def make_update(bot: Bot, text: str) -> Update:
+    message = Message(
+        message_id=1,
+        date=datetime.now(),
+        chat=Chat(id=1, type="private"),
+        from_user=User(id=1, is_bot=False, first_name="User"),
+        text=text
+    )
+    return Update(update_id=1, message=message).as_(bot)
+
+
+async def run_batch(dp: Dispatcher, bot: Bot, update: Update) -> float:
+    start = perf_counter()
+    for _ in range(NUMBER):
+        await dp.feed_update(bot, update)
+    # В микросекундах на один апдейт
+    return (perf_counter() - start) / NUMBER * 1_000_000
+
+
+async def measure(routers: dict[str, Router], bot: Bot, text: str) -> dict[str, float]:
+    dispatchers = dict()
+    for name, router in routers.items():
+        dispatchers[name] = Dispatcher()
+        dispatchers[name].include_router(router)
+    update = make_update(bot, text)
+    timings = {name: list() for name in routers}
+    # Варианты замеряются по очереди, чтобы фоновая нагрузка
+    # и троттлинг процессора влияли на них одинаково
+    for _ in range(REPEAT):
+        for name, dp in dispatchers.items():
+            timings[name].append(await run_batch(dp, bot, update))
+    # Лучший из повторов
+    return {name: min(values) for name, values in timings.items()}
+
+
+async def main():
+    bot = Bot("42:BENCHMARK")
+    print(f"µs per update, best of {REPEAT} x {NUMBER} updates")
+    print(f"{'message':>14} {'filters':>10} {'table':>10}")
+    for label, text in MESSAGES.items():
+        result = await measure(
+            {"filters": filter_chain_router(), "table": command_table_router()},
+            bot, text
+        )
+        print(f"{label:>14} {result['filters']:>10.1f} {result['table']:>10.1f}")
+    await bot.session.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -6,41 +6,100 @@ from aiogram.client.default import DefaultBotProperties
 from aiogram.enums import ParseMode
 from structlog.typing import FilteringBoundLogger
 
-from bot.config_reader import get_config, BotConfig, LogConfig
-from bot.fluent_loader import get_fluent_localization
+from bot.config_reader import (
+    get_config, BotConfig, InvoiceLinksConfig, L10nConfig, LedgerConfig, LogConfig,
+    MetricsConfig, TimingConfig
+)
+from bot.fluent_loader import get_fluent_localization, setup_locales_reload
 from bot.handlers import get_routers
+from bot.instrumentation import setup_instrumentation
+from bot.invoice_links import InvoiceLinkCache, setup_invoice_links_warmup
+from bot.launcher import create_session, run_bot
+from bot.ledger import PaymentLedger
 from bot.logs import get_structlog_config
+from bot.metrics import setup_metrics
 from bot.middlewares import L10nMiddleware
+from bot.ratelimit import RateLimitMiddleware
 
 
 async def main():
     log_config: LogConfig = get_config(model=LogConfig, root_key="logs")
     structlog.configure(**get_structlog_config(log_config))
 
-    locale = get_fluent_localization()
+    l10n_config: L10nConfig = get_config(model=L10nConfig, root_key="l10n", optional=True)
+    locales = get_fluent_localization(
+        default_locale=l10n_config.default_locale,
+        cache_size=l10n_config.cache_size
+    )
 
     dp = Dispatcher()
 
     # Регистрация мидлвари на типы Message и PreCheckoutQuery
-    dp.message.outer_middleware(L10nMiddleware(locale))
-    dp.pre_checkout_query.outer_middleware(L10nMiddleware(locale))
+    dp.message.outer_middleware(L10nMiddleware(locales))
+    dp.pre_checkout_query.outer_middleware(L10nMiddleware(locales))
 
     dp.include_routers(*get_routers())
 
+    # Переводы можно менять, не перезапуская бота
+    if l10n_config.reload_interval:
+        setup_locales_reload(dp, locales, interval=l10n_config.reload_interval)
+
+    invoice_links_config: InvoiceLinksConfig = get_config(
+        model=InvoiceLinksConfig, root_key="invoice_links", optional=True
+    )
+    invoice_links = InvoiceLinkCache(
+        ttl=invoice_links_config.ttl,
+        max_size=invoice_links_config.max_size
+    )
+    if invoice_links_config.warm_amounts:
+        setup_invoice_links_warmup(dp, invoice_links, locales, invoice_links_config.warm_amounts)
+
     bot_config: BotConfig = get_config(model=BotConfig, root_key="bot")
     bot = Bot(
         token=bot_config.token.get_secret_value(),
+        session=create_session(bot_config.api_url, rate_limit=bot_config.rate_limit),
         default=DefaultBotProperties(
             parse_mode=ParseMode.HTML
         )
     )
 
+    metrics = None
+    metrics_config: MetricsConfig = get_config(
+        model=MetricsConfig, root_key="metrics", optional=True
+    )
+    if metrics_config.enabled:
+        metrics = setup_metrics(dp, bot, host=metrics_config.host, port=metrics_config.port)
+        # Очередь запросов, ждущих лимитов Telegram
+        metrics.collectors.extend(
+            middleware for middleware in bot.session.middleware
+            if isinstance(middleware, RateLimitMiddleware)
+        )
+
+    # Замеры времени подключаются последними, когда все роутеры,
+    # фильтры и мидлвари уже на месте
+    timing_config: TimingConfig = get_config(
+        model=TimingConfig, root_key="timing", optional=True
+    )
+    if timing_config.enabled:
+        timings = setup_instrumentation(dp, bot, log_interval=timing_config.log_interval)
+        if metrics is not None:
+            metrics.collectors.append(timings)
+
     logger: FilteringBoundLogger = structlog.get_logger()
-    await logger.ainfo("Starting polling...")
+    await logger.ainfo("Starting bot...", run_mode=bot_config.run_mode)
+
+    ledger_config: LedgerConfig = get_config(model=LedgerConfig, root_key="ledger", optional=True)
+    ledger = PaymentLedger(
+        ledger_config.path,
+        commit_delay=ledger_config.commit_delay,
+        max_batch=ledger_config.max_batch
+    )
 
     try:
-        await dp.start_polling(bot)
+        # ledger и invoice_links попадут в хэндлеры как аргументы с теми же именами
+        await run_bot(bot, dp, bot_config, ledger=ledger, invoice_links=invoice_links)
     finally:
+        await ledger.close()
         await bot.session.close()
 
 
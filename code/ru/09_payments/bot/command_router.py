@@ -0,0 +1,184 @@
+"""
+Роутер с таблицей команд вместо цепочки фильтров Command(...).
+
+Обычный роутер проверяет каждое сообщение фильтрами всех хэндлеров по очереди,
+и каждый Command(...) заново разбирает текст. Здесь текст разбирается один раз,
+а нужные хэндлеры находятся по имени команды в словаре
+"""
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+from aiogram import Router
+from aiogram.dispatcher.event.bases import UNHANDLED, SkipHandler
+from aiogram.dispatcher.event.handler import CallbackType, HandlerObject
+from aiogram.dispatcher.event.telegram import TelegramEventObserver
+from aiogram.filters import CommandObject
+from aiogram.types import Message
+
+# Превращает аргументы команды в значение для хэндлера,
+# None означает, что аргументы неверные
+ArgumentParser = Callable[[CommandObject], Any]
+
+
+class Fixed:
+    """
+    Значение, зашитое в саму команду, например, 25 для /donate_25
+    """
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __call__(self, command: CommandObject) -> Any:
+        return self.value
+
+
+class IntRange:
+    """
+    Целое число в аргументах команды, например, /donate 100
+    """
+
+    def __init__(self, min_value: int, max_value: int):
+        self.min_value = min_value
+        self.max_value = max_value
+
+    def __call__(self, command: CommandObject) -> Optional[int]:
+        if command.args is None or not command.args.isdigit():
+            return None
+        value = int(command.args)
+        if not self.min_value <= value <= self.max_value:
+            return None
+        return value
+
+
+@dataclass(frozen=True)
+class CommandRoute:
+    # Номер хэндлера в observer.handlers: список могут менять
+    # (например, инструментация заменяет хэндлеры обёртками),
+    # поэтому сам объект хэндлера здесь не храним
+    index: int
+    parse: Optional[ArgumentParser]
+    param: str
+
+
+class CommandTableObserver(TelegramEventObserver):
+    """
+    Observer сообщений с таблицей команд.
+
+    Хэндлеры, зарегистрированные через command(), выбираются по имени команды;
+    остальные хэндлеры проверяются как обычно, но только если команда
+    не нашлась в таблице или ни один её хэндлер не подошёл
+    """
+
+    def __init__(self, router: Router, event_name: str, prefix: str = "/"):
+        super().__init__(router=router, event_name=event_name)
+        self.prefix = prefix
+        self.commands: dict[str, list[CommandRoute]] = dict()
+        # Номера хэндлеров, зарегистрированных обычным способом
+        self.plain: list[int] = list()
+
+    def register(self, callback: CallbackType, *filters: CallbackType, **kwargs: Any) -> CallbackType:
+        super().register(callback, *filters, **kwargs)
+        self.plain.append(len(self.handlers) - 1)
+        return callback
+
+    def command(
+            self,
+            *names: str,
+            parse: Optional[ArgumentParser] = None,
+            param: str = "args",
+            flags: Optional[dict[str, Any]] = None
+    ) -> Callable[[CallbackType], CallbackType]:
+        """
+        Декоратор для регистрации хэндлера команд
+
+        :param names: имена команд без префикса, например, "donate"
+        :param parse: (опционально) разбор аргументов, например, IntRange(1, 2500)
+        :param param: под каким именем передать хэндлеру результат parse
+        :param flags: флаги хэндлера
+        :return: декоратор
+        """
+        def wrapper(callback: CallbackType) -> CallbackType:
+            # Регистрируем в обход self.register(), чтобы хэндлер не попал в plain
+            super(CommandTableObserver, self).register(callback, flags=flags)
+            route = CommandRoute(index=len(self.handlers) - 1, parse=parse, param=param)
+            for name in names:
+                self.commands.setdefault(name, []).append(route)
+            return callback
+        return wrapper
+
+    def _parse(self, message: Message) -> Optional[tuple[list[CommandRoute], CommandObject]]:
+        # Разбор как в aiogram.filters.Command, но один раз на сообщение
+        text = message.text or message.caption
+        if not text or not text.startswith(self.prefix):
+            return None
+        full_command, *args = text.split(maxsplit=1)
+        command, _, mention = full_command[len(self.prefix):].partition("@")
+        routes = self.commands.get(command)
+        if not routes:
+            return None
+        return routes, CommandObject(
+            prefix=self.prefix,
+            command=command,
+            mention=mention or None,
+            args=args[0] if args else None
+        )
+
+    async def _try_handler(self, handler: HandlerObject, event: Message, kwargs: dict[str, Any]) -> Any:
+        # То же, что делает TelegramEventObserver.trigger() для одного хэндлера
+        kwargs["handler"] = handler
+        result, data = await handler.check(event, **kwargs)
+        if not result:
+            return UNHANDLED
+        kwargs.update(data)
+        try:
+            wrapped_inner = self.outer_middleware.wrap_middlewares(
+                self._resolve_middlewares(),
+                handler.call,
+            )
+            return await wrapped_inner(event, kwargs)
+        except SkipHandler:
+            return UNHANDLED
+
+    async def trigger(self, event: Message, **kwargs: Any) -> Any:
+        parsed = self._parse(event)
+        if parsed is not None:
+            routes, command = parsed
+            # Команда для другого бота в группе, например, /donate@other_bot
+            if command.mention and command.mention.lower() != await self._username(kwargs):
+                parsed = None
+        if parsed is not None:
+            for route in routes:
+                data = dict(kwargs, command=command)
+                if route.parse is not None:
+                    data[route.param] = route.parse(command)
+                result = await self._try_handler(self.handlers[route.index], event, data)
+                if result is not UNHANDLED:
+                    return result
+
+        for index in self.plain:
+            result = await self._try_handler(self.handlers[index], event, dict(kwargs))
+            if result is not UNHANDLED:
+                return result
+        return UNHANDLED
+
+    @staticmethod
+    async def _username(kwargs: dict[str, Any]) -> str:
+        # bot.me() кэшируется внутри aiogram, запрос к Bot API будет только первый
+        me = await kwargs["bot"].me()
+        return (me.username or "").lower()
+
+
+class CommandRouter(Router):
+    """
+    Router, у которого сообщения обрабатывает CommandTableObserver:
+
+        router = CommandRouter()
+
+        @router.message.command("donate", parse=IntRange(1, 2500), param="amount")
+        async def cmd_donate(message: Message, amount: Optional[int]): ...
+    """
+
+    def __init__(self, *, name: Optional[str] = None, prefix: str = "/"):
+        super().__init__(name=name)
+        self.message = CommandTableObserver(router=self, event_name="message", prefix=prefix)
+        self.observers["message"] = self.message
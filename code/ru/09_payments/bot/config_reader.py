@@ -1,8 +1,9 @@
 from enum import StrEnum, auto
 from functools import lru_cache
 from os import getenv
+from pathlib import Path
 from tomllib import load
-from typing import Type, TypeVar
+from typing import Optional, Type, TypeVar
 
 from pydantic import BaseModel, SecretStr, field_validator
 
@@ -14,8 +15,40 @@ class LogRenderer(StrEnum):
     CONSOLE = auto()
 
 
+class LogOverflow(StrEnum):
+    # Выбросить сообщение, если очередь переполнена
+    DROP = auto()
+    # Ждать, пока фоновый поток освободит место
+    BLOCK = auto()
+
+
+class JSONSerializer(StrEnum):
+    JSON = auto()
+    ORJSON = auto()
+
+
+class RunMode(StrEnum):
+    POLLING = auto()
+    WEBHOOK = auto()
+
+
 class BotConfig(BaseModel):
     token: SecretStr
+    run_mode: RunMode = RunMode.POLLING
+    webhook_url: Optional[str] = None
+    webhook_path: str = "/webhook"
+    webhook_secret: Optional[SecretStr] = None
+    webhook_host: str = "127.0.0.1"
+    webhook_port: int = 8080
+    webhook_max_workers: int = 100
+    api_url: Optional[str] = None
+    # Соблюдать ли лимиты Telegram на отправку сообщений (см. bot/ratelimit.py)
+    rate_limit: bool = True
+
+    @field_validator('run_mode', mode="before")
+    @classmethod
+    def run_mode_to_lower(cls, v: str):
+        return v.lower()
 
 
 class LogConfig(BaseModel):
@@ -25,13 +58,53 @@ class LogConfig(BaseModel):
     time_in_utc: bool
     use_colors_in_console: bool
     renderer: LogRenderer
+    # Размер очереди для записи логов в фоновом потоке (0 — писать сразу)
+    queue_size: int = 10000
+    queue_overflow: LogOverflow = LogOverflow.DROP
+    json_serializer: JSONSerializer = JSONSerializer.JSON
 
-    @field_validator('renderer', mode="before")
+    @field_validator('renderer', 'queue_overflow', 'json_serializer', mode="before")
     @classmethod
     def log_renderer_to_lower(cls, v: str):
         return v.lower()
 
 
+class TimingConfig(BaseModel):
+    enabled: bool = False
+    log_interval: Optional[int] = 60
+
+
+class L10nConfig(BaseModel):
+    # Язык для пользователей, чьего языка нет в каталоге bot/l10n
+    default_locale: str = "ru"
+    # Сколько отформатированных сообщений с аргументами кэшировать на каждый язык
+    cache_size: int = 1024
+    # Как часто проверять изменения .ftl-файлов, в секундах (None — не проверять)
+    reload_interval: Optional[float] = 5
+
+
+class LedgerConfig(BaseModel):
+    # Файл SQLite с журналом платежей
+    path: Path = Path("payments.db")
+    # Сколько секунд копить новые платежи, чтобы записать их одной транзакцией
+    commit_delay: float = 0.01
+    max_batch: int = 500
+
+
+class InvoiceLinksConfig(BaseModel):
+    # Сколько секунд хранить созданную ссылку на оплату
+    ttl: float = 3600
+    max_size: int = 1024
+    # Суммы, ссылки на которые создаются сразу при запуске
+    warm_amounts: list[int] = [1]
+
+
+class MetricsConfig(BaseModel):
+    enabled: bool = False
+    host: str = "127.0.0.1"
+    port: int = 9102
+
+
 class Config(BaseModel):
     bot: BotConfig
 
@@ -50,8 +123,11 @@ def parse_config_file() -> dict:
 
 
 @lru_cache
-def get_config(model: Type[ConfigType], root_key: str) -> ConfigType:
+def get_config(model: Type[ConfigType], root_key: str, optional: bool = False) -> ConfigType:
     config_dict = parse_config_file()
+    if optional and root_key not in config_dict:
+        # Необязательная секция: берём значения по умолчанию из модели
+        return model()
     if root_key not in config_dict:
         error = f"Key {root_key} not found"
         raise ValueError(error)
@@ -1,34 +1,343 @@
+import asyncio
+from collections import OrderedDict
 from pathlib import Path
+from typing import Any, Generator, Optional, Union
 
-from fluent.runtime import FluentLocalization, FluentResourceLoader
+import structlog
+from aiogram import Dispatcher
+from fluent.runtime import AbstractResourceLoader, FluentLocalization
+from fluent.syntax import FluentParser, ast
+from structlog.typing import FilteringBoundLogger
 
+logger: FilteringBoundLogger = structlog.get_logger()
 
-def get_fluent_localization() -> FluentLocalization:
+
+class SnapshotResourceLoader(AbstractResourceLoader):
+    """
+    Загрузчик, который сразу читает и разбирает все .ftl-файлы
+    из подкаталогов языков (l10n/ru/**/*.ftl, l10n/en/**/*.ftl и т.д.)
+    и дальше отдаёт только их, не обращаясь к диску.
+    Поэтому локализации, созданные с ним, не видят изменений файлов,
+    сделанных после загрузки
+    """
+
+    def __init__(self, locale_dir: Path):
+        """
+        :param locale_dir: каталог с подкаталогами языков
+        """
+        # код языка -> {путь к файлу относительно каталога языка: разобранный файл}
+        self.files: dict[str, dict[str, ast.Resource]] = dict()
+        # Синтаксические ошибки в файлах; такие сообщения Fluent пропускает
+        self.errors: list[str] = list()
+        parser = FluentParser()
+        for path in sorted(locale_dir.iterdir()):
+            if not path.is_dir():
+                continue
+            files = dict()
+            for file in sorted(path.rglob("*.ftl")):
+                resource = parser.parse(file.read_text(encoding="utf-8"))
+                for entry in resource.body:
+                    if isinstance(entry, ast.Junk):
+                        self.errors.extend(
+                            f"{file}: {annotation.message}" for annotation in entry.annotations
+                        )
+                files[file.relative_to(path).as_posix()] = resource
+            if files:
+                self.files[path.name.lower()] = files
+
+    @property
+    def resource_ids(self) -> list[str]:
+        return sorted({resource_id for files in self.files.values() for resource_id in files})
+
+    def message_ids(self, locale: str) -> set[str]:
+        return {
+            entry.id.name
+            for resource in self.files.get(locale, {}).values()
+            for entry in resource.body
+            if isinstance(entry, ast.Message) and entry.value is not None
+        }
+
+    def resources(
+            self,
+            locale: str,
+            resource_ids: list[str]
+    ) -> Generator[list[ast.Resource], None, None]:
+        files = self.files.get(locale, {})
+        resources = [files[resource_id] for resource_id in resource_ids if resource_id in files]
+        if resources:
+            yield resources
+
+
+class CachedFluentLocalization(FluentLocalization):
     """
-    Загрузка файла с локалями 'locale.ftl' из каталога 'l10n' в текущем расположении
-    :return: объект FluentLocalization
+    FluentLocalization, который не форматирует одно и то же дважды.
+
+    Сообщения без аргументов (например, "cmd-start") форматируются один раз
+    при создании объекта. Результаты с аргументами
+    (например, "invoice-description" с {"starsCount": 50}) запоминаются
+    в LRU-кэше ограниченного размера с ключом (id сообщения, аргументы)
+    """
+
+    def __init__(self, *args: Any, cache_size: int = 1024, **kwargs: Any):
+        """
+        :param args: аргументы для FluentLocalization
+        :param cache_size: сколько результатов с аргументами держать в кэше
+        :param kwargs: аргументы для FluentLocalization
+        """
+        super().__init__(*args, **kwargs)
+        self.cache_size = cache_size
+        self._cache: OrderedDict[tuple, str] = OrderedDict()
+        self._static: dict[str, str] = dict()
+        # Создаём все бандлы сразу, а не при первом обращении
+        for _ in self._bundles():
+            pass
+        for msg_id in self._message_ids():
+            value, errors = self._format(msg_id, None)
+            # Если без аргументов не было ошибок, значит,
+            # результат от аргументов и не зависит
+            if not errors:
+                self._static[msg_id] = value
+
+    def _message_ids(self) -> set[str]:
+        msg_ids = set()
+        for locale in self.locales:
+            if isinstance(self.resource_loader, SnapshotResourceLoader):
+                msg_ids.update(self.resource_loader.message_ids(locale))
+                continue
+            for resources in self.resource_loader.resources(locale, self.resource_ids):
+                for resource in resources:
+                    msg_ids.update(
+                        entry.id.name for entry in resource.body
+                        if isinstance(entry, ast.Message) and entry.value is not None
+                    )
+        return msg_ids
+
+    def _format(self, msg_id: str, args: Optional[dict[str, Any]]) -> tuple[str, list]:
+        # То же, что и FluentLocalization.format_value(), но с ошибками форматирования
+        for bundle in self._bundles():
+            if not bundle.has_message(msg_id):
+                continue
+            msg = bundle.get_message(msg_id)
+            if not msg.value:
+                continue
+            return bundle.format_pattern(msg.value, args)
+        return msg_id, []
+
+    def format_value(self, msg_id: str, args: Optional[dict[str, Any]] = None) -> str:
+        static = self._static.get(msg_id)
+        if static is not None:
+            return static
+        if not args:
+            return self._format(msg_id, args)[0]
+        try:
+            key = (msg_id, *sorted(args.items()))
+            hash(key)
+        except TypeError:
+            # Нехэшируемые аргументы (например, списки) не кэшируем
+            return self._format(msg_id, args)[0]
+        cache = self._cache
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+            return value
+        value = cache[key] = self._format(msg_id, args)[0]
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return value
+
+
+def scan_locale_files(locale_dir: Path) -> dict[str, tuple[int, int]]:
+    """
+    :param locale_dir: каталог с подкаталогами языков
+    :return: словарь {путь к .ftl-файлу: (время изменения в нс, размер)}
+    """
+    result = dict()
+    for file in locale_dir.rglob("*.ftl"):
+        try:
+            stat = file.stat()
+        except FileNotFoundError:
+            # Файл удалили между обходом каталога и stat()
+            continue
+        result[str(file)] = (stat.st_mtime_ns, stat.st_size)
+    return result
+
+
+class LocaleSnapshot:
+    """
+    Набор локализаций, загруженных за один раз.
+    После создания меняется только кэш кодов языков
+    """
+
+    def __init__(
+            self,
+            locales: dict[str, CachedFluentLocalization],
+            default_locale: str,
+            files: dict[str, tuple[int, int]],
+            errors: list[str]
+    ):
+        if default_locale not in locales:
+            error = f"Default locale '{default_locale}' not found"
+            raise ValueError(error)
+        self.locales = locales
+        self.default = locales[default_locale]
+        # Состояние файлов на момент загрузки, с ним сверяется watch_locales()
+        self.files = files
+        self.errors = errors
+        # language_code из Telegram -> локализация, чтобы не разбирать код каждый раз
+        self.by_language_code: dict[Optional[str], CachedFluentLocalization] = dict()
+
+
+class FluentLocalizations:
+    """
+    Набор локализаций, по одной на каждый язык из каталога l10n.
+    Язык выбирается по language_code пользователя, при его отсутствии
+    используется язык по умолчанию. Недостающие в переводе строки
+    также берутся из языка по умолчанию.
+
+    При перезагрузке новый набор собирается целиком и подменяется
+    одним присваиванием, поэтому чтение обходится без блокировок,
+    а хэндлер, уже получивший локализацию, дорабатывает со старыми строками
+    """
+
+    def __init__(self, locale_dir: Path, default_locale: str = "ru", cache_size: int = 1024):
+        """
+        :param locale_dir: каталог с подкаталогами языков
+        :param default_locale: код языка по умолчанию
+        :param cache_size: размер LRU-кэша сообщений с аргументами для каждого языка
+        """
+        self.locale_dir = locale_dir
+        self.default_locale = default_locale
+        self.cache_size = cache_size
+        self.snapshot = self.load()
+        for error in self.snapshot.errors:
+            logger.error("Fluent syntax error", error=error)
+
+    def load(self) -> LocaleSnapshot:
+        """
+        Читает все файлы локалей с диска. Текущий набор не меняет
+
+        :return: новый набор локализаций
+        """
+        # Сначала запоминаем состояние файлов, потом читаем: если файл
+        # изменится во время чтения, следующая проверка это заметит
+        files = scan_locale_files(self.locale_dir)
+        loader = SnapshotResourceLoader(self.locale_dir)
+        locales = dict()
+        for code in loader.files:
+            # Недостающие строки ищутся в языке по умолчанию
+            fallback = [code] if code == self.default_locale else [code, self.default_locale]
+            locales[code] = CachedFluentLocalization(
+                locales=fallback,
+                resource_ids=loader.resource_ids,
+                resource_loader=loader,
+                cache_size=self.cache_size
+            )
+        return LocaleSnapshot(locales, self.default_locale, files, loader.errors)
+
+    @property
+    def locales(self) -> dict[str, CachedFluentLocalization]:
+        return self.snapshot.locales
+
+    @property
+    def default(self) -> CachedFluentLocalization:
+        return self.snapshot.default
+
+    def get(self, language_code: Optional[str]) -> CachedFluentLocalization:
+        """
+        :param language_code: код языка пользователя, например, "en" или "pt-br"
+        :return: подходящая локализация или локализация по умолчанию
+        """
+        snapshot = self.snapshot
+        l10n = snapshot.by_language_code.get(language_code)
+        if l10n is None:
+            l10n = snapshot.default
+            if language_code:
+                code = language_code.lower()
+                l10n = snapshot.locales.get(code) or snapshot.locales.get(code.split("-")[0], l10n)
+            # Кодов языков в Telegram конечное число, так что словарь не разрастётся
+            snapshot.by_language_code[language_code] = l10n
+        return l10n
+
+
+async def watch_locales(locales: FluentLocalizations, interval: float):
+    """
+    Периодически проверяет время изменения и размер .ftl-файлов
+    и при изменениях перечитывает все локали.
+    Если в новых файлах есть синтаксические ошибки или нет языка
+    по умолчанию, остаются прежние строки
+
+    :param locales: набор локализаций
+    :param interval: пауза между проверками в секундах
+    """
+    checked = locales.snapshot.files
+    while True:
+        await asyncio.sleep(interval)
+        files = await asyncio.to_thread(scan_locale_files, locales.locale_dir)
+        if files == checked:
+            continue
+        checked = files
+        try:
+            # Разбор файлов — заметная работа, не задерживаем ею апдейты
+            snapshot = await asyncio.to_thread(locales.load)
+        except Exception as error:
+            await logger.aerror("Failed to reload locales", error=repr(error))
+            continue
+        if snapshot.errors:
+            await logger.aerror("Locales not reloaded: Fluent syntax errors", errors=snapshot.errors)
+            continue
+        checked = snapshot.files
+        locales.snapshot = snapshot
+        await logger.ainfo("Locales reloaded", locales=sorted(snapshot.locales))
+
+
+def setup_locales_reload(dp: Dispatcher, locales: FluentLocalizations, interval: float) -> None:
+    """
+    Запускает watch_locales() вместе с ботом и останавливает при выключении
+
+    :param dp: объект диспетчера
+    :param locales: набор локализаций
+    :param interval: пауза между проверками в секундах
+    """
+    tasks: set[asyncio.Task] = set()
+
+    async def on_startup():
+        tasks.add(asyncio.create_task(watch_locales(locales, interval)))
+
+    async def on_shutdown():
+        for task in tasks:
+            task.cancel()
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+
+
+def get_fluent_localization(
+        default_locale: str = "ru",
+        cache_size: int = 1024,
+        locale_dir: Union[str, Path, None] = None
+) -> FluentLocalizations:
+    """
+    Загрузка файлов с локалями (*.ftl) из подкаталогов каталога 'l10n'
+    в текущем расположении, по одному подкаталогу на язык: l10n/ru, l10n/en и т.д.
+    Внутри подкаталога файлов может быть несколько, в том числе во вложенных каталогах
+    :param default_locale: код языка по умолчанию
+    :param cache_size: размер LRU-кэша сообщений с аргументами для каждого языка
+    :param locale_dir: (опционально) другой каталог с локалями
+    :return: объект FluentLocalizations
     """
 
     # Проверки, чтобы убедиться
-    # в наличии правильного файла в правильном каталоге
-    locale_dir = Path(__file__).parent.joinpath("l10n")
+    # в наличии правильного каталога
+    locale_dir = Path(locale_dir or Path(__file__).parent.joinpath("l10n"))
     if not locale_dir.exists():
         error = "'l10n' directory not found"
         raise FileNotFoundError(error)
     if not locale_dir.is_dir():
         error = "'l10n' is not a directory"
         raise NotADirectoryError(error)
-    locale_file = Path(locale_dir, "locale.ftl")
-    if not locale_file.exists():
-        error = "locale.txt file not found"
-        raise FileNotFoundError(error)
 
-    # Создание необходимых объектов и возврат объекта FluentLocalization
-    l10n_loader = FluentResourceLoader(
-        str(locale_file.absolute()),
-    )
-    return FluentLocalization(
-        locales=["ru"],
-        resource_ids=[str(locale_file.absolute())],
-        resource_loader=l10n_loader
+    return FluentLocalizations(
+        locale_dir.absolute(),
+        default_locale=default_locale,
+        cache_size=cache_size
     )
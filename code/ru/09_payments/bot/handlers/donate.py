@@ -1,16 +1,24 @@
+from typing import Optional
+
 import structlog
-from aiogram import F, Router, Bot
+from aiogram import F, Bot
 from aiogram.exceptions import TelegramBadRequest
-from aiogram.filters import CommandStart, Command, CommandObject
+from aiogram.filters import CommandObject
 from aiogram.types import Message, LabeledPrice, PreCheckoutQuery, InlineKeyboardMarkup
 from fluent.runtime import FluentLocalization
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-router = Router()
+from bot.command_router import CommandRouter, Fixed, IntRange
+from bot.invoice_links import InvoiceLinkCache
+from bot.ledger import PaymentLedger
+from bot.metrics import BotMetrics
+
+# Команды ищутся по имени в словаре, а не перебором фильтров Command(...)
+router = CommandRouter()
 logger = structlog.get_logger()
 
 
-@router.message(CommandStart())
+@router.message.command("start")
 async def cmd_start(
     message: Message,
     l10n: FluentLocalization,
@@ -21,32 +29,23 @@ async def cmd_start(
     )
 
 
-@router.message(Command("donate_1"))
-@router.message(Command("donate_25"))
-@router.message(Command("donate_50"))
-@router.message(Command("donate"))
+# Сумма для /donate_1, /donate_25 и /donate_50 зашита в саму команду,
+# а для /donate ЧИСЛО берётся из аргументов с проверкой на число и диапазон
+@router.message.command("donate_1", parse=Fixed(1), param="amount")
+@router.message.command("donate_25", parse=Fixed(25), param="amount")
+@router.message.command("donate_50", parse=Fixed(50), param="amount")
+@router.message.command("donate", parse=IntRange(1, 2500), param="amount")
 async def cmd_donate(
     message: Message,
-    command: CommandObject,
+    amount: Optional[int],
     l10n: FluentLocalization,
 ):
-    # Если это команда /donate ЧИСЛО,
-    # тогда вытаскиваем число из текста команды
-    if command.command != "donate":
-        amount = int(command.command.split("_")[1])
-    # В противном случае пытаемся парсить пользовательский ввод
-    else:
-        # Проверка на число и на его диапазон
-        if (
-            command.args is None
-            or not command.args.isdigit()
-            or not 1 <= int(command.args) <= 2500
-        ):
-            await message.answer(
-                l10n.format_value("custom-donate-input-error")
-            )
-            return
-        amount = int(command.args)
+    # None — значит, пользователь ввёл не число или число вне диапазона
+    if amount is None:
+        await message.answer(
+            l10n.format_value("custom-donate-input-error")
+        )
+        return
 
     builder = InlineKeyboardBuilder()
     builder.button(
@@ -81,7 +80,7 @@ async def cmd_donate(
     )
 
 
-@router.message(Command("paysupport"))
+@router.message.command("paysupport")
 async def cmd_paysupport(
     message: Message,
     l10n: FluentLocalization
@@ -89,12 +88,13 @@ async def cmd_paysupport(
     await message.answer(l10n.format_value("cmd-paysupport"))
 
 
-@router.message(Command("refund"))
+@router.message.command("refund")
 async def cmd_refund(
     message: Message,
     bot: Bot,
     command: CommandObject,
     l10n: FluentLocalization,
+    ledger: PaymentLedger,
 ):
     transaction_id = command.args
     if transaction_id is None:
@@ -102,11 +102,23 @@ async def cmd_refund(
             l10n.format_value("refund-no-code-provided")
         )
         return
+    # Сначала проверяем код по своему журналу: повторные возвраты
+    # известных платежей отсекаются без запроса к Bot API.
+    # Платежа может не быть в журнале (например, он сделан до появления журнала
+    # или его запись не удалась), тогда решение остаётся за Bot API
+    payment = await ledger.get_payment(message.from_user.id, transaction_id)
+    if payment is not None and payment.refunded:
+        await message.answer(
+            l10n.format_value("refund-already-refunded")
+        )
+        return
     try:
         await bot.refund_star_payment(
             user_id=message.from_user.id,
             telegram_payment_charge_id=transaction_id
         )
+        if payment is not None:
+            await ledger.record_refund(transaction_id)
         await message.answer(
             l10n.format_value("refund-successful")
         )
@@ -114,6 +126,9 @@ async def cmd_refund(
         if "CHARGE_NOT_FOUND" in error.message:
             text = l10n.format_value("refund-code-not-found")
         elif "CHARGE_ALREADY_REFUNDED" in error.message:
+            # Возврат сделан в обход бота, запомним его
+            if payment is not None:
+                await ledger.record_refund(transaction_id)
             text = l10n.format_value("refund-already-refunded")
         else:
             # При всех остальных ошибках – такой же текст,
@@ -123,23 +138,15 @@ async def cmd_refund(
         return
 
 
-@router.message(Command("donate_link"))
+@router.message.command("donate_link")
 async def cmd_link(
     message: Message,
     bot: Bot,
     l10n: FluentLocalization,
+    invoice_links: InvoiceLinkCache,
 ):
-    invoice_link = await bot.create_invoice_link(
-        title=l10n.format_value("invoice-title"),
-        description=l10n.format_value(
-            "invoice-description",
-            {"starsCount": 1}
-        ),
-        prices=[LabeledPrice(label="XTR", amount=1)],
-        provider_token="",
-        payload="demo",
-        currency="XTR"
-    )
+    # Ссылка одинаковая для всех с тем же языком, поэтому берётся из кэша
+    invoice_link = await invoice_links.get(bot, l10n, amount=1)
     await message.answer(
         l10n.format_value(
             "invoice-link-text",
@@ -164,7 +171,29 @@ async def on_pre_checkout_query(
 async def on_successful_payment(
     message: Message,
     l10n: FluentLocalization,
+    ledger: PaymentLedger,
+    metrics: Optional[BotMetrics] = None,
 ):
+    payment = message.successful_payment
+    # Telegram может доставить один и тот же апдейт повторно,
+    # второй раз благодарить и учитывать донат не нужно
+    is_new = await ledger.record_payment(
+        telegram_payment_charge_id=payment.telegram_payment_charge_id,
+        user_id=message.from_user.id,
+        amount=payment.total_amount,
+        currency=payment.currency,
+        payload=payment.invoice_payload
+    )
+    if not is_new:
+        await logger.awarning(
+            "Повторный апдейт о донате пропущен",
+            charge_id=payment.telegram_payment_charge_id,
+            from_user_id=message.from_user.id
+        )
+        return
+    # Метрик нет, если они выключены в настройках
+    if metrics is not None:
+        metrics.record_donation(payment.currency, payment.total_amount)
     await logger.ainfo(
         "Получен новый донат!",
         amount=message.successful_payment.total_amount,
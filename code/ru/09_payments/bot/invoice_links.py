@@ -0,0 +1,152 @@
+"""
+Кэш ссылок на оплату из createInvoiceLink.
+
+Ссылка зависит только от суммы, языка (название и описание счёта)
+и пейлоада, поэтому создавать её заново на каждую команду незачем.
+После перезагрузки локалей (см. watch_locales) ссылки создаются заново,
+ведь название и описание счёта могли измениться
+"""
+import asyncio
+import time
+from typing import Iterable, Optional
+
+import structlog
+from aiogram import Bot, Dispatcher
+from aiogram.types import LabeledPrice
+from fluent.runtime import FluentLocalization
+from structlog.typing import FilteringBoundLogger
+
+from bot.fluent_loader import FluentLocalizations
+
+logger: FilteringBoundLogger = structlog.get_logger()
+
+# (сумма, язык, шаблон пейлоада)
+LinkKey = tuple[int, str, str]
+
+
+class InvoiceLinkCache:
+    """
+    Кэш ссылок на оплату с ограниченным временем жизни.
+
+    Если ссылки нет в кэше, а её одновременно просят много пользователей,
+    то запрос к Bot API уходит один, и все ждут его результата
+    """
+
+    def __init__(self, ttl: float = 3600, max_size: int = 1024, payload_template: str = "demo"):
+        """
+        :param ttl: сколько секунд ссылка считается действительной
+        :param max_size: сколько ссылок хранить, самые старые вытесняются
+        :param payload_template: шаблон пейлоада по умолчанию, {amount} заменяется на сумму
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        self.payload_template = payload_template
+        # ключ -> (ссылка, момент истечения по time.monotonic(), локализация).
+        # Локализация нужна, чтобы отличить ссылку, созданную до перезагрузки
+        # локалей: при перезагрузке объекты локализаций создаются заново
+        self._links: dict[LinkKey, tuple[str, float, FluentLocalization]] = dict()
+        # Ссылки, которые создаются прямо сейчас, по ключу и id() локализации
+        self._pending: dict[tuple[LinkKey, int], asyncio.Future] = dict()
+
+    async def get(
+            self,
+            bot: Bot,
+            l10n: FluentLocalization,
+            amount: int,
+            payload_template: Optional[str] = None
+    ) -> str:
+        """
+        Возвращает ссылку на оплату из кэша или создаёт новую
+
+        :param bot: объект бота
+        :param l10n: локализация, из неё берутся название и описание счёта
+        :param amount: сумма в звёздах
+        :param payload_template: (опционально) другой шаблон пейлоада
+        :return: ссылка на оплату
+        """
+        key = (amount, l10n.locales[0], payload_template or self.payload_template)
+        cached = self._links.get(key)
+        if cached is not None and cached[1] > time.monotonic() and cached[2] is l10n:
+            return cached[0]
+
+        # Пока ссылка создаётся, задача держит ссылку на l10n, так что id() не повторится
+        pending_key = (key, id(l10n))
+        future = self._pending.get(pending_key)
+        if future is None:
+            future = asyncio.ensure_future(self._create(bot, l10n, key))
+            self._pending[pending_key] = future
+            future.add_done_callback(lambda _: self._pending.pop(pending_key, None))
+        # shield: если отменят одного из ждущих, остальные всё равно получат ссылку
+        return await asyncio.shield(future)
+
+    async def _create(self, bot: Bot, l10n: FluentLocalization, key: LinkKey) -> str:
+        amount, _, payload_template = key
+        link = await bot.create_invoice_link(
+            title=l10n.format_value("invoice-title"),
+            description=l10n.format_value(
+                "invoice-description",
+                {"starsCount": amount}
+            ),
+            prices=[LabeledPrice(label="XTR", amount=amount)],
+            provider_token="",
+            payload=payload_template.format(amount=amount),
+            currency="XTR"
+        )
+        self._links.pop(key, None)
+        self._links[key] = (link, time.monotonic() + self.ttl, l10n)
+        while len(self._links) > self.max_size:
+            # Словарь помнит порядок вставки: первой идёт самая старая ссылка
+            del self._links[next(iter(self._links))]
+        return link
+
+    async def warm(
+            self,
+            bot: Bot,
+            locales: FluentLocalizations,
+            amounts: Iterable[int]
+    ) -> None:
+        """
+        Заранее создаёт ссылки на популярные суммы для всех языков
+
+        :param bot: объект бота
+        :param locales: набор локализаций
+        :param amounts: суммы в звёздах
+        """
+        requests = [
+            self.get(bot, l10n, amount)
+            for l10n in locales.locales.values()
+            for amount in amounts
+        ]
+        results = await asyncio.gather(*requests, return_exceptions=True)
+        errors = [repr(result) for result in results if isinstance(result, BaseException)]
+        if errors:
+            await logger.awarning("Some invoice links were not created", errors=errors)
+        await logger.ainfo("Invoice links warmed up", count=len(results) - len(errors))
+
+
+def setup_invoice_links_warmup(
+        dp: Dispatcher,
+        cache: InvoiceLinkCache,
+        locales: FluentLocalizations,
+        amounts: Iterable[int]
+) -> None:
+    """
+    Прогревает кэш в фоне при запуске бота, не задерживая сам запуск
+
+    :param dp: объект диспетчера
+    :param cache: кэш ссылок
+    :param locales: набор локализаций
+    :param amounts: суммы в звёздах
+    """
+    amounts = list(amounts)
+    tasks: set[asyncio.Task] = set()
+
+    async def on_startup(bot: Bot):
+        tasks.add(asyncio.create_task(cache.warm(bot, locales, amounts)))
+
+    async def on_shutdown():
+        for task in tasks:
+            task.cancel()
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
@@ -0,0 +1,47 @@
+cmd-start =
+    Hello! Thank you for using this bot. The following commands are available:
+
+    • /donate_1: donate 1 star.
+    • /donate_25: donate 25 stars.
+    • /donate_50: donate 50 stars.
+    • /donate <number>: donate <number> stars.
+    • /paysupport: help with purchases.
+    • /refund: refund a payment.
+
+custom-donate-input-error = Please enter the amount as <code>/donate NUMBER</code>, where NUMBER is from 1 to 2500 inclusive.
+
+invoice-title = Voluntary donation
+invoice-description =
+    {$starsCount ->
+        [one] {$starsCount} star
+       *[other] {$starsCount} stars
+}
+
+pre-checkout-failed-reason = No more room for money 😭
+
+cmd-paysupport =
+    If you want to get a refund for a purchase, use the /refund command
+
+refund-successful =
+    The refund was successful. The stars have already been returned to your Telegram balance.
+
+refund-no-code-provided =
+    Please enter the command <code>/refund CODE</code>, where CODE is the transaction ID.
+    You can see it after the payment and in the "Stars" section of the Telegram app.
+
+refund-code-not-found =
+    No purchase with this code was found. Please check the code and try again.
+
+refund-already-refunded =
+    This purchase has already been refunded.
+
+payment-successful =
+    <b>Thank you very much!</b>
+
+    Your transaction ID:
+    <code>{$id}</code>
+
+    Keep it in case you want a refund later 😢
+
+invoice-link-text =
+    Use <a href="{$link}">this link</a> to donate 1 star.
@@ -0,0 +1,218 @@
+"""
+Журнал платежей в SQLite.
+
+Каждый платёж записывается один раз по telegram_payment_charge_id,
+поэтому повторно доставленный апдейт successful_payment не будет
+обработан дважды. Записи не изменяются и не удаляются: возврат
+добавляется отдельной строкой в таблицу refunds
+"""
+import asyncio
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS payments (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    telegram_payment_charge_id TEXT NOT NULL UNIQUE,
+    user_id INTEGER NOT NULL,
+    amount INTEGER NOT NULL,
+    currency TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS payments_by_user ON payments (user_id, telegram_payment_charge_id);
+
+CREATE TABLE IF NOT EXISTS refunds (
+    telegram_payment_charge_id TEXT PRIMARY KEY
+        REFERENCES payments (telegram_payment_charge_id),
+    created_at REAL NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS payments_no_update BEFORE UPDATE ON payments BEGIN
+    SELECT RAISE(ABORT, 'payments are append-only');
+END;
+CREATE TRIGGER IF NOT EXISTS payments_no_delete BEFORE DELETE ON payments BEGIN
+    SELECT RAISE(ABORT, 'payments are append-only');
+END;
+"""
+
+
+@dataclass(frozen=True)
+class Payment:
+    telegram_payment_charge_id: str
+    user_id: int
+    amount: int
+    currency: str
+    payload: str
+    refunded: bool
+
+
+class PaymentLedger:
+    """
+    Журнал платежей в SQLite-файле.
+
+    Модуль sqlite3 синхронный, поэтому все запросы выполняются
+    в отдельном потоке, причём ровно в одном. Новые платежи
+    записываются пачками: все платежи, пришедшие за commit_delay секунд,
+    попадают в одну транзакцию, и при всплеске платежей каждый не ждёт
+    своего отдельного fsync. record_payment() возвращает
+    управление только после коммита, сброшенного на диск
+    """
+
+    def __init__(
+            self,
+            path: Union[str, Path],
+            commit_delay: float = 0.01,
+            max_batch: int = 500
+    ):
+        """
+        :param path: путь к файлу БД
+        :param commit_delay: сколько секунд копить платежи перед коммитом
+        :param max_batch: после скольких платежей коммитить, не дожидаясь commit_delay
+        """
+        self._executor = ThreadPoolExecutor(
+            max_workers=1,
+            thread_name_prefix="payment-ledger"
+        )
+        self._connection: Optional[sqlite3.Connection] = None
+        self._path = path
+        self.commit_delay = commit_delay
+        self.max_batch = max_batch
+        # Платежи, ждущие коммита: (параметры INSERT, future с результатом)
+        self._pending: list[tuple[tuple, asyncio.Future]] = list()
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._flushes: set[asyncio.Task] = set()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(self._path, check_same_thread=False)
+            # WAL позволяет читать, не дожидаясь окончания записи,
+            # а synchronous=FULL делает fsync на каждом коммите: платёж,
+            # о записи которого сообщил record_payment(), не пропадёт
+            # даже при отключении питания
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=FULL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    async def _run(self, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        def wrapper():
+            connection = self._connect()
+            with connection:
+                return func(connection)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, wrapper)
+
+    async def record_payment(
+            self,
+            telegram_payment_charge_id: str,
+            user_id: int,
+            amount: int,
+            currency: str,
+            payload: str
+    ) -> bool:
+        """
+        Записывает платёж, если его ещё нет в журнале
+
+        :return: True, если платёж новый, False, если он уже был записан
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((
+            (telegram_payment_charge_id, user_id, amount, currency, payload, time.time()),
+            future
+        ))
+        if len(self._pending) >= self.max_batch:
+            self._schedule_flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.commit_delay, self._schedule_flush)
+        return await future
+
+    def _schedule_flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, list()
+        task = asyncio.create_task(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: list[tuple[tuple, asyncio.Future]]) -> None:
+        def insert(db: sqlite3.Connection) -> list[bool]:
+            # Дубликаты (в том числе внутри одной пачки) молча пропускаются,
+            # rowcount показывает, была ли строка действительно добавлена
+            return [
+                db.execute(
+                    "INSERT OR IGNORE INTO payments "
+                    "(telegram_payment_charge_id, user_id, amount, currency, payload, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    params
+                ).rowcount == 1
+                for params, _ in batch
+            ]
+
+        try:
+            results = await self._run(insert)
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, future), is_new in zip(batch, results):
+            if not future.done():
+                future.set_result(is_new)
+
+    async def get_payment(self, user_id: int, telegram_payment_charge_id: str) -> Optional[Payment]:
+        """
+        Ищет платёж пользователя по индексу (user_id, telegram_payment_charge_id)
+
+        :return: платёж или None, если у этого пользователя такого платежа нет
+        """
+        row = await self._run(lambda db: db.execute(
+            "SELECT p.telegram_payment_charge_id, p.user_id, p.amount, p.currency, p.payload, "
+            "r.telegram_payment_charge_id IS NOT NULL "
+            "FROM payments p LEFT JOIN refunds r USING (telegram_payment_charge_id) "
+            "WHERE p.user_id = ? AND p.telegram_payment_charge_id = ?",
+            (user_id, telegram_payment_charge_id)
+        ).fetchone())
+        if row is None:
+            return None
+        *fields, refunded = row
+        return Payment(*fields, refunded=bool(refunded))
+
+    async def record_refund(self, telegram_payment_charge_id: str) -> bool:
+        """
+        Отмечает возврат платежа
+
+        :return: True, если возврат новый, False, если он уже был записан
+        """
+        return await self._run(lambda db: db.execute(
+            "INSERT OR IGNORE INTO refunds (telegram_payment_charge_id, created_at) VALUES (?, ?)",
+            (telegram_payment_charge_id, time.time())
+        ).rowcount == 1)
+
+    async def close(self) -> None:
+        """
+        Дописывает ожидающие платежи и закрывает БД
+        """
+        self._schedule_flush()
+        if self._flushes:
+            await asyncio.wait(self._flushes)
+
+        def close():
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, close)
+        self._executor.shutdown()
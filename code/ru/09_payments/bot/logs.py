@@ -1,10 +1,164 @@
+import atexit
+import copy
 import logging
+import queue
+import sys
+import threading
+from functools import partialmethod
 from json import dumps
+from typing import Any, Callable, Optional, TextIO
 
 import structlog
 from structlog import WriteLoggerFactory
 
-from bot.config_reader import LogConfig, LogRenderer
+from bot.config_reader import JSONSerializer, LogConfig, LogOverflow, LogRenderer
+
+# Значения этих типов не меняются, так что копировать их перед записью незачем
+IMMUTABLE_TYPES = (str, int, float, bool, bytes, type(None))
+
+
+def _snapshot(value: Any) -> Any:
+    """
+    Копирует значение из события, чтобы фоновый поток вывел его таким,
+    каким оно было в момент вызова логгера, даже если потом его изменят
+
+    :param value: значение из словаря события
+    :return: копия значения или его repr(), если скопировать не получилось
+    """
+    if isinstance(value, IMMUTABLE_TYPES):
+        return value
+    try:
+        return copy.deepcopy(value)
+    except Exception:
+        return repr(value)
+
+
+class QueueLogger:
+    """
+    Логгер для structlog, который ничего не пишет сам,
+    а только кладёт событие в очередь QueueLoggerFactory
+    """
+
+    def __init__(self, factory: "QueueLoggerFactory"):
+        self._factory = factory
+
+    def msg(self, method_name: str, **event_dict: Any) -> None:
+        self._factory.put(method_name, event_dict)
+
+    debug = partialmethod(msg, "debug")
+    info = partialmethod(msg, "info")
+    warning = partialmethod(msg, "warning")
+    error = partialmethod(msg, "error")
+    critical = partialmethod(msg, "critical")
+    exception = partialmethod(msg, "error")
+    fatal = partialmethod(msg, "critical")
+    log = partialmethod(msg, "info")
+
+
+class QueueLoggerFactory:
+    """
+    Фабрика логгеров, которые форматируют и пишут события в фоновом потоке.
+
+    Процессоры structlog (время, уровень) по-прежнему выполняются сразу,
+    а рендерер (JSON или консольный) и запись в файл — в отдельном потоке.
+    Событие копируется при постановке в очередь, а исключение для
+    logger.exception() достаётся ещё в вызывающем потоке.
+    Очередь ограничена: при переполнении события либо выбрасываются
+    (в лог затем попадает, сколько именно), либо вызывающий ждёт
+    """
+
+    def __init__(
+            self,
+            renderer: Callable[[Any, str, dict], str],
+            file: Optional[TextIO] = None,
+            max_size: int = 10000,
+            overflow: LogOverflow = LogOverflow.DROP,
+            batch_size: int = 1000
+    ):
+        """
+        :param renderer: последний процессор structlog, превращающий событие в строку
+        :param file: куда писать, по умолчанию sys.stdout
+        :param max_size: сколько событий может ждать записи
+        :param overflow: что делать при переполнении очереди
+        :param batch_size: сколько событий записывать за один вызов write()
+        """
+        self.renderer = renderer
+        self.file = file or sys.stdout
+        self.overflow = overflow
+        self.batch_size = batch_size
+        self.queue: queue.Queue = queue.Queue(maxsize=max_size)
+        self.dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._logger = QueueLogger(self)
+        self._thread = threading.Thread(target=self._run, name="structlog-writer", daemon=True)
+        self._thread.start()
+        # Дописываем оставшееся в очереди при выходе из программы
+        atexit.register(self.close)
+
+    def __call__(self, *args: Any) -> QueueLogger:
+        return self._logger
+
+    def put(self, method_name: str, event_dict: dict) -> None:
+        exc_info = event_dict.pop("exc_info", None)
+        event_dict = {key: _snapshot(value) for key, value in event_dict.items()}
+        if exc_info:
+            # sys.exc_info() работает только в потоке, где обрабатывается исключение,
+            # поэтому для logger.exception() достаём его здесь, а не при записи
+            if exc_info is True:
+                exc_info = sys.exc_info()
+            event_dict["exc_info"] = exc_info
+        if self.overflow == LogOverflow.BLOCK:
+            self.queue.put((method_name, event_dict))
+            return
+        try:
+            self.queue.put_nowait((method_name, event_dict))
+        except queue.Full:
+            with self._dropped_lock:
+                self.dropped += 1
+
+    def _render(self, method_name: str, event_dict: dict) -> str:
+        try:
+            return self.renderer(None, method_name, event_dict)
+        except Exception as error:
+            # Одно «плохое» событие не должно останавливать запись остальных
+            return f"Failed to render log event {event_dict!r}: {error!r}"
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            lines = list()
+            for item in batch:
+                if item is None:
+                    stop = True
+                    continue
+                lines.append(self._render(*item))
+            with self._dropped_lock:
+                dropped, self.dropped = self.dropped, 0
+            if dropped:
+                lines.append(self._render(
+                    "warning",
+                    {"event": "Log queue overflow, events dropped", "level": "warning", "count": dropped}
+                ))
+            if lines:
+                self.file.write("\n".join(lines) + "\n")
+                self.file.flush()
+            if stop:
+                return
+
+    def close(self) -> None:
+        """
+        Дописывает всё, что осталось в очереди, и останавливает фоновый поток
+        """
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join(timeout=5)
 
 
 def get_structlog_config(
@@ -22,11 +176,23 @@ def get_structlog_config(
     else:
         min_level = logging.INFO
 
+    processors = get_processors(log_config)
+    if log_config.queue_size > 0:
+        # Рендерер выполняется в фоновом потоке вместе с записью,
+        # а цепочка процессоров отдаёт логгеру словарь события
+        logger_factory = QueueLoggerFactory(
+            renderer=processors.pop(),
+            max_size=log_config.queue_size,
+            overflow=log_config.queue_overflow
+        )
+    else:
+        logger_factory = WriteLoggerFactory()
+
     return {
-        "processors": get_processors(log_config),
+        "processors": processors,
         "cache_logger_on_first_use": True,
         "wrapper_class": structlog.make_filtering_bound_logger(min_level),
-        "logger_factory": WriteLoggerFactory()
+        "logger_factory": logger_factory
     }
 
 
@@ -36,25 +202,31 @@ def get_processors(log_config: LogConfig) -> list:
     :param log_config: объект LogConfig с параметрами логирования
     :return: список процессоров для structlog
     """
+    if log_config.json_serializer == JSONSerializer.ORJSON:
+        # orjson не входит в зависимости, его нужно поставить отдельно
+        import orjson
+
+        def json_dumps(obj: dict, default: Callable) -> str:
+            return orjson.dumps(obj, default=default).decode()
+    else:
+        json_dumps = dumps
+
     def custom_json_serializer(data, *args, **kwargs):
         """
         Кастомный сериализатор для JSON-логов
         """
-        result = dict()
-
-
-        if log_config.show_datetime is True:
-            result["timestamp"] = data.pop("timestamp")
-
-        # Все остальные следующие два ключа идут именно в таком порядке
-        for key in ("level", "event"):
-            if key in data:
-                result[key] = data.pop(key)
+        # Отметка времени (если есть), уровень и текст события
+        # идут первыми именно в таком порядке
+        result = {
+            key: data.pop(key)
+            for key in ("timestamp", "level", "event")
+            if key in data
+        }
 
         # Все остальные ключи выводятся "как есть"
         # (обычно в алфавитном порядке)
-        result.update(**data)
-        return dumps(result, default=str)
+        result.update(data)
+        return json_dumps(result, default=str)
 
     processors = list()
 
@@ -72,6 +244,8 @@ def get_processors(log_config: LogConfig) -> list:
 
     # Выбор рендера: JSON или для вывода в терминал
     if log_config.renderer == LogRenderer.JSON:
+        # Трейсбек исключения выводится в JSON отдельным полем exception
+        processors.append(structlog.processors.format_exc_info)
         processors.append(structlog.processors.JSONRenderer(serializer=custom_json_serializer))
     else:
         processors.append(structlog.dev.ConsoleRenderer(
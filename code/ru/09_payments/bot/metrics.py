@@ -0,0 +1,272 @@
+"""
+Метрики бота в текстовом формате Prometheus.
+
+Считаются апдейты по типам, время хэндлеров, время и ошибки запросов
+к Bot API по методам (sendInvoice, refundStarPayment, createInvoiceLink и т.д.)
+и сумма донатов. Хэндлеры при этом не меняются: всё собирается мидлварями.
+Отдаются по адресу http://host:port/metrics, см. секцию [metrics] в settings.toml
+"""
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Protocol
+
+import structlog
+from aiogram import Bot, Dispatcher
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiogram.types import TelegramObject, Update
+from aiohttp import web
+from structlog.typing import FilteringBoundLogger
+
+from bot.instrumentation import DEFAULT_BUCKETS, Histogram, escape_label
+
+logger: FilteringBoundLogger = structlog.get_logger()
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Collector(Protocol):
+    def render(self) -> str: ...
+
+
+class Counter:
+    """
+    Счётчик с метками: только растёт, сбрасывается при перезапуске
+    """
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.values: dict[tuple[str, ...], float] = dict()
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self) -> str:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+        ]
+        for label_values, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class HistogramFamily:
+    """
+    Набор гистограмм с одинаковыми корзинами, по одной на каждое значение меток
+    """
+
+    def __init__(
+            self,
+            name: str,
+            documentation: str,
+            labels: tuple[str, ...] = (),
+            buckets: tuple[float, ...] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        self.histograms: dict[tuple[str, ...], Histogram] = dict()
+
+    def get(self, *label_values: str) -> Histogram:
+        histogram = self.histograms.get(label_values)
+        if histogram is None:
+            histogram = self.histograms[label_values] = Histogram(self.buckets)
+        return histogram
+
+    def render(self) -> str:
+        name = self.name
+        lines = [
+            f"# HELP {name} {self.documentation}",
+            f"# TYPE {name} histogram",
+        ]
+        for label_values, histogram in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                labels = _format_labels(self.labels, label_values, f'le="{bound}"')
+                lines.append(f"{name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, label_values, 'le="+Inf"')
+            lines.append(f"{name}_bucket{labels} {histogram.count}")
+            labels = _format_labels(self.labels, label_values)
+            lines.append(f"{name}_sum{labels} {histogram.sum}")
+            lines.append(f"{name}_count{labels} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+class BotMetrics:
+    """
+    Все метрики бота в одном месте
+    """
+
+    def __init__(self):
+        self.updates = Counter(
+            "bot_updates_total", "Updates received, by type", ("type",)
+        )
+        self.handler_duration = HistogramFamily(
+            "bot_handler_duration_seconds",
+            "Handler execution time including inner middlewares",
+            ("event", "handler")
+        )
+        self.api_duration = HistogramFamily(
+            "bot_api_request_duration_seconds",
+            "Bot API request time, by method",
+            ("method",)
+        )
+        self.api_errors = Counter(
+            "bot_api_errors_total",
+            "Failed Bot API requests, by method and exception type",
+            ("method", "error")
+        )
+        self.donations = Counter(
+            "bot_donations_total", "Successful payments", ("currency",)
+        )
+        self.donation_amount = Counter(
+            "bot_donation_amount_total",
+            "Sum of successful payments (in Stars for XTR)",
+            ("currency",)
+        )
+        # Дополнительные источники, например, TimingRegistry из instrumentation.py
+        self.collectors: list[Collector] = [
+            self.updates, self.handler_duration,
+            self.api_duration, self.api_errors,
+            self.donations, self.donation_amount
+        ]
+
+    def record_donation(self, currency: str, amount: int) -> None:
+        """
+        Учитывает донат. Вызывается из хэндлера после записи платежа в журнал,
+        чтобы повторно доставленный апдейт не попал в суммы дважды
+
+        :param currency: код валюты, например, XTR
+        :param amount: сумма в минимальных единицах валюты (для XTR — в звёздах)
+        """
+        self.donations.inc(currency)
+        self.donation_amount.inc(currency, amount=amount)
+
+    def render(self) -> str:
+        return "".join(collector.render() for collector in self.collectors)
+
+
+class UpdateMetricsMiddleware:
+    """
+    Outer-мидлварь на апдейты: считает апдейты по типам.
+    Донаты считает хэндлер через BotMetrics.record_donation()
+    """
+
+    def __init__(self, metrics: BotMetrics):
+        self.metrics = metrics
+
+    async def __call__(
+            self,
+            handler: Callable[[Update, dict[str, Any]], Awaitable[Any]],
+            event: Update,
+            data: dict[str, Any]
+    ) -> Any:
+        self.metrics.updates.inc(event.event_type)
+        return await handler(event, data)
+
+
+class HandlerMetricsMiddleware:
+    """
+    Inner-мидлварь: время хэндлера, к которому попало событие
+    """
+
+    def __init__(self, metrics: BotMetrics, event_name: str):
+        self.metrics = metrics
+        self.event_name = event_name
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: dict[str, Any]
+    ) -> Any:
+        handler_object: HandlerObject = data["handler"]
+        histogram = self.metrics.handler_duration.get(
+            self.event_name, handler_object.callback.__name__
+        )
+        start = perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            histogram.observe(perf_counter() - start)
+
+
+class RequestMetricsMiddleware(BaseRequestMiddleware):
+    """
+    Мидлварь сессии бота: время и ошибки запросов к Bot API по методам
+    """
+
+    def __init__(self, metrics: BotMetrics):
+        self.metrics = metrics
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType]
+    ):
+        api_method = method.__api_method__
+        start = perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as error:
+            self.metrics.api_errors.inc(api_method, type(error).__name__)
+            raise
+        finally:
+            self.metrics.api_duration.get(api_method).observe(perf_counter() - start)
+
+
+def setup_metrics(
+        dp: Dispatcher,
+        bot: Bot,
+        host: str,
+        port: int
+) -> BotMetrics:
+    """
+    Подключает сбор метрик и HTTP-сервер для них.
+    Вызывать после подключения всех роутеров.
+    Сами метрики попадают в хэндлеры как аргумент metrics
+
+    :param dp: объект диспетчера
+    :param bot: объект бота, чьи запросы к Bot API нужно считать
+    :param host: на каком адресе слушать
+    :param port: на каком порту слушать
+    :return: объект с метриками
+    """
+    metrics = BotMetrics()
+    dp["metrics"] = metrics
+
+    dp.update.outer_middleware(UpdateMetricsMiddleware(metrics))
+    for event_name in dp.resolve_used_update_types():
+        dp.observers[event_name].middleware(HandlerMetricsMiddleware(metrics, event_name))
+    bot.session.middleware(RequestMetricsMiddleware(metrics))
+
+    async def handle_metrics(request: web.Request) -> web.Response:
+        return web.Response(text=metrics.render(), content_type="text/plain")
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle_metrics)
+    runner = web.AppRunner(app)
+
+    async def on_startup():
+        await runner.setup()
+        await web.TCPSite(runner, host=host, port=port).start()
+        await logger.ainfo("Metrics server started", url=f"http://{host}:{port}/metrics")
+
+    async def on_shutdown():
+        await runner.cleanup()
+
+    dp.startup.register(on_startup)
+    dp.shutdown.register(on_shutdown)
+    return metrics
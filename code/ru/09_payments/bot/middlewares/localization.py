@@ -1,17 +1,18 @@
 from typing import Callable, Dict, Any, Awaitable
 
 from aiogram import BaseMiddleware
-from aiogram.types import Message
-from fluent.runtime import FluentLocalization
+from aiogram.types import Message, User
+
+from bot.fluent_loader import FluentLocalizations
 
 
 # Это будет inner-мидлварь на сообщения
 class L10nMiddleware(BaseMiddleware):
     def __init__(
         self,
-        locale: FluentLocalization
+        locales: FluentLocalizations
     ):
-        self.locale = locale
+        self.locales = locales
 
     async def __call__(
         self,
@@ -19,5 +20,7 @@ class L10nMiddleware(BaseMiddleware):
         event: Message,
         data: Dict[str, Any]
     ) -> Any:
-        data["l10n"] = self.locale
+        # Язык выбирается по настройкам пользователя в Telegram
+        user: User | None = data.get("event_from_user")
+        data["l10n"] = self.locales.get(user.language_code if user else None)
         return await handler(event, data)
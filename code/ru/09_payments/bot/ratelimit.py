@@ -0,0 +1,211 @@
+"""
+Ограничение частоты исходящих запросов к Bot API.
+
+Telegram ограничивает отправку сообщений: около одного сообщения в секунду
+в один чат, не больше 20 в минуту в одну группу и около 30 в секунду на всех.
+Превышение заканчивается ошибкой 429 (TelegramRetryAfter), и без обработки
+ответ на апдейт просто теряется. Мидлварь сессии придерживает такие запросы
+до тех пор, пока лимит не позволит их отправить, а при ошибке 429
+ждёт указанное Telegram время и повторяет запрос
+"""
+import asyncio
+import time
+from typing import Any, Union
+
+import structlog
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from structlog.typing import FilteringBoundLogger
+
+logger: FilteringBoundLogger = structlog.get_logger()
+
+# Методы, на которые действуют лимиты: отправка, пересылка
+# и редактирование сообщений (sendMessage, copyMessage, editMessageText и т.д.)
+LIMITED_PREFIXES = ("send", "copy", "forward", "edit")
+# ...кроме статуса «печатает...»: он не сообщение и не должен занимать его место
+UNLIMITED_METHODS = {"sendChatAction"}
+
+ChatId = Union[int, str, None]
+
+
+class RateLimiter:
+    """
+    Лимит «не больше rate действий в секунду, но до burst подряд»
+    для каждого ключа отдельно (алгоритм GCRA).
+
+    На ключ хранится одно число — момент, когда лимит полностью
+    восстановится, поэтому даже для сотен тысяч чатов это дёшево.
+    Место в очереди занимается сразу при вызове reserve(), так что
+    ждущие получают разрешение в порядке обращения
+    """
+
+    def __init__(self, rate: float, burst: int = 1, max_keys: int = 10000):
+        """
+        :param rate: сколько действий в секунду разрешено в среднем
+        :param burst: сколько действий можно сделать подряд без ожидания
+        :param max_keys: после скольких ключей удалять те, чей лимит уже восстановился.
+            Если после уборки ключей остаётся много, следующая уборка
+            будет, когда их станет вдвое больше, чем осталось
+        """
+        self.interval = 1 / rate
+        self.burst = burst
+        self.max_keys = max_keys
+        # Ключ -> теоретический момент следующего действия
+        self._next: dict[Any, float] = dict()
+        # При каком числе ключей запускать следующую уборку
+        self._cleanup_at = max_keys
+
+    def reserve(self, key: Any) -> float:
+        """
+        Занимает место для одного действия
+
+        :param key: ключ, например, ID чата
+        :return: сколько секунд подождать перед действием
+        """
+        now = time.monotonic()
+        next_at = max(self._next.get(key, now), now)
+        delay = max(0.0, next_at - (self.burst - 1) * self.interval - now)
+        self._next[key] = next_at + self.interval
+        if len(self._next) > self._cleanup_at:
+            self._cleanup(now)
+        return delay
+
+    def pause(self, key: Any, seconds: float) -> None:
+        """
+        Запрещает действия по ключу на ближайшие seconds секунд
+
+        :param key: ключ, например, ID чата
+        :param seconds: длительность паузы
+        """
+        next_at = time.monotonic() + seconds + (self.burst - 1) * self.interval
+        self._next[key] = max(self._next.get(key, 0.0), next_at)
+
+    def _cleanup(self, now: float) -> None:
+        # Ключи с восстановившимся лимитом ничем не отличаются от отсутствующих
+        self._next = {key: next_at for key, next_at in self._next.items() if next_at > now}
+        # Иначе при множестве активных ключей уборка шла бы на каждом вызове reserve()
+        self._cleanup_at = max(self.max_keys, 2 * len(self._next))
+
+
+class RateLimitMiddleware(BaseRequestMiddleware):
+    """
+    Мидлварь сессии бота: придерживает отправку сообщений по лимитам
+    на чат, на группу и общему, и повторяет запрос после TelegramRetryAfter.
+    Остальные методы (getUpdates, answerCallbackQuery и т.д.) не ограничиваются.
+
+    Счётчики для наблюдения: waiting — сколько запросов ждут прямо сейчас,
+    max_waiting — наибольшее такое число, delayed_total и wait_seconds_total —
+    сколько запросов ждали и сколько секунд в сумме, retries_total —
+    сколько раз пришлось повторить запрос после ошибки 429
+    """
+
+    def __init__(
+            self,
+            global_rate: float = 30,
+            global_burst: int = 5,
+            chat_rate: float = 1,
+            chat_burst: int = 3,
+            group_rate: float = 20 / 60,
+            group_burst: int = 5,
+            max_retries: int = 3
+    ):
+        """
+        :param global_rate: сколько сообщений в секунду во все чаты
+        :param global_burst: сколько сообщений во все чаты можно отправить подряд
+        :param chat_rate: сколько сообщений в секунду в один личный чат
+        :param chat_burst: сколько сообщений в личный чат можно отправить подряд
+        :param group_rate: сколько сообщений в секунду в одну группу или канал
+        :param group_burst: сколько сообщений в группу можно отправить подряд
+        :param max_retries: сколько раз повторять запрос после TelegramRetryAfter
+        """
+        self.global_limit = RateLimiter(global_rate, global_burst)
+        self.chat_limit = RateLimiter(chat_rate, chat_burst)
+        self.group_limit = RateLimiter(group_rate, group_burst)
+        self.max_retries = max_retries
+        self.waiting = 0
+        self.max_waiting = 0
+        self.delayed_total = 0
+        self.wait_seconds_total = 0.0
+        self.retries_total = 0
+
+    async def __call__(
+            self,
+            make_request: NextRequestMiddlewareType[TelegramType],
+            bot: Bot,
+            method: TelegramMethod[TelegramType]
+    ) -> Any:
+        api_method = method.__api_method__
+        if not api_method.startswith(LIMITED_PREFIXES) or api_method in UNLIMITED_METHODS:
+            return await make_request(bot, method)
+
+        chat_id: ChatId = getattr(method, "chat_id", None)
+        for attempt in range(self.max_retries + 1):
+            await self._wait(chat_id)
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as error:
+                if attempt == self.max_retries:
+                    raise
+                self.retries_total += 1
+                await logger.awarning(
+                    "Flood limit hit, retrying",
+                    method=api_method, chat_id=chat_id, retry_after=error.retry_after
+                )
+                # Следующая попытка (и все запросы в этот чат) встанет
+                # в очередь не раньше, чем разрешил Telegram
+                if chat_id is None:
+                    self.global_limit.pause(None, error.retry_after)
+                else:
+                    self._chat_limit(chat_id).pause(chat_id, error.retry_after)
+
+    def _chat_limit(self, chat_id: ChatId) -> RateLimiter:
+        # У групп и каналов отрицательные ID, у каналов бывает и @username
+        if isinstance(chat_id, str) or chat_id < 0:
+            return self.group_limit
+        return self.chat_limit
+
+    async def _wait(self, chat_id: ChatId) -> None:
+        # Сначала ждём очереди в чат, и только потом занимаем место в общем лимите:
+        # иначе место в общем лимите пропадёт, пока запрос ждёт свой чат
+        if chat_id is not None:
+            await self._sleep(self._chat_limit(chat_id).reserve(chat_id))
+        await self._sleep(self.global_limit.reserve(None))
+
+    async def _sleep(self, delay: float) -> None:
+        if delay <= 0:
+            return
+        self.waiting += 1
+        self.max_waiting = max(self.max_waiting, self.waiting)
+        self.delayed_total += 1
+        self.wait_seconds_total += delay
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self.waiting -= 1
+
+    def render(self) -> str:
+        """
+        :return: счётчики в текстовом формате Prometheus
+        """
+        metrics = [
+            ("bot_rate_limit_waiting", "gauge",
+             "Requests currently waiting for a rate limit", self.waiting),
+            ("bot_rate_limit_waiting_max", "gauge",
+             "Maximum number of requests waiting at once", self.max_waiting),
+            ("bot_rate_limit_delayed_total", "counter",
+             "Requests delayed by a rate limit", self.delayed_total),
+            ("bot_rate_limit_wait_seconds_total", "counter",
+             "Total time requests spent waiting for a rate limit", self.wait_seconds_total),
+            ("bot_rate_limit_retries_total", "counter",
+             "Requests retried after TelegramRetryAfter", self.retries_total),
+        ]
+        lines = []
+        for name, kind, documentation, value in metrics:
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
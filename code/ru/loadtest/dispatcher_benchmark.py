@@ -0,0 +1,470 @@
+"""
+Замер пропускной способности диспетчеров из глав без Telegram и без сети.
+
+Для каждой главы собирается такой же Dispatcher, как в её bot.py, и в него
+напрямую, через Dispatcher.feed_update(), подаются заранее собранные апдейты.
+Запросы к Bot API перехватывает сессия-заглушка, поэтому замеряется только
+стоимость роутеров, фильтров, мидлварей и самих хэндлеров.
+
+Запуск из каталога code/ru:
+    python -m loadtest.dispatcher_benchmark
+    python -m loadtest.dispatcher_benchmark 04_routers 07_fsm --updates 50000 --output results.json
+
+С флагом --timing в главах с модулем instrumentation (5, 8 и 9) подключаются
+замеры времени фильтров, мидлварей и хэндлеров, и в результат попадает
+сводка самых затратных мест. Сравнение с запуском без флага показывает
+накладные расходы самих замеров.
+
+Каждая глава замеряется в отдельном процессе: у глав одинаковые имена модулей
+(handlers, config_reader и т.д.), и в одном процессе они бы конфликтовали.
+Результат печатается в формате JSON, его удобно сравнивать между коммитами
+"""
+import argparse
+import asyncio
+import importlib
+import itertools
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Optional, Union, get_args
+
+from aiogram import Bot, Dispatcher, __version__ as aiogram_version
+from aiogram.client.session.base import BaseSession
+from aiogram.types import Chat, Message, Update
+
+from loadtest.fake_bot_api import percentile
+
+CHAPTERS_DIR = Path(__file__).resolve().parent.parent
+BOT_ID = 42
+GROUP_ID = -1001234567890
+
+# Сценарий: (Dispatcher, [(метка, апдейт в виде словаря)], данные для хэндлеров)
+Scenario = tuple[Dispatcher, list[tuple[str, dict]], dict[str, Any]]
+
+
+class MockSession(BaseSession):
+    """
+    Сессия-заглушка: ничего не отправляет и сразу возвращает
+    правдоподобный результат нужного типа
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        self._message = Message(
+            message_id=1,
+            date=datetime.now(),
+            chat=Chat(id=1, type="private")
+        )
+        self._results: dict[type, Any] = dict()
+
+    def _make_result(self, returning: Any) -> Any:
+        types = get_args(returning) or (returning,)
+        if Message in types:
+            return self._message
+        if bool in types:
+            return True
+        if str in types:
+            return "https://t.me/$fake_invoice"
+        return None
+
+    async def make_request(self, bot: Bot, method: Any, timeout: Optional[int] = None) -> Any:
+        self.calls += 1
+        method_type = type(method)
+        if method_type not in self._results:
+            self._results[method_type] = self._make_result(method.__returning__)
+        return self._results[method_type]
+
+    async def stream_content(self, *args: Any, **kwargs: Any):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+# --- Сборка апдейтов ---
+
+_ids = itertools.count(1)
+
+
+def user(user_id: int) -> dict:
+    return {"id": user_id, "is_bot": False, "first_name": f"User {user_id}", "language_code": "ru"}
+
+
+def message(user_id: int, text: Optional[str] = None, chat_type: str = "private", **fields: Any) -> dict:
+    chat = {"id": user_id, "type": "private"} if chat_type == "private" \
+        else {"id": GROUP_ID, "type": chat_type, "title": "Group"}
+    result = {
+        "message_id": next(_ids),
+        "date": int(time.time()),
+        "chat": chat,
+        "from": user(user_id),
+        **fields
+    }
+    if text is not None:
+        result["text"] = text
+        if text.startswith("/"):
+            command = text.split()[0]
+            result["entities"] = [{"type": "bot_command", "offset": 0, "length": len(command)}]
+    return {"message": result}
+
+
+def with_entity(update: dict, entity_type: str, fragment: str) -> dict:
+    text = update["message"]["text"]
+    update["message"].setdefault("entities", []).append(
+        {"type": entity_type, "offset": text.index(fragment), "length": len(fragment)}
+    )
+    return update
+
+
+def callback(user_id: int, data: str) -> dict:
+    return {"callback_query": {
+        "id": str(next(_ids)),
+        "from": user(user_id),
+        "chat_instance": str(user_id),
+        "message": message(user_id, "Кнопки")["message"],
+        "data": data
+    }}
+
+
+def inline_query(user_id: int, query: str, offset: str = "") -> dict:
+    return {"inline_query": {"id": str(next(_ids)), "from": user(user_id), "query": query, "offset": offset}}
+
+
+def pre_checkout_query(user_id: int, amount: int) -> dict:
+    return {"pre_checkout_query": {
+        "id": str(next(_ids)),
+        "from": user(user_id),
+        "currency": "XTR",
+        "total_amount": amount,
+        "invoice_payload": f"{amount}_stars"
+    }}
+
+
+def successful_payment(user_id: int, amount: int) -> dict:
+    return message(user_id, successful_payment={
+        "currency": "XTR",
+        "total_amount": amount,
+        "invoice_payload": f"{amount}_stars",
+        "telegram_payment_charge_id": f"charge_{next(_ids)}",
+        "provider_payment_charge_id": ""
+    })
+
+
+def per_user(flow: Callable[[int], list[tuple[str, dict]]], users: int) -> list[tuple[str, dict]]:
+    """
+    Чередует сценарии разных пользователей: сначала первые шаги всех,
+    потом вторые и т.д., как это примерно и выглядит в живом боте
+    """
+    flows = [flow(user_id) for user_id in range(1, users + 1)]
+    return [step for steps in itertools.zip_longest(*flows) for step in steps if step is not None]
+
+
+# --- Сценарии глав (повторяют сборку диспетчера из bot.py) ---
+
+def scenario_04() -> Scenario:
+    from handlers import questions, different_types
+
+    dp = Dispatcher()
+    dp.include_routers(questions.router, different_types.router)
+    sticker = {
+        "file_id": "sticker", "file_unique_id": "sticker", "type": "regular",
+        "width": 512, "height": 512, "is_animated": False, "is_video": False
+    }
+    animation = {"file_id": "gif", "file_unique_id": "gif", "width": 320, "height": 240, "duration": 3}
+    updates = per_user(lambda uid: [
+        ("/start", message(uid, "/start")),
+        ("да", message(uid, "Да")),
+        ("нет", message(uid, "нет")),
+        ("text", message(uid, "Просто текст")),
+        ("sticker", message(uid, sticker=sticker)),
+        ("animation", message(uid, animation=animation)),
+    ], users=100)
+    return dp, updates, {}
+
+
+def scenario_05() -> Scenario:
+    from handlers import group_games, checkin, usernames
+    from middlewares.weekend import WeekendCallbackMiddleware
+
+    dp = Dispatcher()
+    dp.include_router(group_games.router)
+    dp.include_router(checkin.router)
+    dp.include_router(usernames.router)
+    dp.callback_query.outer_middleware(WeekendCallbackMiddleware())
+    updates = per_user(lambda uid: [
+        ("group /dice", message(uid, "/dice", chat_type="supergroup")),
+        ("group /basketball", message(uid, "/basketball", chat_type="supergroup")),
+        ("/checkin", message(uid, "/checkin")),
+        ("callback confirm", callback(uid, "confirm")),
+        ("mention", with_entity(message(uid, "Подпишитесь на @aiogram_news"), "mention", "@aiogram_news")),
+        ("unhandled text", message(uid, "Просто текст")),
+    ], users=100)
+    return dp, updates, {}
+
+
+def scenario_07() -> Scenario:
+    from config_reader import config
+    from fsm_storage import FSMSessionTTL, create_fsm_storage, setup_buffered_fsm
+    from handlers import common, ordering_food, ordering_drinks
+
+    storage = create_fsm_storage(
+        storage_type=config.fsm_storage,
+        sqlite_path=config.fsm_sqlite_path,
+        redis_url=config.fsm_redis_url,
+        redis_pool_size=config.fsm_redis_pool_size,
+        ttl=FSMSessionTTL(config.fsm_ttl, default=config.fsm_ttl_default)
+    )
+    dp = Dispatcher(storage=storage, disable_fsm=True)
+    setup_buffered_fsm(dp)
+    dp.include_routers(common.router, ordering_food.router, ordering_drinks.router)
+    updates = per_user(lambda uid: [
+        ("/start", message(uid, "/start")),
+        ("/food", message(uid, "/food")),
+        ("food name", message(uid, "Суши")),
+        ("food size", message(uid, "Маленькую")),
+        ("/food", message(uid, "/food")),
+        ("wrong food name", message(uid, "Пицца")),
+        ("/cancel", message(uid, "/cancel")),
+        ("/drinks", message(uid, "/drinks")),
+    ], users=100)
+    return dp, updates, {}
+
+
+def scenario_08() -> Scenario:
+    from config_reader import config
+    from fsm_storage import FSMSessionTTL, create_fsm_storage, setup_buffered_fsm
+    from handlers import common, save_text, save_images, \
+        inline_mode, delete_data, inline_pagination_demo, \
+        inline_chosen_result_demo, inline_search
+
+    fsm_storage = create_fsm_storage(
+        storage_type=config.fsm_storage,
+        sqlite_path=config.fsm_sqlite_path,
+        redis_url=config.fsm_redis_url,
+        redis_pool_size=config.fsm_redis_pool_size,
+        ttl=FSMSessionTTL(config.fsm_ttl, default=config.fsm_ttl_default)
+    )
+    dp = Dispatcher(storage=fsm_storage, disable_fsm=True)
+    setup_buffered_fsm(dp)
+    dp.include_routers(
+        common.router,
+        save_text.router, save_images.router, delete_data.router,
+        inline_mode.router, inline_pagination_demo.router,
+        inline_chosen_result_demo.router,
+        inline_search.router
+    )
+    updates = per_user(lambda uid: [
+        ("/start", message(uid, "/start")),
+        ("/save", message(uid, "/save")),
+        ("text with link", with_entity(
+            message(uid, f"Смотрите https://example.com/{uid}"), "url", f"https://example.com/{uid}"
+        )),
+        ("title", message(uid, f"Заголовок {uid}")),
+        ("description", message(uid, "Описание")),
+        ("inline links", inline_query(uid, "links")),
+        ("inline images", inline_query(uid, "images")),
+        ("inline long", inline_query(uid, "long")),
+        ("inline search", inline_query(uid, "заголовок")),
+    ], users=100)
+    return dp, updates, {}
+
+
+def scenario_09() -> Scenario:
+    from bot.fluent_loader import get_fluent_localization
+    from bot.handlers import get_routers
+    from bot.invoice_links import InvoiceLinkCache
+    from bot.ledger import PaymentLedger
+    from bot.middlewares import L10nMiddleware
+
+    locales = get_fluent_localization()
+    dp = Dispatcher()
+    dp.message.outer_middleware(L10nMiddleware(locales))
+    dp.pre_checkout_query.outer_middleware(L10nMiddleware(locales))
+    dp.include_routers(*get_routers())
+    updates = per_user(lambda uid: [
+        ("/start", message(uid, "/start")),
+        ("/donate_25", message(uid, "/donate_25")),
+        ("/donate N", message(uid, "/donate 100")),
+        ("/donate bad", message(uid, "/donate abc")),
+        ("/paysupport", message(uid, "/paysupport")),
+        ("/refund", message(uid, "/refund charge_1")),
+        ("/donate_link", message(uid, "/donate_link")),
+        ("pre_checkout_query", pre_checkout_query(uid, 25)),
+        ("successful_payment", successful_payment(uid, 25)),
+    ], users=100)
+    # Журнал в памяти и без ожидания пачки: замеряем диспетчер, а не диск
+    return dp, updates, {
+        "ledger": PaymentLedger(":memory:", commit_delay=0),
+        "invoice_links": InvoiceLinkCache()
+    }
+
+
+SCENARIOS: dict[str, Callable[[], Scenario]] = {
+    "04_routers": scenario_04,
+    "05_filters_and_middlewares": scenario_05,
+    "07_fsm": scenario_07,
+    "08_inline_mode": scenario_08,
+    "09_payments": scenario_09,
+}
+
+
+# --- Замер ---
+
+def _ms(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value * 1000, 4)
+
+
+def instrument(dp: Dispatcher, session: BaseSession) -> Any:
+    """
+    Подключает замеры времени из модуля instrumentation главы
+
+    :return: TimingRegistry или None, если в главе нет такого модуля
+    """
+    for module_name in ("instrumentation", "bot.instrumentation"):
+        try:
+            module = importlib.import_module(module_name)
+        except ModuleNotFoundError:
+            continue
+        registry = module.TimingRegistry()
+        module.instrument_dispatcher(dp, registry)
+        session.middleware(module.RequestTimingMiddleware(registry))
+        return registry
+    return None
+
+
+async def measure(chapter: str, total: int, warmup: int, timing: bool = False) -> dict:
+    dp, steps, kwargs = SCENARIOS[chapter]()
+    session = MockSession()
+    registry = instrument(dp, session) if timing else None
+    bot = Bot(f"{BOT_ID}:benchmark", session=session)
+    # Апдейты сразу привязываем к боту, как это делает поллинг,
+    # иначе feed_update() будет пересоздавать каждый из них
+    updates = [
+        (label, Update.model_validate({"update_id": update_id, **payload}, context={"bot": bot}))
+        for update_id, (label, payload) in enumerate(itertools.islice(itertools.cycle(steps), total + warmup), 1)
+    ]
+    for _, update in updates[:warmup]:
+        await dp.feed_update(bot, update, **kwargs)
+
+    session.calls = 0
+    latencies: list[float] = []
+    by_label: dict[str, list[float]] = defaultdict(list)
+    started_at = time.perf_counter()
+    for label, update in updates[warmup:]:
+        update_started_at = time.perf_counter()
+        await dp.feed_update(bot, update, **kwargs)
+        latency = time.perf_counter() - update_started_at
+        latencies.append(latency)
+        by_label[label].append(latency)
+    elapsed = time.perf_counter() - started_at
+    await dp.emit_shutdown()
+    await dp.storage.close()
+
+    result = {
+        "updates": total,
+        "seconds": round(elapsed, 4),
+        "updates_per_second": round(total / elapsed, 1),
+        "latency_p50_ms": _ms(percentile(latencies, 0.5)),
+        "latency_p99_ms": _ms(percentile(latencies, 0.99)),
+        "api_calls": session.calls,
+        "by_update": {
+            label: {
+                "count": len(values),
+                "latency_p50_ms": _ms(percentile(values, 0.5)),
+                "latency_p99_ms": _ms(percentile(values, 0.99)),
+            }
+            for label, values in by_label.items()
+        }
+    }
+    if registry is not None:
+        # Прогрев тоже попал в гистограммы, но на сводку это почти не влияет
+        result["timings"] = registry.summary()[:15]
+    return result
+
+
+def run_chapter(chapter: str, total: int, warmup: int, timing: bool = False) -> Union[dict, str]:
+    """
+    Запускает замер одной главы в отдельном процессе
+
+    :return: результат замера или текст ошибки
+    """
+    chapter_dir = CHAPTERS_DIR / chapter
+    env = {
+        **os.environ,
+        "PYTHONPATH": os.pathsep.join(filter(None, [str(CHAPTERS_DIR), os.environ.get("PYTHONPATH")])),
+        # Настройки, без которых главы не запустятся; реальный токен не нужен
+        "BOT_TOKEN": f"{BOT_ID}:benchmark",
+        "CONFIG_FILE_PATH": str(chapter_dir / "settings.example.toml"),
+        # Замеряем сами диспетчеры, а не диск или сеть
+        "FSM_STORAGE": "memory",
+        "STORAGE_TYPE": "memory",
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        result_path = Path(tmp, "result.json")
+        process = subprocess.run(
+            [
+                sys.executable, "-m", "loadtest.dispatcher_benchmark",
+                "--worker", chapter, "--result", str(result_path),
+                "--updates", str(total), "--warmup", str(warmup),
+                *(["--timing"] if timing else [])
+            ],
+            cwd=chapter_dir, env=env,
+            # Логи хэндлеров (например, structlog в главе про платежи) не нужны
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+        )
+        if process.returncode != 0:
+            return process.stderr.strip().splitlines()[-1] if process.stderr.strip() else "failed"
+        return json.loads(result_path.read_text())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Dispatcher throughput benchmark for chapter bots")
+    parser.add_argument("chapters", nargs="*", help=f"default: all of {', '.join(SCENARIOS)}")
+    parser.add_argument("--updates", type=int, default=20_000, help="measured updates per chapter")
+    parser.add_argument("--warmup", type=int, default=1_000)
+    parser.add_argument("--output", type=Path, help="also write JSON to this file")
+    parser.add_argument("--timing", action="store_true", help="enable per-filter/handler timings")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--result", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    for chapter in args.chapters:
+        if chapter not in SCENARIOS:
+            parser.error(f"unknown chapter: {chapter}")
+
+    if args.worker:
+        result = asyncio.run(measure(args.worker, args.updates, args.warmup, args.timing))
+        args.result.write_text(json.dumps(result))
+        return
+
+    report = {
+        "python": platform.python_version(),
+        "aiogram": aiogram_version,
+        "platform": platform.platform(),
+        "chapters": {},
+    }
+    failed = False
+    for chapter in args.chapters or SCENARIOS:
+        result = run_chapter(chapter, args.updates, args.warmup, args.timing)
+        if isinstance(result, str):
+            failed = True
+            result = {"error": result}
+        report["chapters"][chapter] = result
+        print(f"{chapter}: {result.get('updates_per_second', result.get('error'))}", file=sys.stderr)
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
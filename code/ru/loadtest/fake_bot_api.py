@@ -0,0 +1,490 @@
+"""
+Фейковый сервер Telegram Bot API для нагрузочного тестирования ботов из глав.
+
+Работает без интернета: сам генерирует апдейты (сообщения, колбэки,
+инлайн-запросы, chat_member и платежи) с заданной частотой и отдаёт их
+через getUpdates, а все остальные вызовы методов записывает вместе
+с задержкой от выдачи апдейта до ответа бота на него.
+
+Запуск из каталога code/ru:
+    python -m loadtest.fake_bot_api --port 8081 --rate 500
+
+Затем в .env нужной главы укажите BOT_API_URL = http://127.0.0.1:8081
+и запустите бота как обычно. Статистика доступна по адресу
+http://127.0.0.1:8081/stats, а при остановке сервера печатается в консоль
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import signal
+import time
+from collections import OrderedDict, defaultdict, deque
+from typing import Any, Optional, TextIO
+
+from aiohttp import web
+
+UPDATE_TYPES = (
+    "message", "callback_query", "inline_query",
+    "chat_member", "pre_checkout_query", "successful_payment"
+)
+
+
+def percentile(values: list[float], share: float) -> Optional[float]:
+    """
+    :param values: список значений
+    :param share: доля от 0 до 1, например, 0.99
+    :return: значение перцентиля или None для пустого списка
+    """
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+class UpdateFactory:
+    """
+    Собирает синтетические апдейты в виде словарей, как их присылает Telegram
+    """
+
+    def __init__(
+            self,
+            mix: dict[str, float],
+            texts: list[str],
+            callback_data: list[str],
+            inline_queries: list[str],
+            users: int = 1000,
+            group_id: int = -1001234567890
+    ):
+        """
+        :param mix: доли типов апдейтов, например, {"message": 8, "callback_query": 2}
+        :param texts: тексты сообщений
+        :param callback_data: значения callback_data у нажатых кнопок
+        :param inline_queries: тексты инлайн-запросов
+        :param users: сколько разных пользователей пишут боту
+        :param group_id: ID группы для апдейтов chat_member
+        """
+        self.types = list(mix)
+        self.weights = [mix[name] for name in self.types]
+        self.texts = texts
+        self.callback_data = callback_data
+        self.inline_queries = inline_queries
+        self.users = users
+        self.group_id = group_id
+        self._update_ids = itertools.count(1)
+        self._object_ids = itertools.count(1)
+
+    def _user(self) -> dict:
+        user_id = random.randint(1, self.users)
+        return {"id": user_id, "is_bot": False, "first_name": f"User {user_id}", "language_code": "ru"}
+
+    def _message(self, user: dict, **fields: Any) -> dict:
+        return {
+            "message_id": next(self._object_ids),
+            "date": int(time.time()),
+            "chat": {"id": user["id"], "type": "private", "first_name": user["first_name"]},
+            "from": user,
+            **fields
+        }
+
+    def build(self, update_type: Optional[str] = None) -> dict:
+        """
+        :param update_type: тип апдейта (по умолчанию — случайный согласно долям)
+        :return: апдейт в виде словаря
+        """
+        update_type = update_type or random.choices(self.types, self.weights)[0]
+        user = self._user()
+        update: dict[str, Any] = {"update_id": next(self._update_ids)}
+        if update_type == "message":
+            update["message"] = self._message(user, text=random.choice(self.texts))
+        elif update_type == "callback_query":
+            update["callback_query"] = {
+                "id": str(next(self._object_ids)),
+                "from": user,
+                "chat_instance": str(user["id"]),
+                "message": self._message(user, text="Нажмите на кнопку"),
+                "data": random.choice(self.callback_data)
+            }
+        elif update_type == "inline_query":
+            update["inline_query"] = {
+                "id": str(next(self._object_ids)),
+                "from": user,
+                "query": random.choice(self.inline_queries),
+                "offset": ""
+            }
+        elif update_type == "chat_member":
+            update["chat_member"] = {
+                "chat": {"id": self.group_id, "type": "supergroup", "title": "Fake group"},
+                "from": user,
+                "date": int(time.time()),
+                "old_chat_member": {"status": "left", "user": user},
+                "new_chat_member": {"status": "member", "user": user}
+            }
+        elif update_type == "pre_checkout_query":
+            update["pre_checkout_query"] = {
+                "id": str(next(self._object_ids)),
+                "from": user,
+                "currency": "XTR",
+                "total_amount": random.randint(1, 2500),
+                "invoice_payload": "demo"
+            }
+        elif update_type == "successful_payment":
+            amount = random.randint(1, 2500)
+            update["message"] = self._message(user, successful_payment={
+                "currency": "XTR",
+                "total_amount": amount,
+                "invoice_payload": "demo",
+                "telegram_payment_charge_id": f"fake_{next(self._object_ids)}",
+                "provider_payment_charge_id": ""
+            })
+        else:
+            raise ValueError(f"Unknown update type: {update_type}")
+        return update
+
+
+class CallRecorder:
+    """
+    Записывает вызовы методов и сопоставляет их с апдейтами, на которые они отвечают.
+
+    Ответы на колбэки, инлайн-запросы и pre_checkout_query сопоставляются по ID,
+    остальные — по chat_id с самым старым апдейтом из этого чата, который ещё без ответа
+    """
+
+    # ключ -> поле в параметрах метода, по которому ищем апдейт
+    ANSWER_KEYS = {
+        "answercallbackquery": "callback_query_id",
+        "answerinlinequery": "inline_query_id",
+        "answerprecheckoutquery": "pre_checkout_query_id",
+    }
+
+    def __init__(self, output: Optional[TextIO] = None, max_tracked: int = 100_000):
+        """
+        :param output: (опционально) файл, куда писать каждый вызов строкой JSON
+        :param max_tracked: сколько апдейтов без ответа помнить для сопоставления
+        """
+        self.output = output
+        self.max_tracked = max_tracked
+        self.started_at = time.monotonic()
+        self.first_call_at: Optional[float] = None
+        self.last_call_at: Optional[float] = None
+        self.calls: dict[str, int] = defaultdict(int)
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self._by_id: OrderedDict[str, float] = OrderedDict()
+        self._by_chat: dict[int, deque[float]] = defaultdict(lambda: deque(maxlen=100))
+
+    def track(self, update: dict, delivered_at: float) -> None:
+        """
+        Запоминает момент выдачи апдейта боту
+
+        :param update: апдейт
+        :param delivered_at: момент выдачи по time.monotonic()
+        """
+        for key in ("callback_query", "inline_query", "pre_checkout_query"):
+            if key in update:
+                self._by_id[update[key]["id"]] = delivered_at
+                if len(self._by_id) > self.max_tracked:
+                    self._by_id.popitem(last=False)
+                return
+        if "message" in update:
+            self._by_chat[update["message"]["chat"]["id"]].append(delivered_at)
+
+    def record(self, method: str, params: dict[str, str]) -> None:
+        """
+        :param method: имя метода
+        :param params: параметры запроса
+        """
+        now = time.monotonic()
+        if self.first_call_at is None:
+            self.first_call_at = now
+        self.last_call_at = now
+        method = method.lower()
+        self.calls[method] += 1
+        delivered_at = None
+        if method in self.ANSWER_KEYS:
+            delivered_at = self._by_id.pop(params.get(self.ANSWER_KEYS[method], ""), None)
+        elif params.get("chat_id", "").lstrip("-").isdigit():
+            pending = self._by_chat.get(int(params["chat_id"]))
+            if pending:
+                delivered_at = pending.popleft()
+        latency = None if delivered_at is None else now - delivered_at
+        if latency is not None:
+            self.latencies[method].append(latency)
+        if self.output is not None:
+            self.output.write(json.dumps({
+                "time": round(now - self.started_at, 6),
+                "method": method,
+                "latency": latency,
+                "params": params
+            }, ensure_ascii=False) + "\n")
+
+    def stats(self) -> dict:
+        total_calls = sum(self.calls.values())
+        # Скорость считаем между первым и последним вызовом,
+        # чтобы не учитывать время до запуска бота и после окончания нагрузки
+        active = (self.last_call_at - self.first_call_at) if self.first_call_at else 0
+        return {
+            "elapsed": round(time.monotonic() - self.started_at, 3),
+            "calls_total": total_calls,
+            "calls_per_second": round(total_calls / active, 1) if active else None,
+            "methods": {
+                method: {
+                    "count": count,
+                    "matched": len(self.latencies[method]),
+                    "latency_p50_ms": self._ms(percentile(self.latencies[method], 0.5)),
+                    "latency_p99_ms": self._ms(percentile(self.latencies[method], 0.99)),
+                }
+                for method, count in sorted(self.calls.items())
+            }
+        }
+
+    @staticmethod
+    def _ms(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value * 1000, 3)
+
+
+class FakeBotAPI:
+    def __init__(
+            self,
+            factory: UpdateFactory,
+            rate: float = 100,
+            total: Optional[int] = None,
+            max_pending: int = 10_000,
+            recorder: Optional[CallRecorder] = None,
+            host: str = "127.0.0.1",
+            port: int = 0
+    ):
+        """
+        :param factory: генератор апдейтов
+        :param rate: сколько апдейтов в секунду генерировать
+        :param total: (опционально) сколько апдейтов сгенерировать всего
+        :param max_pending: сколько невыданных апдейтов копить, если бот не успевает
+        :param recorder: (опционально) свой объект для записи вызовов
+        :param host: адрес для прослушивания
+        :param port: порт (0 — выбрать свободный автоматически)
+        """
+        self.factory = factory
+        self.rate = rate
+        self.total = total
+        self.max_pending = max_pending
+        self.recorder = recorder or CallRecorder()
+        self.host = host
+        self.port = port
+        self.generated = 0
+        self.delivered = 0
+        # Сколько апдейтов не сгенерировано из-за переполнения очереди
+        self.skipped = 0
+        self._pending: deque[dict] = deque()
+        # Апдейт может уйти боту повторно, если тот не подтвердил его offset,
+        # поэтому считаем выданными только апдейты с большим update_id
+        self._last_delivered_id = 0
+        self._has_updates = asyncio.Event()
+        self._generator: Optional[asyncio.Task] = None
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def make_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self._handle_method)
+        app.router.add_get("/stats", self._handle_stats)
+        return app
+
+    async def start(self):
+        self._runner = web.AppRunner(self.make_app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        self.port = self._runner.addresses[0][1]
+        self._generator = asyncio.create_task(self._generate())
+
+    async def stop(self):
+        if self._generator is not None:
+            self._generator.cancel()
+            self._generator = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> "FakeBotAPI":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *args):
+        await self.stop()
+
+    def stats(self) -> dict:
+        return {
+            "updates": {
+                "generated": self.generated,
+                "delivered": self.delivered,
+                "pending": len(self._pending),
+                "skipped": self.skipped,
+            },
+            **self.recorder.stats()
+        }
+
+    # --- Генерация апдейтов ---
+
+    async def _generate(self):
+        tick = 0.01
+        budget = 0.0
+        while self.total is None or self.generated < self.total:
+            await asyncio.sleep(tick)
+            budget += self.rate * tick
+            count = int(budget)
+            budget -= count
+            if self.total is not None:
+                count = min(count, self.total - self.generated)
+            for _ in range(count):
+                self.generated += 1
+                if len(self._pending) >= self.max_pending:
+                    self.skipped += 1
+                    continue
+                self._pending.append(self.factory.build())
+            if self._pending:
+                self._has_updates.set()
+
+    # --- Методы Bot API ---
+
+    @staticmethod
+    def _ok(result: Any) -> web.Response:
+        return web.json_response({"ok": True, "result": result})
+
+    async def _handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    async def _handle_method(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"].lower()
+        params = {
+            key: value if isinstance(value, str) else "<file>"
+            for key, value in (await request.post()).items()
+        }
+        if method == "getupdates":
+            return self._ok(await self._get_updates(params))
+        self.recorder.record(method, params)
+        return self._ok(self._make_result(method, request.match_info["token"], params))
+
+    async def _get_updates(self, params: dict[str, str]) -> list[dict]:
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", 100))
+        timeout = float(params.get("timeout", 0))
+        # Всё, что меньше offset, бот уже получил
+        while self._pending and self._pending[0]["update_id"] < offset:
+            self._pending.popleft()
+        if not self._pending and timeout:
+            self._has_updates.clear()
+            try:
+                await asyncio.wait_for(self._has_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        updates = list(itertools.islice(self._pending, limit))
+        now = time.monotonic()
+        for update in updates:
+            if update["update_id"] > self._last_delivered_id:
+                self._last_delivered_id = update["update_id"]
+                self.delivered += 1
+                self.recorder.track(update, now)
+        return updates
+
+    def _make_result(self, method: str, token: str, params: dict[str, str]) -> Any:
+        if method == "getme":
+            bot_id = int(token.split(":", 1)[0]) if token.split(":", 1)[0].isdigit() else 1
+            return {"id": bot_id, "is_bot": True, "first_name": "Fake bot", "username": "fake_bot"}
+        if method == "getchat":
+            chat_id = int(params.get("chat_id", 0))
+            return {
+                "id": chat_id, "type": "supergroup" if chat_id < 0 else "private",
+                "title": "Fake group", "accent_color_id": 0, "max_reaction_count": 11
+            }
+        if method == "getchatadministrators":
+            return [{
+                "status": "creator", "is_anonymous": False,
+                "user": {"id": 1, "is_bot": False, "first_name": "Admin"}
+            }]
+        if method == "createinvoicelink":
+            return "https://t.me/$fake_invoice"
+        if method.startswith("send") or method.startswith("edit"):
+            chat_id = params.get("chat_id", "0")
+            return {
+                "message_id": random.randint(1, 2 ** 31),
+                "date": int(time.time()),
+                "chat": {"id": int(chat_id) if chat_id.lstrip("-").isdigit() else 0, "type": "private"},
+                "text": params.get("text", "")
+            }
+        # Остальные методы (answer*, delete*, set* и т.д.) возвращают True
+        return True
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    """
+    :param value: строка вида "message=8,callback_query=2"
+    :return: словарь долей типов апдейтов
+    """
+    mix = {}
+    for item in value.split(","):
+        name, _, weight = item.partition("=")
+        if name not in UPDATE_TYPES:
+            raise argparse.ArgumentTypeError(f"unknown update type: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Fake Telegram Bot API server for load testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--rate", type=float, default=100, help="updates per second")
+    parser.add_argument("--total", type=int, default=None, help="stop generating after N updates")
+    parser.add_argument("--max-pending", type=int, default=10_000)
+    parser.add_argument(
+        "--mix", type=parse_mix,
+        default=parse_mix("message=6,callback_query=2,inline_query=1,chat_member=0.5,"
+                          "pre_checkout_query=0.25,successful_payment=0.25"),
+        help="update types with weights, e.g. message=8,inline_query=2"
+    )
+    parser.add_argument("--text", action="append", help="message text (can be repeated)")
+    parser.add_argument("--callback-data", action="append", help="callback data (can be repeated)")
+    parser.add_argument("--inline-query", action="append", help="inline query (can be repeated)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--group-id", type=int, default=-1001234567890)
+    parser.add_argument("--record", type=argparse.FileType("w", encoding="utf-8"),
+                        help="write every method call to this JSON Lines file")
+    args = parser.parse_args()
+
+    factory = UpdateFactory(
+        mix=args.mix,
+        texts=args.text or ["/start", "/help", "Привет!"],
+        callback_data=args.callback_data or ["random_value"],
+        inline_queries=args.inline_query or ["", "aiogram"],
+        users=args.users,
+        group_id=args.group_id
+    )
+    server = FakeBotAPI(
+        factory, rate=args.rate, total=args.total, max_pending=args.max_pending,
+        recorder=CallRecorder(output=args.record), host=args.host, port=args.port
+    )
+    await server.start()
+    print(f"Fake Bot API is listening on {server.url}")
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+    try:
+        await stop.wait()
+    finally:
+        print(json.dumps(server.stats(), indent=2, ensure_ascii=False))
+        await server.stop()
+        if args.record:
+            args.record.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass